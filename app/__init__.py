@@ -7,12 +7,13 @@ from app.core.config import settings, configure_cloudinary
 # from app.core.db.database import get_database
 from app.core.auth.routes import router as auth_router
 # from app.core.services.upload import router as upload_router
-from app.posts.routes import router as posts_router
+from app.posts.routes import router as posts_router, users_router as posts_users_router
 from app.core.errors import register_exceptions
-from app.core.db.models import User, UserFollows, UserBlocks
-from app.posts.models import Post, Media
+from app.core.db.models import User, UserFollows, UserBlocks, AccountDeletionJob
+from app.posts.models import Post, Media, MediaAsset, PostOutboxEvent, PostPurgeJob, UploadSession
 from app.engagement.models import PostLike, Comment, Bookmark, CommentLike
 from app.feed.routes import router as feed_router
+from app.feed.models import TimelineEntry
 from app.following.routes import router as following_router
 from app.engagement.routes import router as engagement_router
 from app.discovery.routes import router as discovery_router
@@ -24,6 +25,8 @@ from app.messenger.routes import router as messenger_router
 from app.notification.routes import router as notifications_router
 from app.notification.models import Notification
 from app.core.middleware import register_middleware
+from app.posts.cache import post_cache
+from app.core.media.storage import router as local_media_router
 # from app.main import router as main_router
 import os
 
@@ -42,17 +45,20 @@ async def lifespan(app: FastAPI):
         mongo_options["tls"] = True
     client = AsyncMongoClient(settings.MONGODB_URL, **mongo_options)
     await init_beanie(database=client[settings.DB_NAME], document_models=[
-        User, UserFollows, UserBlocks, 
-        Post, Media, 
+        User, UserFollows, UserBlocks, AccountDeletionJob,
+        Post, Media, MediaAsset, PostOutboxEvent, PostPurgeJob, UploadSession,
         PostLike, Comment, Bookmark, CommentLike, 
         Hashtag, PostTag, Location,
         Story, StoryView,
         Conversation, Message,
-        Notification
+        Notification,
+        TimelineEntry
     ])
     print("MongoDB Connected")
+    post_cache.start()
     yield
     # SHUTDOWN
+    await post_cache.stop()
     await client.close()
     print("MongoDB Closed")
 
@@ -89,6 +95,9 @@ app.include_router(
 app.include_router(
     prefix=f"/api/{version}", router=posts_router)
 
+app.include_router(
+    prefix=f"/api/{version}", router=posts_users_router)
+
 app.include_router(
     prefix=f"/api/{version}", router=discovery_router)
 
@@ -100,3 +109,6 @@ app.include_router(
 
 app.include_router(
     prefix=f"/api/{version}", router=notifications_router)
+
+# Files of the local storage backend (outside /api: LOCAL_STORAGE_BASE_URL points here)
+app.include_router(router=local_media_router)
@@ -0,0 +1,295 @@
+import asyncio
+import logging
+import uuid
+from typing import Any, Dict, List, Optional
+
+from beanie import PydanticObjectId
+from beanie.operators import In
+from bson import Binary
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.db.models import AccountDeletionJob, AccountDeletionStep, FollowStatus, User, UserBlocks, UserFollows
+from app.core.media.service import MediaService
+from app.core.utils.jobs import claim_jobs, extend_lease, fail_jobs, finish_jobs, mark_step, run_in_transaction
+from app.engagement.models import Bookmark, Comment, CommentLike, PostLike
+from app.feed.models import TimelineEntry
+from app.messenger.models import Conversation, Message
+from app.notification.models import Notification
+from app.posts.models import LIVE_POSTS, Media, Post
+from app.posts.purge import mark_posts_deleted
+from app.stories.models import Story, StoryView
+
+
+async def delete_account(user: User) -> AccountDeletionJob:
+    """
+    Deletes the User document and writes its cascade job, atomically where transactions
+    are available. Without them the job is written first: if the user is never deleted,
+    the worker finds them still there and closes the job without touching anything.
+    """
+    job = AccountDeletionJob(user_id=str(user.id))
+
+    async def write(session):
+        await job.insert(session=session)
+        await user.delete(session=session)
+
+    await run_in_transaction(User.get_pymongo_collection().database.client, write)
+    return job
+
+
+async def enqueue_account_deletion(job: AccountDeletionJob):
+    """
+    Hands the job to the Celery worker right away; the periodic sweep is the fallback.
+    """
+    from app.core.services.celery_worker import delete_account_data
+
+    try:
+        await asyncio.to_thread(delete_account_data.delay, [str(job.id)])
+    except Exception as e:
+        logging.warning(f"Could not queue account deletion {job.id}, leaving it to the sweep: {e}")
+
+
+def _clamped_inc(field: str, n: int) -> List[Dict[str, Any]]:
+    # Update pipeline for `field -= n` that never goes below zero
+    return [{"$set": {field: {"$max": [0, {"$subtract": [f"${field}", n]}]}}}]
+
+
+def _uuid_str(value) -> str:
+    # Comment ids come back from raw queries as BSON binary (subtype 4)
+    return str(value.as_uuid()) if isinstance(value, Binary) else str(value)
+
+
+def _counts(values) -> Dict[Any, int]:
+    counts: Dict[Any, int] = {}
+    for v in values:
+        counts[v] = counts.get(v, 0) + 1
+    return counts
+
+
+class AccountDeletionProcessor:
+    """
+    Removes everything a deleted account leaves behind, one AccountDeletionStep at a time:
+    posts (handed to the post purge), likes, comments, comment likes, bookmarks, follows,
+    blocks, the user's timeline, stories, notifications, conversations and media.
+    Counters other users and posts keep about the account (followers_count,
+    following_count, likes_count, comments_count, like_count) are lowered as its rows go.
+
+    Every step walks its collection in batches of ACCOUNT_DELETION_BATCH_SIZE over an
+    index, sleeping ACCOUNT_DELETION_BATCH_PAUSE between batches, so a heavy account
+    is removed slowly instead of spiking the database. Each batch removes (or flags)
+    what it read, so a job picked up again after a crash simply continues; finished
+    steps are recorded and skipped. A crash between a batch's delete and its counter
+    update leaves those counters one batch too high.
+    """
+
+    def __init__(self):
+        self.batch_size = settings.ACCOUNT_DELETION_BATCH_SIZE
+
+    async def claim(self, job_ids: Optional[List[str]] = None) -> List[AccountDeletionJob]:
+        # One account at a time per worker; a heavy account can take a while
+        return await claim_jobs(
+            AccountDeletionJob,
+            lease_seconds=settings.ACCOUNT_DELETION_LEASE_SECONDS,
+            limit=1,
+            job_ids=job_ids,
+            min_age_seconds=settings.ACCOUNT_DELETION_SWEEP_GRACE_SECONDS
+        )
+
+    async def process(self, jobs: List[AccountDeletionJob]):
+        for job in jobs:
+            await self._run(job)
+
+    async def _run(self, job: AccountDeletionJob):
+        # 1. The user still existing means the account deletion never landed
+        if PydanticObjectId.is_valid(job.user_id) and await User.find(User.id == PydanticObjectId(job.user_id)).count():
+            await finish_jobs(AccountDeletionJob, [job])
+            return
+
+        # 2. Steps in order, each resumable
+        for step, run in (
+            (AccountDeletionStep.POSTS, self._delete_posts),
+            (AccountDeletionStep.LIKES, self._delete_likes),
+            (AccountDeletionStep.COMMENTS, self._delete_comments),
+            (AccountDeletionStep.COMMENT_LIKES, self._delete_comment_likes),
+            (AccountDeletionStep.BOOKMARKS, self._delete_bookmarks),
+            (AccountDeletionStep.FOLLOWS, self._delete_follows),
+            (AccountDeletionStep.TIMELINE, self._delete_timeline),
+            (AccountDeletionStep.STORIES, self._delete_stories),
+            (AccountDeletionStep.NOTIFICATIONS, self._delete_notifications),
+            (AccountDeletionStep.CONVERSATIONS, self._leave_conversations),
+            (AccountDeletionStep.MEDIA, self._delete_media)
+        ):
+            if step in job.completed_steps:
+                continue
+            try:
+                await run(job)
+            except Exception as e:
+                logging.exception(f"Account deletion step {step.value} failed for user {job.user_id}")
+                await fail_jobs(AccountDeletionJob, [job], f"{step.value}: {e}", settings.ACCOUNT_DELETION_MAX_ATTEMPTS)
+                return
+            await mark_step(AccountDeletionJob, [job], step)
+
+        await finish_jobs(AccountDeletionJob, [job])
+
+    async def _batches(self, job: AccountDeletionJob, collection, query: dict, projection: dict):
+        """
+        Yields batches of raw documents matching `query` until none are left. The caller
+        must remove or change every document it gets, or the walk never ends.
+        """
+        while True:
+            docs = await collection.find(query, projection).limit(self.batch_size).to_list()
+            if not docs:
+                return
+            yield docs
+            await extend_lease(AccountDeletionJob, job, settings.ACCOUNT_DELETION_LEASE_SECONDS)
+            await asyncio.sleep(settings.ACCOUNT_DELETION_BATCH_PAUSE)
+
+    async def _delete_where(self, job: AccountDeletionJob, model, query: dict):
+        collection = model.get_pymongo_collection()
+        async for docs in self._batches(job, collection, query, {"_id": 1}):
+            await collection.delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+
+    # ------------------------------------------------------------------
+    # Steps
+    # ------------------------------------------------------------------
+
+    async def _delete_posts(self, job: AccountDeletionJob):
+        query = {"owner_id": job.user_id, **LIVE_POSTS}
+        async for posts in self._batches(job, Post.get_pymongo_collection(), query, {"_id": 1, "owner_id": 1}):
+            await mark_posts_deleted(posts)
+
+    async def _delete_likes(self, job: AccountDeletionJob):
+        collection = PostLike.get_pymongo_collection()
+        async for likes in self._batches(job, collection, {"user_id": job.user_id}, {"_id": 1, "post_id": 1}):
+            await collection.delete_many({"_id": {"$in": [l["_id"] for l in likes]}})
+            # One like per (post, user), so every liked post loses exactly one
+            post_ids = [PydanticObjectId(l["post_id"]) for l in likes if PydanticObjectId.is_valid(l["post_id"])]
+            await Post.get_pymongo_collection().update_many(
+                {"_id": {"$in": post_ids}}, _clamped_inc("likes_count", 1)
+            )
+
+    async def _delete_comments(self, job: AccountDeletionJob):
+        """
+        Same rules as deleting a single comment: a comment with replies is blanked and
+        kept for its thread, any other one is removed and no longer counted on its post.
+        """
+        collection = Comment.get_pymongo_collection()
+        query = {"user_id": job.user_id, "is_deleted": {"$ne": True}}
+        async for comments in self._batches(job, collection, query, {"_id": 1, "post_id": 1, "reply_count": 1}):
+            threads = [c["_id"] for c in comments if c.get("reply_count", 0) > 0]
+            leaves = [c for c in comments if c.get("reply_count", 0) <= 0]
+
+            if threads:
+                await collection.update_many(
+                    {"_id": {"$in": threads}}, {"$set": {"content": "[Comment deleted]", "is_deleted": True}}
+                )
+            if leaves:
+                leaf_ids = [c["_id"] for c in leaves]
+                await CommentLike.get_pymongo_collection().delete_many(
+                    {"comment_id": {"$in": [_uuid_str(i) for i in leaf_ids]}}
+                )
+                await collection.delete_many({"_id": {"$in": leaf_ids}})
+                per_post = _counts(c["post_id"] for c in leaves if PydanticObjectId.is_valid(c["post_id"]))
+                await Post.get_pymongo_collection().bulk_write(
+                    [UpdateOne({"_id": PydanticObjectId(p)}, _clamped_inc("comments_count", n)) for p, n in per_post.items()],
+                    ordered=False
+                )
+
+    async def _delete_comment_likes(self, job: AccountDeletionJob):
+        collection = CommentLike.get_pymongo_collection()
+        async for likes in self._batches(job, collection, {"user_id": job.user_id}, {"_id": 1, "comment_id": 1}):
+            await collection.delete_many({"_id": {"$in": [l["_id"] for l in likes]}})
+            comment_ids = []
+            for l in likes:
+                try:
+                    comment_ids.append(Binary.from_uuid(uuid.UUID(l["comment_id"])))
+                except ValueError:
+                    continue
+            # One like per (comment, user)
+            await Comment.get_pymongo_collection().update_many(
+                {"_id": {"$in": comment_ids}}, _clamped_inc("like_count", 1)
+            )
+
+    async def _delete_bookmarks(self, job: AccountDeletionJob):
+        await self._delete_where(job, Bookmark, {"user_id": job.user_id})
+
+    async def _delete_follows(self, job: AccountDeletionJob):
+        collection = UserFollows.get_pymongo_collection()
+        users = User.get_pymongo_collection()
+
+        # (query, the other side's id field, the counter it loses)
+        for query, other_field, counter in (
+            ({"follower_id": job.user_id}, "following_id", "followers_count"),
+            ({"following_id": job.user_id}, "follower_id", "following_count")
+        ):
+            async for follows in self._batches(job, collection, query, {"_id": 1, other_field: 1, "status": 1}):
+                await collection.delete_many({"_id": {"$in": [f["_id"] for f in follows]}})
+                # Pending requests were never counted
+                per_user = _counts(
+                    f[other_field] for f in follows
+                    if f.get("status", FollowStatus.ACTIVE.value) == FollowStatus.ACTIVE.value
+                    and PydanticObjectId.is_valid(f[other_field])
+                )
+                if per_user:
+                    await users.bulk_write(
+                        [UpdateOne({"_id": PydanticObjectId(u)}, _clamped_inc(counter, n)) for u, n in per_user.items()],
+                        ordered=False
+                    )
+
+        await self._delete_where(job, UserBlocks, {"blocker_id": job.user_id})
+        await self._delete_where(job, UserBlocks, {"blocked_id": job.user_id})
+
+    async def _delete_timeline(self, job: AccountDeletionJob):
+        # Entries for the user's posts in other timelines go with the post purge
+        await self._delete_where(job, TimelineEntry, {"owner_id": job.user_id})
+
+    async def _delete_stories(self, job: AccountDeletionJob):
+        collection = Story.get_pymongo_collection()
+        async for stories in self._batches(job, collection, {"owner_id": job.user_id}, {"_id": 1, "media": 1}):
+            await StoryView.get_pymongo_collection().delete_many({"story_id": {"$in": [str(s["_id"]) for s in stories]}})
+            media_ids = [s["media"].id for s in stories if s.get("media") is not None]
+            await self._delete_media_docs(await Media.find(In(Media.id, media_ids)).to_list() if media_ids else [])
+            await collection.delete_many({"_id": {"$in": [s["_id"] for s in stories]}})
+
+    async def _delete_notifications(self, job: AccountDeletionJob):
+        await self._delete_where(job, Notification, {"recipient_id": job.user_id})
+        await self._delete_where(job, Notification, {"actor_id": job.user_id})
+
+    async def _leave_conversations(self, job: AccountDeletionJob):
+        """
+        Direct chats lose their only other reader's counterpart and are deleted with their
+        messages; the user just leaves group chats (their messages stay in the history).
+        """
+        collection = Conversation.get_pymongo_collection()
+        query = {"participants": job.user_id}
+        async for conversations in self._batches(job, collection, query, {"_id": 1, "is_group": 1}):
+            direct = [c["_id"] for c in conversations if not c.get("is_group")]
+            groups = [c["_id"] for c in conversations if c.get("is_group")]
+
+            for conversation_id in direct:
+                await self._delete_where(job, Message, {"conversation_id": str(conversation_id)})
+            if direct:
+                await collection.delete_many({"_id": {"$in": direct}})
+            if groups:
+                await collection.update_many(
+                    {"_id": {"$in": groups}},
+                    {"$pull": {"participants": job.user_id, "pinned_by": job.user_id}}
+                )
+
+    async def _delete_media(self, job: AccountDeletionJob):
+        # Post media is removed by the post purge; this is what's left (messages, unused uploads)
+        while True:
+            media = await Media.find(Media.owner_id == job.user_id).limit(self.batch_size).to_list()
+            if not media:
+                return
+            await self._delete_media_docs(media)
+            await extend_lease(AccountDeletionJob, job, settings.ACCOUNT_DELETION_LEASE_SECONDS)
+            await asyncio.sleep(settings.ACCOUNT_DELETION_BATCH_PAUSE)
+
+    async def _delete_media_docs(self, media: List[Media]):
+        if not media:
+            return
+        # Stored files first (shared ones only once unused): a retry can only find them
+        # through the Media documents
+        await MediaService.release_assets(media)
+        await Media.get_pymongo_collection().delete_many({"_id": {"$in": [m.id for m in media]}})
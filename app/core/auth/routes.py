@@ -13,6 +13,7 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from app.core.auth.utils import decode_url_safe_token, hash_password
 from app.core.errors import InvalidToken, UserNotFoundException
+from app.feed.warmup import schedule_feed_warmup
 
 # role_checker = Depends(RoleChecker())
 
@@ -36,6 +37,8 @@ async def login_user(form_data: OAuth2PasswordRequestForm = Depends()):
 async def refresh_token(current_user=Depends(RefreshTokenBearer())):
 
     access_token = await user_service.refresh_access_token(current_user)
+    if access_token:
+        schedule_feed_warmup(current_user['sub'])
 
     return JSONResponse(content={
         "access_token": access_token,
@@ -11,6 +11,9 @@ import logging
 import beanie
 from fastapi.templating import Jinja2Templates
 from ..services.celery_worker import send_email
+from app.feed.warmup import schedule_feed_warmup
+from app.posts.cache import post_cache
+from app.core.auth.deletion import delete_account, enqueue_account_deletion
 
 templates = Jinja2Templates(directory="app/templates")
 class UserService:
@@ -70,6 +73,9 @@ class UserService:
         
         refresh_token = utils.create_access_token({"sub": str(user.id)}, refresh=True)
         token = {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+        # 4. Prefetch the first feed screen while the client stores its tokens
+        schedule_feed_warmup(str(user.id))
         return token
     
     async def refresh_access_token(self, token_data: dict):
@@ -89,6 +95,8 @@ class UserService:
                 setattr(current_user, k, v)
             
             await current_user.save() 
+            # Cached posts embed the author's public profile
+            await post_cache.invalidate_user(str(current_user.id))
             return current_user
             
         except (ValueError, beanie.exceptions.DocumentNotFound):
@@ -104,7 +112,10 @@ class UserService:
         if not user_to_delete:
             raise UserNotFoundException()
         
-        await user_to_delete.delete()
+        # The user goes now; everything they own is removed by the background cascade
+        job = await delete_account(user_to_delete)
+        await post_cache.invalidate_user(str(user_to_delete.id))
+        await enqueue_account_deletion(job)
 
     async def verify_user_email(self, token: str):
         token_data = utils.decode_url_safe_token(token)
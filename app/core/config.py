@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from celery.schedules import crontab
@@ -19,6 +21,8 @@ class Settings(BaseSettings):
     REDIS_USERNAME : str
     REDIS_PASSWORD: str
     REDIS_DB: int = 0  # Add Redis DB number
+    REDIS_MAX_CONNECTIONS: int = 50     # Shared client pool size per process
+    REDIS_POOL_TIMEOUT: float = 5.0     # Seconds a command waits for a free connection
     MAIL_USERNAME: str
     MAIL_PASSWORD: str
     MAIL_FROM: str
@@ -33,8 +37,95 @@ class Settings(BaseSettings):
     CLOUDINARY_CLOUD_NAME: str
     CLOUDINARY_API_KEY: str
     CLOUDINARY_API_SECRET: str
+    CLOUDINARY_UPLOAD_PREFIX: Optional[str] = None  # API base URL override, e.g. a local fake storage server
+
+    # Where new media files are stored: "cloudinary" or "local" (app/core/media/storage.py).
+    # Each Media row remembers its backend, so switching only affects new uploads
+    STORAGE_BACKEND: str = "cloudinary"
+    LOCAL_STORAGE_DIR: str = ".media"                               # Root of the local backend
+    LOCAL_STORAGE_BASE_URL: str = "http://localhost:8000/media"     # Public URL of GET /media/{kind}/{key}
+    MEDIA_VARIANT_URL_CACHE_SIZE: int = 10000   # Memoized variant URLs of media rows without stored ones
     RADAR_SECRET_KEY: str
 
+    # Materialized home timeline (fan-out-on-write)
+    TIMELINE_FANOUT_BATCH_SIZE: int = 1000  # Followers written per bulk_write
+    TIMELINE_BACKFILL_LIMIT: int = 50       # Recent posts copied in on follow
+    TIMELINE_MAX_ENTRIES: int = 800         # Posts loaded when rebuilding a timeline from history
+    TIMELINE_PULL_THRESHOLD: int = 100000   # Authors with this many followers are merged in at read time
+
+    # Relevance-ranked timeline (/feed/timeline?ranking=relevance)
+    TIMELINE_RANK_WINDOW: int = 500              # Most recent candidate posts scored per request
+    TIMELINE_RANK_HALF_LIFE_HOURS: float = 12.0  # Recency score halves every this many hours
+    TIMELINE_RANK_AFFINITY_LOOKBACK: int = 500   # Viewer's latest likes / comments used for affinity
+    TIMELINE_RANK_RECENCY_WEIGHT: float = 1.0
+    TIMELINE_RANK_VELOCITY_WEIGHT: float = 0.5
+    TIMELINE_RANK_AFFINITY_WEIGHT: float = 0.8
+
+    # First timeline page + story tray prefetched on login / token refresh
+    FEED_WARMUP_TTL: int = 60           # Seconds a prefetched page waits to be served
+    FEED_WARMUP_PAGE_SIZE: int = 10     # Matches the timeline's default limit
+    FEED_WARMUP_CONCURRENCY: int = 4    # Warm-ups running at once per process
+    FEED_WARMUP_MAX_PENDING: int = 200  # Beyond this, new warm-ups are dropped
+
+    # Embed media/location snapshots in new posts so reads skip the joins
+    # (existing posts: python -m app.posts.snapshots)
+    POST_EMBED_SNAPSHOTS: bool = False
+
+    # GET /posts/batch
+    POST_BATCH_MAX_IDS: int = 100
+
+    # GET /posts/{id} response cache (in-process LRU in front of Redis)
+    POST_CACHE_TTL: int = 300           # Seconds a response lives in Redis
+    POST_CACHE_LOCAL_TTL: int = 10      # Seconds a response lives in a process's LRU
+    POST_CACHE_LOCAL_SIZE: int = 2000   # Responses kept per process
+
+    # Post-creation outbox (hashtags, mentions, fan-out run by the Celery worker)
+    OUTBOX_BATCH_SIZE: int = 100        # Events claimed and processed together
+    OUTBOX_LEASE_SECONDS: int = 120     # A claimed event becomes due again after this
+    OUTBOX_MAX_ATTEMPTS: int = 5        # Then the event is marked FAILED
+    OUTBOX_SWEEP_MAX_BATCHES: int = 20  # Batches drained per sweep run
+    OUTBOX_SWEEP_GRACE_SECONDS: int = 30  # The sweep ignores events younger than this
+
+    # Deleted-post purge (dependent rows, assets and the post itself, run by the Celery worker)
+    PURGE_BATCH_SIZE: int = 20          # Purge jobs claimed and processed together
+    PURGE_DELETE_BATCH_SIZE: int = 1000 # Rows removed per delete_many
+    PURGE_LEASE_SECONDS: int = 300      # A claimed job becomes due again after this
+    PURGE_MAX_ATTEMPTS: int = 5         # Then the job is marked FAILED
+    PURGE_SWEEP_MAX_BATCHES: int = 10   # Batches drained per sweep run
+    PURGE_SWEEP_GRACE_SECONDS: int = 30 # The sweep ignores jobs younger than this
+
+    # Account deletion cascade (Celery worker); batches are small and spaced out so a
+    # heavy account doesn't compete with live traffic
+    ACCOUNT_DELETION_BATCH_SIZE: int = 500      # Documents read / written per batch
+    ACCOUNT_DELETION_BATCH_PAUSE: float = 0.2   # Seconds to sleep between batches
+    ACCOUNT_DELETION_LEASE_SECONDS: int = 600   # Extended after every batch
+    ACCOUNT_DELETION_SWEEP_MAX_ACCOUNTS: int = 10   # Accounts processed per sweep run
+    ACCOUNT_DELETION_SWEEP_GRACE_SECONDS: int = 30  # The sweep ignores jobs younger than this
+    ACCOUNT_DELETION_MAX_ATTEMPTS: int = 10     # Then the job is marked FAILED
+
+    # Uploads streamed to .temp_uploads
+    UPLOAD_MAX_BYTES: int = 30 * 1024 * 1024    # Larger files are rejected while copying
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024        # Bytes read / hashed / written per step
+    UPLOAD_MAX_CONCURRENT: int = 4              # Uploads copied at once per process
+    UPLOAD_SLOT_WAIT_SECONDS: float = 5.0       # Then the request gets a 503
+
+    # Resumable video uploads (/posts/upload/sessions)
+    # (declared lengths are capped at UPLOAD_MAX_BYTES, like one-shot video uploads)
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 60 * 60     # Idle time before a session expires (reset by every chunk)
+    UPLOAD_SESSION_WRITE_LEASE_SECONDS: int = 60       # A stalled chunk request loses the session after this
+
+    # Client-direct uploads (/posts/upload/direct): the client sends the file straight to
+    # storage with parameters signed here, and the API only verifies the result
+    DIRECT_UPLOADS_ENABLED: bool = False
+    DIRECT_UPLOAD_TTL_SECONDS: int = 60 * 60            # Signed parameters are valid this long; then the upload FAILS
+    DIRECT_UPLOAD_RECONCILE_AFTER_SECONDS: int = 120    # Pending uploads older than this are checked with the storage API
+    DIRECT_UPLOAD_RECONCILE_BATCH: int = 50             # Checked per run (the Admin API is rate limited)
+    DIRECT_UPLOAD_CALLBACK_URL: Optional[str] = None    # Defaults to https://{DOMAIN_NAME}/api/v1/posts/upload/direct/callback
+
+    # Following / block sets cached in Redis
+    GRAPH_CACHE_TTL: int = 24 * 60 * 60     # Seconds an unread set stays cached
+    PULL_AUTHORS_CACHE_TTL: int = 60        # Seconds the set of pull authors is reused before a reload
+
     model_config = SettingsConfigDict(
         env_file=".env",
         extra="ignore"
@@ -65,6 +156,8 @@ def configure_cloudinary():
         api_secret=settings.CLOUDINARY_API_SECRET,
         secure=True
     )
+    if settings.CLOUDINARY_UPLOAD_PREFIX:
+        cloudinary.config(upload_prefix=settings.CLOUDINARY_UPLOAD_PREFIX)
 
 # Celery Configuration
 # These variables are used by Celery when it loads config via config_from_object
@@ -105,5 +198,21 @@ beat_schedule = {
     "cleanup-expired-stories-minutely": {
         "task": "app.core.services.celery_worker.cleanup_expired_stories",
         "schedule": crontab(minute="*"),  # Run every minute
+    },
+    "sweep-post-outbox-minutely": {
+        "task": "app.core.services.celery_worker.sweep_post_outbox",
+        "schedule": crontab(minute="*"),  # Picks up events the request path couldn't queue
+    },
+    "sweep-post-purge-minutely": {
+        "task": "app.core.services.celery_worker.sweep_post_purge",
+        "schedule": crontab(minute="*"),  # Resumes purges whose worker died or failed
+    },
+    "sweep-account-deletions": {
+        "task": "app.core.services.celery_worker.sweep_account_deletions",
+        "schedule": crontab(minute="*/5"),  # Resumes account deletions whose worker died or failed
+    },
+    "reconcile-direct-uploads-minutely": {
+        "task": "app.core.services.celery_worker.reconcile_direct_uploads",
+        "schedule": crontab(minute="*"),  # Activates direct uploads whose callback never arrived
     }
 }
\ No newline at end of file
@@ -1,8 +1,10 @@
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
 from beanie import Document, Indexed, Link, PydanticObjectId
+from pymongo import IndexModel
+from app.core.utils.jobs import JobStatus
 from datetime import datetime
 
 
@@ -22,9 +24,13 @@ class User(Document):
     is_private: bool = False
     followers_count: int = 0
     following_count: int = 0
+    timeline_built_at: Optional[datetime] = None  # Set once the materialized timeline has been rebuilt from history
 
     class Settings:
         name = "users"
+        indexes = [
+            [("followers_count", -1)], # Suggestions and high-follower (pull) author lookups
+        ]
 
 class FollowStatus(str, Enum):
     ACTIVE = "active"
@@ -52,6 +58,46 @@ class UserBlocks(Document):
         name = "user_blocks"
         indexes = [
             [("blocker_id", 1), ("blocked_id", 1)],
+            [("blocked_id", 1)], # Account deletion
+        ]
+
+class AccountDeletionStep(str, Enum):
+    POSTS = "posts"                  # Soft-delete every post; the post purge does the rest
+    LIKES = "likes"                  # Post likes, with likes_count
+    COMMENTS = "comments"            # Comments, with comments_count
+    COMMENT_LIKES = "comment_likes"  # Comment likes, with like_count
+    BOOKMARKS = "bookmarks"
+    FOLLOWS = "follows"              # Follows both ways, with the other side's counters; blocks
+    TIMELINE = "timeline"            # The user's own materialized timeline
+    STORIES = "stories"              # Stories, their views and media
+    NOTIFICATIONS = "notifications"  # Received and sent
+    CONVERSATIONS = "conversations"  # Direct chats are deleted, group memberships removed
+    MEDIA = "media"                  # Whatever media is left (messages, unused uploads)
+
+class AccountDeletionJob(Document):
+    """
+    Removes everything a deleted account leaves behind, one AccountDeletionStep at a time
+    (see app/core/auth/deletion.py). The User document itself is gone already.
+    """
+    user_id: str
+
+    status: JobStatus = JobStatus.PENDING
+    completed_steps: List[AccountDeletionStep] = []
+    attempts: int = 0
+    lock_token: Optional[str] = None
+    locked_until: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    processed_at: Optional[datetime] = None
+
+    class Settings:
+        name = "account_deletion_jobs"
+        indexes = [
+            IndexModel([("user_id", 1)], unique=True),
+            IndexModel([("status", 1), ("locked_until", 1), ("created_at", 1)]),
+            IndexModel([("lock_token", 1)], sparse=True),
+            IndexModel([("processed_at", 1)], expireAfterSeconds=30 * 24 * 60 * 60)
         ]
 
 # class PostModel(Document):
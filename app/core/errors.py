@@ -1,5 +1,5 @@
 from fastapi import HTTPException, Request, status, FastAPI
-from typing import Any, Callable
+from typing import Any, Callable, List, Optional
 from fastapi.responses import JSONResponse
 
 
@@ -67,7 +67,11 @@ class CommentNotFoundException(WeTalkException):
 
 class MediaValidationException(WeTalkException):
     """Exception raised when media validation fails."""
-    pass
+
+    def __init__(self, message: str = "Media validation failed", errors: Optional[List[dict]] = None):
+        super().__init__(message)
+        # One entry per rejected media_id, returned to the client as "errors"
+        self.errors = errors or []
 
 
 class UnauthorizedActionException(WeTalkException):
@@ -105,11 +109,36 @@ class FileSizeLimitException(WeTalkException):
     pass
 
 
+class UploadCapacityException(WeTalkException):
+    """Exception raised when the process is already handling its maximum number of uploads."""
+    pass
+
+
+class InvalidUploadSignatureException(WeTalkException):
+    """Exception raised when a storage upload notification fails signature verification."""
+    pass
+
+
+class UploadSessionNotFoundException(WeTalkException):
+    """Exception raised when a resumable upload session does not exist or has expired."""
+    pass
+
+
+class UploadSessionConflictException(WeTalkException):
+    """Exception raised when a chunk or finalize request doesn't match the session's state."""
+    pass
+
+
 class ConversationNotFoundException(WeTalkException):
     """Exception raised when a conversation is not found."""
     pass
 
 
+class InvalidCursorException(WeTalkException):
+    """Exception raised when a pagination cursor is malformed or tampered with."""
+    pass
+
+
 def create_exception_handler(
     status_code: int, initial_detail: Any
 ) -> Callable[[Request, Exception], JSONResponse]:
@@ -118,6 +147,8 @@ def create_exception_handler(
         content = initial_detail.copy()
         if exc.args and isinstance(exc.args[0], str):
             content["message"] = exc.args[0]
+        if getattr(exc, "errors", None):
+            content["errors"] = exc.errors
         return JSONResponse(content=content, status_code=status_code)
 
     return exception_handler
@@ -339,6 +370,18 @@ def register_exceptions(app: FastAPI):
         ),
     )
 
+    app.add_exception_handler(
+        InvalidCursorException,
+        create_exception_handler(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            initial_detail={
+                "message": "Invalid pagination cursor",
+                "error_code": "invalid_cursor",
+                "resolution": "Use the next_cursor value from the previous page or omit it to start over",
+            },
+        ),
+    )
+
     app.add_exception_handler(
         FileSizeLimitException,
         create_exception_handler(
@@ -350,3 +393,51 @@ def register_exceptions(app: FastAPI):
             },
         ),
     )
+
+    app.add_exception_handler(
+        UploadCapacityException,
+        create_exception_handler(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            initial_detail={
+                "message": "Too many uploads in progress",
+                "error_code": "upload_capacity_reached",
+                "resolution": "Retry the upload in a few seconds",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        UploadSessionNotFoundException,
+        create_exception_handler(
+            status_code=status.HTTP_404_NOT_FOUND,
+            initial_detail={
+                "message": "Upload session not found",
+                "error_code": "upload_session_not_found",
+                "resolution": "The session may have expired; start a new upload",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        UploadSessionConflictException,
+        create_exception_handler(
+            status_code=status.HTTP_409_CONFLICT,
+            initial_detail={
+                "message": "Upload session conflict",
+                "error_code": "upload_session_conflict",
+                "resolution": "Fetch the session to get its current offset and resume from there",
+            },
+        ),
+    )
+
+    app.add_exception_handler(
+        InvalidUploadSignatureException,
+        create_exception_handler(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            initial_detail={
+                "message": "Invalid upload notification signature",
+                "error_code": "invalid_upload_signature",
+                "resolution": "Notifications must be signed by the storage backend",
+            },
+        ),
+    )
@@ -0,0 +1,104 @@
+import logging
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.posts.models import Media, MediaAsset, MediaType
+
+# Uploads with the same SHA-256 share one stored file. Each Media row that shares it holds
+# one reference on its MediaAsset; giving the last one back deletes the file.
+#
+# A reference is only taken while refcount > 0: an asset at zero is being deleted, and the
+# upload that finds it that way stores its own copy (without sharing it) instead.
+
+
+async def acquire_asset(content_hash: str, file_type: MediaType) -> Optional[MediaAsset]:
+    """
+    Takes a reference on the live asset with this hash, if there is one.
+    """
+    doc = await MediaAsset.get_pymongo_collection().find_one_and_update(
+        {"content_hash": content_hash, "file_type": file_type.value, "refcount": {"$gt": 0}},
+        {"$inc": {"refcount": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    return MediaAsset.model_validate(doc) if doc else None
+
+
+async def register_asset(
+    content_hash: str, file_type: MediaType, storage: str, public_id: str, view_link: str
+) -> Optional[MediaAsset]:
+    """
+    Records a freshly stored file as the asset for `content_hash`, holding one reference.
+    If a concurrent upload of the same content registered first, a reference on that
+    asset is returned instead and the caller should delete its own copy. None: the hash
+    belongs to an asset being deleted, so the file is kept unshared.
+    """
+    asset = MediaAsset(
+        content_hash=content_hash, file_type=file_type, storage=storage, public_id=public_id, view_link=view_link
+    )
+    try:
+        await asset.insert()
+        return asset
+    except DuplicateKeyError:
+        return await acquire_asset(content_hash, file_type)
+
+
+def share_fields(asset: MediaAsset) -> dict:
+    """
+    Media fields of a row that uses `asset`'s stored file.
+    """
+    return {
+        "public_id": asset.public_id,
+        "view_link": asset.view_link,
+        "storage": asset.storage,
+        "content_hash": asset.content_hash
+    }
+
+
+async def release_assets(media: List[Media]) -> List[Media]:
+    """
+    Gives back the references of `media` (which are about to be deleted). Returns the
+    rows whose stored file must now be deleted: rows that never shared their file, and,
+    for each asset whose last reference went, a row pointing at its file.
+
+    Each row's reference is given back at most once (asset_released), so retrying a
+    half-finished deletion can't release a reference twice. A crash between marking a
+    row and decrementing leaks a reference instead: the file outlives its users.
+    """
+    unshared: List[Media] = []
+    released: Dict[str, int] = {}
+    collection = Media.get_pymongo_collection()
+
+    # 1. Claim each shared row's reference
+    for m in media:
+        if not m.content_hash:
+            unshared.append(m)
+            continue
+        result = await collection.update_one(
+            {"_id": m.id, "asset_released": {"$ne": True}}, {"$set": {"asset_released": True}}
+        )
+        if result.modified_count:
+            released[m.content_hash] = released.get(m.content_hash, 0) + 1
+
+    # 2. Drop the references; whoever takes an asset to zero deletes it
+    dead: List[Media] = []
+    assets = MediaAsset.get_pymongo_collection()
+    for content_hash, n in released.items():
+        doc = await assets.find_one_and_update(
+            {"content_hash": content_hash}, {"$inc": {"refcount": -n}}, return_document=ReturnDocument.AFTER
+        )
+        if doc is None:
+            logging.warning(f"Media asset {content_hash} is missing; its file may be orphaned")
+            continue
+        if doc["refcount"] > 0:
+            continue
+        result = await assets.delete_one({"_id": doc["_id"], "refcount": {"$lte": 0}})
+        if result.deleted_count:
+            asset = MediaAsset.model_validate(doc)
+            dead.append(Media.model_construct(
+                owner_id="", filename="", media_type="", file_type=asset.file_type,
+                public_id=asset.public_id, view_link=asset.view_link, storage=asset.storage
+            ))
+
+    return unshared + dead
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import cloudinary
+import cloudinary.utils
+from beanie import PydanticObjectId
+
+from app.core.config import settings
+from app.core.errors import ContentValidationException, InvalidUploadSignatureException, MediaValidationException
+from app.core.media.service import MediaService
+from app.core.media.storage import CloudinaryStorage
+from app.posts.grid import refresh_covers
+from app.posts.models import Media, MediaStatus, MediaType
+from app.posts.snapshots import refresh_media_snapshots
+
+# Same folders as uploads that go through the API
+_FOLDERS = {MediaType.IMAGE: "app_uploads", MediaType.VIDEO: "app_videos"}
+
+# Signed with the upload, so storage itself refuses a file of the wrong kind
+_ALLOWED_FORMATS = {
+    MediaType.IMAGE: "jpg,jpeg,png,gif,webp,heic",
+    MediaType.VIDEO: "mp4,mov,webm,mkv,avi"
+}
+
+
+def _callback_url() -> str:
+    return settings.DIRECT_UPLOAD_CALLBACK_URL or f"https://{settings.DOMAIN_NAME}/api/v1/posts/upload/direct/callback"
+
+
+def _file_type(content_type: str) -> MediaType:
+    if content_type.startswith("video/"):
+        return MediaType.VIDEO
+    if content_type.startswith("image/"):
+        return MediaType.IMAGE
+    raise ContentValidationException("Only image and video uploads are supported")
+
+
+def _view_link(media: Media, asset: dict) -> str:
+    url = asset.get("secure_url") or ""
+    # Videos show their poster frame, like uploads finished by upload_video_task
+    if media.file_type == MediaType.VIDEO and url:
+        return url.rsplit(".", 1)[0] + ".jpg"
+    return url
+
+
+class DirectUploadService:
+    """
+    Opt-in (DIRECT_UPLOADS_ENABLED) uploads that never pass through the API: the API
+    pre-creates a PENDING Media row and signs upload parameters for it, the client posts
+    the file straight to storage, and the row turns ACTIVE when storage confirms the
+    asset, through its signed notification callback, the client's complete call or the
+    periodic reconciliation, whichever comes first.
+
+    CLOUDINARY_UPLOAD_PREFIX points all of it (uploads, callbacks' Admin API checks) at
+    another server, e.g. tests/fake_storage_server.py.
+    """
+
+    async def create(self, owner_id: str, filename: str, content_type: str) -> dict:
+        if not settings.DIRECT_UPLOADS_ENABLED:
+            raise ContentValidationException("Direct uploads are disabled")
+        # Signed uploads and their notifications are Cloudinary's protocol
+        if settings.STORAGE_BACKEND != CloudinaryStorage.name:
+            raise ContentValidationException("Direct uploads need the cloudinary storage backend")
+        file_type = _file_type(content_type)
+
+        # 1. The row exists before the file: the public_id is ours, so nothing else can claim it
+        media = Media(
+            owner_id=owner_id,
+            status=MediaStatus.PENDING,
+            public_id=f"{_FOLDERS[file_type]}/{uuid.uuid4()}",
+            view_link="",
+            media_type=content_type,
+            filename=filename,
+            file_type=file_type,
+            storage=CloudinaryStorage.name,
+            upload_expires_at=datetime.now(timezone.utc) + timedelta(seconds=settings.DIRECT_UPLOAD_TTL_SECONDS)
+        )
+        await media.insert()
+
+        # 2. Signed parameters the client posts along with the file
+        params = {
+            "public_id": media.public_id,
+            "allowed_formats": _ALLOWED_FORMATS[file_type],
+            "timestamp": int(time.time()),
+            "notification_url": _callback_url()
+        }
+        params["signature"] = cloudinary.utils.api_sign_request(params, settings.CLOUDINARY_API_SECRET)
+        params["api_key"] = settings.CLOUDINARY_API_KEY
+
+        return {
+            "media_id": str(media.id),
+            "upload_url": cloudinary.utils.cloudinary_api_url("upload", resource_type=file_type.value),
+            "params": {k: str(v) for k, v in params.items()},
+            "expires_at": media.upload_expires_at
+        }
+
+    async def handle_callback(self, body: str, timestamp: Optional[str], signature: Optional[str]):
+        """
+        Storage's upload notification. Only the signature is trusted: the body is signed
+        with the API secret, so nobody else can activate a row.
+        """
+        try:
+            valid = bool(timestamp and signature) and cloudinary.utils.verify_notification_signature(
+                body, int(timestamp), signature, valid_for=settings.DIRECT_UPLOAD_TTL_SECONDS
+            )
+        except ValueError:
+            valid = False
+        if not valid:
+            raise InvalidUploadSignatureException()
+
+        asset = json.loads(body)
+        if asset.get("notification_type", "upload") != "upload" or not asset.get("public_id"):
+            return
+        media = await Media.find_one(Media.public_id == asset["public_id"], Media.status == MediaStatus.PENDING)
+        if not media:
+            return
+        # resource_type isn't signed: an image posted under a video row's public_id is not that video
+        if asset.get("resource_type") != media.file_type.value:
+            logging.warning(f"Direct upload {media.id} received a {asset.get('resource_type')} asset, expected {media.file_type.value}")
+            kind = asset.get("resource_type")
+            if kind in ("image", "video", "raw"):
+                await asyncio.to_thread(CloudinaryStorage().delete, media.public_id, kind)
+            return
+        await self.activate(media, asset)
+
+    async def complete(self, owner_id: str, media_id: str) -> Media:
+        """
+        The client reports its upload as done: checks storage right away instead of
+        waiting for the callback or the reconciliation.
+        """
+        media = await Media.get(PydanticObjectId(media_id)) if PydanticObjectId.is_valid(media_id) else None
+        if not media or media.owner_id != owner_id or media.upload_expires_at is None:
+            raise MediaValidationException(f"Invalid or unusable media: {media_id}",
+                                           errors=[{"media_id": media_id, "reason": "not_found"}])
+        if media.status == MediaStatus.PENDING:
+            asset = await asyncio.to_thread(MediaService.verify_asset_exists, media.public_id, media.file_type.value, media.storage)
+            if asset:
+                await self.activate(media, asset)
+        return media
+
+    async def activate(self, media: Media, asset: dict):
+        """
+        PENDING -> ACTIVE from storage's description of the asset (upload notification or
+        Admin API resource). An asset over the size limit is deleted and the row FAILS.
+        """
+        collection = Media.get_pymongo_collection()
+
+        if asset.get("bytes", 0) > settings.UPLOAD_MAX_BYTES:
+            await MediaService.release_assets([media])
+            await collection.update_one(
+                {"_id": media.id, "status": MediaStatus.PENDING.value},
+                {"$set": {"status": MediaStatus.FAILED.value}}
+            )
+            media.status = MediaStatus.FAILED
+            return
+
+        view_link = _view_link(media, asset)
+        media.view_link = view_link
+        media.fill_variant_urls()
+        result = await collection.update_one(
+            {"_id": media.id, "status": MediaStatus.PENDING.value},
+            {"$set": {
+                "status": MediaStatus.ACTIVE.value, "view_link": view_link, "upload_expires_at": None,
+                "variant_urls": media.variant_urls.model_dump()
+            }}
+        )
+        if result.modified_count == 0:
+            return  # Someone else activated it first
+
+        media.status, media.upload_expires_at = MediaStatus.ACTIVE, None
+        # Posts may already reference the PENDING row
+        await refresh_media_snapshots(media)
+        await refresh_covers(media)
+
+    async def reconcile(self) -> int:
+        """
+        Checks pending direct uploads with the storage API: activates those whose asset
+        exists (the callback was lost) and fails those past upload_expires_at. Returns the
+        number of rows checked.
+        """
+        now = datetime.now(timezone.utc)
+        pending = await Media.find({
+            "status": MediaStatus.PENDING.value,
+            "upload_expires_at": {"$type": "date"},
+            "created_at": {"$lt": now - timedelta(seconds=settings.DIRECT_UPLOAD_RECONCILE_AFTER_SECONDS)}
+        }).sort("created_at").limit(settings.DIRECT_UPLOAD_RECONCILE_BATCH).to_list()
+
+        for media in pending:
+            try:
+                asset = await asyncio.to_thread(MediaService.verify_asset_exists, media.public_id, media.file_type.value, media.storage)
+            except Exception as e:
+                logging.warning(f"Could not check direct upload {media.id}: {e}")
+                continue
+
+            expires_at = media.upload_expires_at
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            if asset:
+                await self.activate(media, asset)
+            elif expires_at <= now:
+                await Media.get_pymongo_collection().update_one(
+                    {"_id": media.id, "status": MediaStatus.PENDING.value},
+                    {"$set": {"status": MediaStatus.FAILED.value}}
+                )
+        return len(pending)
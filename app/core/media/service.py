@@ -1,40 +1,88 @@
 # app/posts/services/media_service.py
 from fastapi import HTTPException
 from app.core.services.celery_worker import upload_video_task
-import cloudinary.api
-import cloudinary.uploader
-from cloudinary.exceptions import NotFound
 from app.posts.models import Media, MediaStatus, MediaType
+from app.core.errors import MediaValidationException
+from app.core.media.storage import DEFAULT_BACKEND, get_storage, storage_for
+from app.core.media.dedup import acquire_asset, register_asset, release_assets, share_fields
+from beanie import PydanticObjectId
+from beanie.operators import In
+from typing import Dict, List, Optional, Tuple
 import asyncio
+import hashlib
 import uuid
 import os
 
+# Media that may be attached to a post, story or message (PENDING videos finish uploading later)
+USABLE_MEDIA_STATUSES = (MediaStatus.ACTIVE, MediaStatus.PENDING)
+
 class MediaService:
+    @staticmethod
+    async def resolve_owned_media(owner_id: str, media_ids: List[str]) -> List[Media]:
+        """
+        Loads every requested media item with one query and checks ownership and status in memory.
+        Returns them in request order. If any id is unusable, raises MediaValidationException
+        listing all of them, not just the first.
+        """
+        if not media_ids:
+            return []
+
+        # 1. One round trip for the whole carousel
+        valid_ids = {PydanticObjectId(i) for i in media_ids if PydanticObjectId.is_valid(i)}
+        found = {}
+        if valid_ids:
+            found = {str(m.id): m for m in await Media.find(In(Media.id, list(valid_ids))).to_list()}
+
+        # 2. Check each id; another user's media is reported as not found
+        media_list, errors = [], []
+        for media_id in media_ids:
+            media = found.get(media_id)
+            if not media or media.owner_id != owner_id:
+                errors.append({"media_id": media_id, "reason": "not_found"})
+            elif media.status not in USABLE_MEDIA_STATUSES:
+                errors.append({"media_id": media_id, "reason": f"status_{media.status.value.lower()}"})
+            else:
+                media_list.append(media)
+
+        if errors:
+            invalid = ", ".join(e["media_id"] for e in errors)
+            raise MediaValidationException(f"Invalid or unusable media: {invalid}", errors=errors)
+
+        return media_list
+
     async def upload_image(self, owner_id: str, file_content, filename: str, content_type: str, public_id: str = None):
         """
         Synchronously uploads an image and returns details immediately.
+        An image that is already stored (same SHA-256) is not uploaded again.
         """
         try:
-            # Run blocking Cloudinary upload in a thread
-            def run_upload():
-                return cloudinary.uploader.upload(
-                    file_content,
-                    public_id=public_id,
-                    resource_type="image",
-                    folder="app_uploads"
+            # 1. Reuse the stored file if this content was uploaded before
+            content_hash = await asyncio.to_thread(lambda: hashlib.sha256(file_content).hexdigest())
+            asset = await acquire_asset(content_hash, MediaType.IMAGE)
+
+            if asset is None:
+                # 2. Run the blocking upload in a thread
+                storage = get_storage()
+                stored = await asyncio.to_thread(
+                    storage.put, file_content, f"app_uploads/{public_id or uuid.uuid4()}", MediaType.IMAGE.value, content_type
                 )
-            
-            result = await asyncio.to_thread(run_upload)
+                asset = await register_asset(content_hash, MediaType.IMAGE, storage.name, stored.key, stored.url)
+                if asset is not None and asset.public_id != stored.key:
+                    # Lost a race with an identical upload: keep theirs
+                    await asyncio.to_thread(storage.delete, stored.key, MediaType.IMAGE.value)
 
+            shared = share_fields(asset) if asset else {
+                "public_id": stored.key, "view_link": stored.url, "storage": storage.name
+            }
             new_media = Media(
                 owner_id=owner_id,
                 status=MediaStatus.ACTIVE,
-                public_id=result.get("public_id"),
-                view_link=result.get("secure_url"),
                 media_type=content_type,
                 filename=filename,
-                file_type=MediaType.IMAGE
+                file_type=MediaType.IMAGE,
+                **shared
             )
+            new_media.fill_variant_urls()
             await new_media.save()
 
             return {
@@ -48,11 +96,31 @@ class MediaService:
             print(f"Error uploading image: {e}")
             raise HTTPException(status_code=500, detail="Failed to upload image")
 
-    async def process_video_background(self, file_path: str, owner_id: str, filename: str, content_type: str):
+    async def process_video_background(self, file_path: str, owner_id: str, filename: str, content_type: str, content_hash: Optional[str] = None):
         """
         Creates a PENDING Media record and queues the upload task.
+        A video whose content_hash is already stored becomes ACTIVE right away instead.
         """
         try:
+            # 0. Same content stored before: share it, nothing to upload
+            asset = await acquire_asset(content_hash, MediaType.VIDEO) if content_hash else None
+            if asset is not None:
+                new_media = Media(
+                    owner_id=owner_id,
+                    status=MediaStatus.ACTIVE,
+                    media_type=content_type,
+                    filename=filename,
+                    file_type=MediaType.VIDEO,
+                    **share_fields(asset)
+                )
+                new_media.fill_variant_urls()
+                await new_media.save()
+                await asyncio.to_thread(os.remove, file_path)
+                return {
+                    "message": "Video uploaded successfully",
+                    "media_id": str(new_media.id)
+                }
+
             # 1. Pre-create the Media record
             new_media = Media(
                 owner_id=owner_id,
@@ -69,7 +137,7 @@ class MediaService:
             print(f"Queuing video upload task for media_id: {new_media.id}")
             # Use absolute path to ensure worker finds it regardless of CWD
             abs_path = os.path.abspath(file_path)
-            task = upload_video_task.delay(media_id=str(new_media.id), file_path=abs_path)
+            task = upload_video_task.delay(media_id=str(new_media.id), file_path=abs_path, content_hash=content_hash)
             print(f"Task queued successfully: {task.id}")
             
             return {
@@ -81,21 +149,41 @@ class MediaService:
             raise HTTPException(status_code=500, detail="Failed to queue video processing")
         
     @staticmethod
-    def verify_asset_exists(public_id: str, resource_type: str = "image"):
+    def delete_assets(media: List[Media]):
+        """
+        Deletes the stored files of `media`: one delete_many per storage backend and
+        resource type. Files that are already gone are not an error. Ignores sharing:
+        deletion paths go through release_assets. Blocking; call it with asyncio.to_thread.
+        """
+        keys: Dict[Tuple[str, str], List[str]] = {}
+        for m in media:
+            if m.public_id:
+                keys.setdefault((storage_for(m).name, m.file_type.value), []).append(m.public_id)
+
+        for (backend, kind), ids in keys.items():
+            get_storage(backend).delete_many(ids, kind)
+
+    @staticmethod
+    async def release_assets(media: List[Media]):
+        """
+        Deletes the stored files of `media` that no other Media row shares (see
+        app/core/media/dedup.py). Call it before deleting the Media documents.
+        """
+        dead = await release_assets(media)
+        if dead:
+            await asyncio.to_thread(MediaService.delete_assets, dead)
+
+    @staticmethod
+    def verify_asset_exists(public_id: str, resource_type: str = "image", storage: Optional[str] = None):
         """
-        Verifies if an asset exists in Cloudinary.
-        Returns the asset metadata dict if found.
-        Raises specific exceptions if not.
+        Verifies if an asset exists in storage (`storage` backend, cloudinary by default).
+        Returns the asset metadata dict if found, None if not.
+        Other errors (rate limits, connection errors) are raised.
         """
         try:
-            # api.resource fetches details. If ID doesn't exist, it throws NotFound.
-            result = cloudinary.api.resource(public_id, resource_type=resource_type)
-            return result
-        except NotFound:
-            return None
+            return get_storage(storage or DEFAULT_BACKEND).exists(public_id, resource_type)
         except Exception as e:
-            # Handle rate limits or connection errors distinctively if needed
-            print(f"Cloudinary API Error: {e}")
+            print(f"Storage API Error: {e}")
             raise e
 
     async def get_all_media(self):
@@ -103,8 +191,8 @@ class MediaService:
             return media
 
     async def get_user_media(self, user_id: str):
-        from app.posts.models import Post
-        posts = await Post.find(Post.owner_id == user_id, fetch_links=True).sort("-created_at").to_list()
+        from app.posts.models import LIVE_POSTS, Post
+        posts = await Post.find(Post.owner_id == user_id, LIVE_POSTS, fetch_links=True).sort("-created_at").to_list()
         
         media_list = []
         seen = set()
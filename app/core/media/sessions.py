@@ -0,0 +1,212 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, BinaryIO
+
+from beanie import PydanticObjectId
+from starlette.requests import ClientDisconnect
+
+from app.core.config import settings
+from app.core.errors import FileSizeLimitException, UploadSessionConflictException, UploadSessionNotFoundException
+from app.core.media.service import MediaService
+from app.core.media.uploads import TEMP_UPLOAD_DIR, file_sha256
+from app.posts.models import UploadSession, UploadSessionStatus
+
+# Session files live in their own directory: cleanup_temp_files removes loose files in
+# TEMP_UPLOAD_DIR after a few minutes, far sooner than a paused upload may resume.
+UPLOAD_SESSION_DIR = os.path.join(TEMP_UPLOAD_DIR, "sessions")
+
+
+def _expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS)
+
+
+def _lease() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=settings.UPLOAD_SESSION_WRITE_LEASE_SECONDS)
+
+
+def _create_file(path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+
+def _open_at(path: str, offset: int) -> BinaryIO:
+    # Anything past the stored offset is a chunk whose offset was never recorded; drop it
+    f = open(path, "r+b")
+    f.truncate(offset)
+    f.seek(offset)
+    return f
+
+
+class UploadSessionService:
+    """
+    Resumable uploads, tus-style: create a session with the total length, append byte
+    ranges at the session's current offset (a dropped connection keeps what arrived),
+    then finalize, which queues the file like a one-shot video upload.
+    """
+
+    async def create_session(self, owner_id: str, filename: str, content_type: str, length: int) -> UploadSession:
+        if length > settings.UPLOAD_MAX_BYTES:
+            raise FileSizeLimitException(f"File too large (max {settings.UPLOAD_MAX_BYTES // (1024 * 1024)}MB)")
+
+        path = os.path.abspath(os.path.join(UPLOAD_SESSION_DIR, uuid.uuid4().hex))
+        await asyncio.to_thread(_create_file, path)
+
+        session = UploadSession(
+            owner_id=owner_id,
+            filename=os.path.basename(filename) or "upload",
+            content_type=content_type,
+            length=length,
+            path=path,
+            expires_at=_expiry()
+        )
+        await session.insert()
+        return session
+
+    async def get_session(self, owner_id: str, session_id: str) -> UploadSession:
+        """
+        The caller's session. Expired sessions count as missing even before the TTL
+        monitor (which runs about once a minute) removes them.
+        """
+        if not PydanticObjectId.is_valid(session_id):
+            raise UploadSessionNotFoundException()
+        session = await UploadSession.get(PydanticObjectId(session_id))
+        expires_at = session.expires_at if session else None
+        if expires_at is not None and expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if not session or session.owner_id != owner_id or expires_at <= datetime.now(timezone.utc):
+            raise UploadSessionNotFoundException()
+        return session
+
+    async def append(self, owner_id: str, session_id: str, offset: int, chunks: AsyncIterator[bytes]) -> UploadSession:
+        """
+        Writes the request body at `offset`, which must be the session's current offset.
+        If the client disconnects half-way, the bytes that arrived are kept and counted.
+
+        The request holds the session's write lease while it writes, so a concurrent
+        append can't touch the file. No upload_slot: the body arrives in bounded chunks,
+        and a slow client would hold a slot for as long as it takes to send them.
+        """
+        session = await self.get_session(owner_id, session_id)
+
+        # 1. The client must continue exactly where the server stopped
+        if session.status != UploadSessionStatus.UPLOADING:
+            raise UploadSessionConflictException("Upload already finalized")
+        if offset != session.offset:
+            raise UploadSessionConflictException(f"Expected offset {session.offset}, got {offset}")
+
+        # 2. Claim the session before touching the file
+        collection = UploadSession.get_pymongo_collection()
+        token = uuid.uuid4().hex
+        now = datetime.now(timezone.utc)
+        result = await collection.update_one(
+            {
+                "_id": session.id, "offset": offset, "status": UploadSessionStatus.UPLOADING.value,
+                "$or": [{"writing_until": None}, {"writing_until": {"$lt": now}}]
+            },
+            {"$set": {"writer": token, "writing_until": _lease()}}
+        )
+        if result.matched_count == 0:
+            raise UploadSessionConflictException("Another chunk is being written; fetch the offset and retry")
+
+        async def write(f, data: bytes):
+            # A writer that stalled past its lease may have been replaced: stop before writing
+            renewed = await collection.update_one(
+                {"_id": session.id, "writer": token}, {"$set": {"writing_until": _lease()}}
+            )
+            if renewed.matched_count == 0:
+                raise UploadSessionConflictException("The session changed during the upload; fetch its offset and retry")
+            await asyncio.to_thread(f.write, data)
+
+        try:
+            # 3. Stream the body to disk in UPLOAD_CHUNK_SIZE writes
+            written = 0
+            f = await asyncio.to_thread(_open_at, session.path, offset)
+            try:
+                buffer = bytearray()
+                try:
+                    async for chunk in chunks:
+                        if offset + written + len(buffer) + len(chunk) > session.length:
+                            raise FileSizeLimitException(f"Chunk runs past the declared length of {session.length} bytes")
+                        buffer += chunk
+                        if len(buffer) >= settings.UPLOAD_CHUNK_SIZE:
+                            await write(f, bytes(buffer))
+                            written += len(buffer)
+                            buffer.clear()
+                except ClientDisconnect:
+                    pass
+                if buffer:
+                    await write(f, bytes(buffer))
+                    written += len(buffer)
+            finally:
+                await asyncio.to_thread(f.close)
+
+            # 4. Record the new offset and give the lease back
+            result = await collection.update_one(
+                {"_id": session.id, "writer": token},
+                {"$set": {"offset": offset + written, "expires_at": _expiry(), "writer": None, "writing_until": None}}
+            )
+            if result.matched_count == 0:
+                raise UploadSessionConflictException("The session changed during the upload; fetch its offset and retry")
+        except BaseException:
+            # The offset stays where it was; the next append truncates what this one wrote
+            await collection.update_one(
+                {"_id": session.id, "writer": token}, {"$set": {"writer": None, "writing_until": None}}
+            )
+            raise
+
+        session.offset += written
+        return session
+
+    async def finalize(self, owner_id: str, session_id: str) -> dict:
+        """
+        Queues the complete file for the video upload task, exactly like
+        MediaService.process_video_background does for a one-shot upload. Repeating the
+        call returns the same media_id.
+        """
+        session = await self.get_session(owner_id, session_id)
+
+        if session.status == UploadSessionStatus.FINALIZED:
+            if session.media_id:
+                return {"message": "Video processing has been queued.", "media_id": session.media_id}
+            raise UploadSessionConflictException("Upload is being finalized")
+        if session.offset != session.length:
+            raise UploadSessionConflictException(f"Upload incomplete: {session.offset} of {session.length} bytes received")
+
+        # 1. Only one finalize request gets past this (and not while a chunk is being written)
+        collection = UploadSession.get_pymongo_collection()
+        result = await collection.update_one(
+            {
+                "_id": session.id, "status": UploadSessionStatus.UPLOADING.value, "offset": session.length,
+                "$or": [{"writer": None}, {"writing_until": {"$lt": datetime.now(timezone.utc)}}]
+            },
+            {"$set": {"status": UploadSessionStatus.FINALIZED.value}}
+        )
+        if result.modified_count == 0:
+            raise UploadSessionConflictException("Upload is being finalized")
+
+        try:
+            # 2. Hash for deduplication (chunks arrive over several requests, so it's done here)
+            content_hash = await asyncio.to_thread(file_sha256, session.path)
+
+            # 3. Hand off to Celery; the task deletes the file once it's stored
+            response = await MediaService().process_video_background(
+                file_path=session.path,
+                owner_id=owner_id,
+                filename=session.filename,
+                content_type=session.content_type,
+                content_hash=content_hash
+            )
+        except BaseException:
+            # Nothing was handed off: let the client retry the finalize
+            await collection.update_one(
+                {"_id": session.id, "status": UploadSessionStatus.FINALIZED.value, "media_id": None},
+                {"$set": {"status": UploadSessionStatus.UPLOADING.value}}
+            )
+            raise
+
+        await collection.update_one(
+            {"_id": session.id}, {"$set": {"media_id": response["media_id"]}}
+        )
+        return response
@@ -0,0 +1,220 @@
+import mimetypes
+import os
+import shutil
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import cloudinary.api
+import cloudinary.uploader
+from cloudinary.exceptions import NotFound
+from cloudinary.utils import cloudinary_url
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from app.core.config import configure_cloudinary, settings
+from app.core.media.cloudinary_utils import generate_hls_url, generate_optimized_mp4_url, generate_thumbnail_url
+
+# Media.storage of rows written before backends were pluggable
+DEFAULT_BACKEND = "cloudinary"
+
+# URL variants every backend answers; a backend without a variant returns ""
+VARIANTS = ("original", "hls", "optimized", "thumbnail")
+
+
+@dataclass
+class StoredObject:
+    """
+    What a backend stored: `key` goes into Media.public_id, `url` into Media.view_link.
+    """
+    key: str
+    url: str
+    bytes: int
+
+
+class StorageBackend(ABC):
+    """
+    Where media files live. `kind` is "image" or "video" (MediaType values). Every method
+    blocks on I/O; call them with asyncio.to_thread from async code.
+    """
+    name: str
+
+    @abstractmethod
+    def put(self, data: bytes, key: str, kind: str, content_type: Optional[str] = None) -> StoredObject:
+        ...
+
+    @abstractmethod
+    def put_large(self, path: str, key: str, kind: str, content_type: Optional[str] = None) -> StoredObject:
+        """
+        Stores a file from disk without reading it into memory.
+        """
+
+    def delete(self, key: str, kind: str):
+        self.delete_many([key], kind)
+
+    @abstractmethod
+    def delete_many(self, keys: List[str], kind: str):
+        """
+        Deletes every key; keys that are already gone are not an error.
+        """
+
+    @abstractmethod
+    def exists(self, key: str, kind: str) -> Optional[dict]:
+        """
+        The object's metadata ("public_id", "secure_url", "bytes") or None.
+        """
+
+    @abstractmethod
+    def url_for(self, key: str, kind: str, variant: str = "original") -> str:
+        ...
+
+
+class CloudinaryStorage(StorageBackend):
+    name = "cloudinary"
+
+    # delete_resources accepts at most this many public_ids per call
+    DELETE_BATCH_SIZE = 100
+
+    def put(self, data: bytes, key: str, kind: str, content_type: Optional[str] = None) -> StoredObject:
+        configure_cloudinary()
+        result = cloudinary.uploader.upload(data, public_id=key, resource_type=kind)
+        return StoredObject(key=result.get("public_id"), url=result.get("secure_url"), bytes=result.get("bytes", len(data)))
+
+    def put_large(self, path: str, key: str, kind: str, content_type: Optional[str] = None) -> StoredObject:
+        configure_cloudinary()
+        # Chunked upload API: the file is sent in 6MB parts
+        result = cloudinary.uploader.upload_large(path, public_id=key, resource_type=kind, chunk_size=6000000)
+        return StoredObject(key=result.get("public_id"), url=result.get("secure_url"), bytes=result.get("bytes", 0))
+
+    def delete_many(self, keys: List[str], kind: str):
+        configure_cloudinary()
+        for i in range(0, len(keys), self.DELETE_BATCH_SIZE):
+            cloudinary.api.delete_resources(keys[i:i + self.DELETE_BATCH_SIZE], resource_type=kind)
+
+    def exists(self, key: str, kind: str) -> Optional[dict]:
+        configure_cloudinary()
+        try:
+            return cloudinary.api.resource(key, resource_type=kind)
+        except NotFound:
+            return None
+
+    def url_for(self, key: str, kind: str, variant: str = "original") -> str:
+        if kind != "video" or variant == "original":
+            url, _ = cloudinary_url(key, resource_type=kind, secure=True)
+            return url
+        return {
+            "hls": generate_hls_url,
+            "optimized": generate_optimized_mp4_url,
+            "thumbnail": generate_thumbnail_url
+        }[variant](key)
+
+
+class LocalStorage(StorageBackend):
+    """
+    Files under LOCAL_STORAGE_DIR, served by `router` (Range requests included, so
+    videos seek). No transcoding: videos have no HLS or thumbnail variant and the
+    optimized variant is the original file.
+    """
+    name = "local"
+
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, key: str, kind: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, kind, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Storage key escapes the storage root: {key}")
+        return path
+
+    @staticmethod
+    def _with_extension(key: str, content_type: Optional[str], source_name: str = "") -> str:
+        # The extension lets the file server send the right Content-Type
+        ext = os.path.splitext(source_name)[1] or mimetypes.guess_extension(content_type or "") or ""
+        return key + ext
+
+    def put(self, data: bytes, key: str, kind: str, content_type: Optional[str] = None) -> StoredObject:
+        key = self._with_extension(key, content_type)
+        path = self._path(key, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return StoredObject(key=key, url=self.url_for(key, kind), bytes=len(data))
+
+    def put_large(self, path: str, key: str, kind: str, content_type: Optional[str] = None) -> StoredObject:
+        key = self._with_extension(key, content_type, path)
+        target = self._path(key, kind)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # A rename when the temp file is on the same filesystem
+        shutil.move(path, target)
+        return StoredObject(key=key, url=self.url_for(key, kind), bytes=os.path.getsize(target))
+
+    def delete_many(self, keys: List[str], kind: str):
+        for key in keys:
+            try:
+                os.remove(self._path(key, kind))
+            except FileNotFoundError:
+                pass
+
+    def exists(self, key: str, kind: str) -> Optional[dict]:
+        path = self._path(key, kind)
+        if not os.path.isfile(path):
+            return None
+        return {"public_id": key, "secure_url": self.url_for(key, kind), "bytes": os.path.getsize(path)}
+
+    def url_for(self, key: str, kind: str, variant: str = "original") -> str:
+        if kind == "video" and variant in ("hls", "thumbnail"):
+            return ""
+        return f"{self.base_url}/{kind}/{key}"
+
+
+_backends: Dict[str, StorageBackend] = {}
+
+
+def get_storage(name: Optional[str] = None) -> StorageBackend:
+    """
+    The backend called `name`, or STORAGE_BACKEND (where new uploads go).
+    """
+    name = name or settings.STORAGE_BACKEND
+    if name not in _backends:
+        if name == CloudinaryStorage.name:
+            _backends[name] = CloudinaryStorage()
+        elif name == LocalStorage.name:
+            _backends[name] = LocalStorage(settings.LOCAL_STORAGE_DIR, settings.LOCAL_STORAGE_BASE_URL)
+        else:
+            raise ValueError(f"Unknown storage backend: {name}")
+    return _backends[name]
+
+
+@lru_cache(maxsize=settings.MEDIA_VARIANT_URL_CACHE_SIZE)
+def cached_variant_url(storage: str, key: str, kind: str, variant: str) -> str:
+    """
+    url_for, memoized: variant URLs depend only on these arguments, and building a
+    Cloudinary one (transformations, signing) is far slower than a cache hit.
+    """
+    return get_storage(storage).url_for(key, kind, variant)
+
+
+def storage_for(media) -> StorageBackend:
+    """
+    The backend holding a Media document's file.
+    """
+    return get_storage(getattr(media, "storage", None) or DEFAULT_BACKEND)
+
+
+# Serves LocalStorage files; mounted at the root (see LOCAL_STORAGE_BASE_URL)
+router = APIRouter(prefix="/media", tags=["media"])
+
+
+@router.get("/{kind}/{key:path}", include_in_schema=False)
+async def local_media_file(kind: str, key: str):
+    storage = get_storage(LocalStorage.name)
+    try:
+        path = storage._path(key, kind)
+    except ValueError:
+        raise HTTPException(status_code=404)
+    if kind not in ("image", "video") or not os.path.isfile(path):
+        raise HTTPException(status_code=404)
+    # FileResponse answers Range requests with 206 Partial Content
+    return FileResponse(path)
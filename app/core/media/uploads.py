@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from fastapi import UploadFile
+
+from app.core.config import settings
+from app.core.errors import FileSizeLimitException, UploadCapacityException
+
+TEMP_UPLOAD_DIR = ".temp_uploads"
+
+# Uploads being written to disk at once per process. Each one holds a worker thread
+# for the copy, so without a cap a burst of large videos starves the default executor.
+_slots = asyncio.Semaphore(settings.UPLOAD_MAX_CONCURRENT)
+
+
+@dataclass
+class TempUpload:
+    """
+    A file written to TEMP_UPLOAD_DIR by save_upload.
+    """
+    path: str
+    size: int
+    sha256: str
+
+
+@asynccontextmanager
+async def upload_slot():
+    """
+    Holds one of the process's UPLOAD_MAX_CONCURRENT upload slots. A request that can't
+    get one within UPLOAD_SLOT_WAIT_SECONDS gets UploadCapacityException.
+    """
+    try:
+        await asyncio.wait_for(_slots.acquire(), timeout=settings.UPLOAD_SLOT_WAIT_SECONDS)
+    except asyncio.TimeoutError:
+        raise UploadCapacityException()
+    try:
+        yield
+    finally:
+        _slots.release()
+
+
+def temp_upload_path(filename: str) -> str:
+    # basename: the client controls filename, it must not pick the directory
+    return os.path.join(TEMP_UPLOAD_DIR, f"{uuid.uuid4()}_{os.path.basename(filename or 'upload')}")
+
+
+def _copy_limited(source: BinaryIO, path: str, max_bytes: int, chunk_size: int) -> TempUpload:
+    """
+    Copies `source` to `path` chunk by chunk, hashing as it goes, and stops as soon as
+    more than `max_bytes` have been read. Blocking; run it in a thread.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, "wb") as out:
+            while chunk := source.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise FileSizeLimitException(f"File too large (max {max_bytes // (1024 * 1024)}MB)")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        # Never leave a partial file behind for cleanup_temp_files to find
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return TempUpload(path=path, size=size, sha256=digest.hexdigest())
+
+
+def file_sha256(path: str) -> str:
+    """
+    SHA-256 of a file on disk, read in UPLOAD_CHUNK_SIZE chunks. Blocking; run it in a thread.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(settings.UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def save_upload(file: UploadFile, max_bytes: int = None) -> TempUpload:
+    """
+    Streams an uploaded file to TEMP_UPLOAD_DIR off the event loop, enforcing the size
+    limit while copying (file.size is None for chunked requests) and computing the
+    file's SHA-256 on the way.
+
+    Holds an upload_slot while copying.
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+
+    # 1. Reject up front when the size is already known
+    if file.size and file.size > max_bytes:
+        raise FileSizeLimitException(f"File too large (max {max_bytes // (1024 * 1024)}MB)")
+
+    # 2. Copy in a worker thread: one thread hop for the whole file, not one per chunk
+    async with upload_slot():
+        os.makedirs(TEMP_UPLOAD_DIR, exist_ok=True)
+        return await asyncio.to_thread(
+            _copy_limited, file.file, temp_upload_path(file.filename), max_bytes, settings.UPLOAD_CHUNK_SIZE
+        )
@@ -0,0 +1,25 @@
+from typing import Any, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson, for payloads that are already plain dicts
+    (e.g. PostHydrator.hydrate_dicts).
+
+    FastAPI doesn't validate or re-serialize a returned Response, so the route's
+    response_model only documents the shape; build the content accordingly.
+    Aware UTC datetimes are written with a "Z" suffix, as pydantic does.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def page_response(items: list, next_cursor: Optional[str], **extra: Any) -> FastJSONResponse:
+    """
+    A cursor page ({"items", "next_cursor"} plus any extra keys) as a FastJSONResponse.
+    """
+    return FastJSONResponse({"items": items, "next_cursor": next_cursor, **extra})
@@ -1,17 +1,22 @@
 from asgiref.sync import async_to_sync
 from celery import Celery
 from .mail import create_message, mail
-from typing import List
+from contextlib import asynccontextmanager
+from typing import List, Optional
 from pydantic import EmailStr
-import cloudinary.uploader
 import os
 import asyncio
 from pymongo import AsyncMongoClient
 import time
+import uuid
 from beanie import init_beanie, PydanticObjectId
 from app.core.config import settings, configure_cloudinary
 import certifi
-from app.posts.models import Media, MediaStatus, MediaType
+from app.posts.models import Media, MediaAsset, MediaStatus, MediaType, Post
+from app.core.media.storage import get_storage
+from app.posts.snapshots import refresh_media_snapshots
+from app.posts.grid import refresh_covers
+from app.discovery.models import Location
 from app.stories.models import Story, StoryView
 from datetime import datetime, timezone
 
@@ -19,23 +24,49 @@ from datetime import datetime, timezone
 c_app = Celery("social_media_api")
 c_app.config_from_object("app.core.config")
 
-async def _update_media_status(media_id: str, public_id: str, view_link: str):
-    """Helper to update Beanie document from sync Celery task"""
+@asynccontextmanager
+async def _database(document_models: List[type]):
+    """
+    Connects Beanie for one task run (tasks run in their own event loop, so they can't
+    share the app's client) and closes the client when the block exits.
+    """
     mongo_options = {}
     if settings.VALIDATE_CERTS and "localhost" not in settings.MONGODB_URL and "127.0.0.1" not in settings.MONGODB_URL:
         mongo_options["tlsCAFile"] = certifi.where()
         mongo_options["tls"] = True
-        
+
     client = AsyncMongoClient(settings.MONGODB_URL, **mongo_options)
-    await init_beanie(database=client[settings.DB_NAME], document_models=[Media])
-    
-    media = await Media.get(PydanticObjectId(media_id))
-    if media:
-        media.public_id = public_id
-        media.view_link = view_link
-        media.status = MediaStatus.ACTIVE
-        await media.save()
-    await client.close()
+    try:
+        await init_beanie(database=client[settings.DB_NAME], document_models=document_models)
+        yield client
+    finally:
+        await client.close()
+
+async def _update_media_status(media_id: str, public_id: str, view_link: str, storage: str, content_hash: Optional[str] = None):
+    """Helper to update Beanie document from sync Celery task.
+    Registers the file for sharing when its content_hash is known (keeping an identical
+    upload's file instead if that one registered first).
+    Also refreshes the media snapshots and grid covers of posts created while the video was PENDING."""
+    from app.core.media.dedup import register_asset, share_fields
+
+    async with _database([Media, MediaAsset, Post, Location]):
+        media = await Media.get(PydanticObjectId(media_id))
+        if media:
+            media.public_id = public_id
+            media.view_link = view_link
+            media.storage = storage
+            if content_hash:
+                asset = await register_asset(content_hash, MediaType.VIDEO, storage, public_id, view_link)
+                if asset is not None:
+                    if asset.public_id != public_id:
+                        await asyncio.to_thread(get_storage(storage).delete, public_id, MediaType.VIDEO.value)
+                    for name, value in share_fields(asset).items():
+                        setattr(media, name, value)
+            media.status = MediaStatus.ACTIVE
+            media.fill_variant_urls()
+            await media.save()
+            await refresh_media_snapshots(media)
+            await refresh_covers(media)
 
 @c_app.task()
 def send_email(recipients: List[EmailStr], subject: str, template_body: dict, template_name):
@@ -44,7 +75,7 @@ def send_email(recipients: List[EmailStr], subject: str, template_body: dict, te
     print("Email sent successfully")
 
 @c_app.task()
-def upload_video_task(media_id: str, file_path: str):
+def upload_video_task(media_id: str, file_path: str, content_hash: Optional[str] = None):
     """
     Celery task to upload a video.
     """
@@ -60,23 +91,17 @@ def upload_video_task(media_id: str, file_path: str):
                 print(f"Directory {dir_path} does not exist")
 
         print(f"Starting background upload for media_id: {media_id}")
-        configure_cloudinary()
-        # Use upload_large for better video handling
-        result = cloudinary.uploader.upload_large(
-            file_path,
-            resource_type="video",
-            folder="app_videos",
-            chunk_size=6000000
-        )
+        # put_large streams the file (chunked upload on Cloudinary)
+        storage = get_storage()
+        stored = storage.put_large(file_path, f"app_videos/{uuid.uuid4()}", MediaType.VIDEO.value)
         
-        video_url = result.get("secure_url")
-        # Use thumbnail URL for view_link so StoryTray displays an image
-        thumbnail_url = video_url.rsplit('.', 1)[0] + '.jpg'
+        # Use thumbnail URL for view_link so StoryTray displays an image (when the backend makes one)
+        thumbnail_url = storage.url_for(stored.key, MediaType.VIDEO.value, "thumbnail") or stored.url
         
         # Update the pre-created media record
-        asyncio.run(_update_media_status(media_id, result.get("public_id"), thumbnail_url))
+        asyncio.run(_update_media_status(media_id, stored.key, thumbnail_url, storage.name, content_hash))
         
-        print(f"Background upload complete: {video_url}")
+        print(f"Background upload complete: {stored.url}")
         
     except Exception as e:
         print(f"Background task failed: {e}")
@@ -111,6 +136,20 @@ def cleanup_temp_files():
         except Exception as e:
             print(f"Error deleting stale file {filename}: {e}")
 
+    # Resumable upload files. Sessions themselves expire through their TTL index after
+    # UPLOAD_SESSION_TTL_SECONDS idle, and every chunk touches the file, so a file idle
+    # that long no longer has a session
+    sessions_dir = os.path.join(temp_dir, "sessions")
+    if os.path.isdir(sessions_dir):
+        for filename in os.listdir(sessions_dir):
+            file_path = os.path.join(sessions_dir, filename)
+            try:
+                if current_time - os.path.getmtime(file_path) > settings.UPLOAD_SESSION_TTL_SECONDS:
+                    os.remove(file_path)
+                    count += 1
+            except Exception as e:
+                print(f"Error deleting expired upload session file {filename}: {e}")
+
 @c_app.task
 def cleanup_expired_stories():
     """
@@ -120,15 +159,9 @@ def cleanup_expired_stories():
     async_to_sync(_cleanup_expired_stories_async)()
 
 async def _cleanup_expired_stories_async():
-    mongo_options = {}
-    if settings.VALIDATE_CERTS and "localhost" not in settings.MONGODB_URL and "127.0.0.1" not in settings.MONGODB_URL:
-        mongo_options["tlsCAFile"] = certifi.where()
-        mongo_options["tls"] = True
-        
-    client = AsyncMongoClient(settings.MONGODB_URL, **mongo_options)
-    try:
-        await init_beanie(database=client[settings.DB_NAME], document_models=[Media, Story, StoryView])
-        
+    from app.core.media.service import MediaService
+
+    async with _database([Media, MediaAsset, Story, StoryView]):
         now = datetime.now(timezone.utc)
         # Find stories where expires_at <= now
         expired_stories = await Story.find(Story.expires_at <= now, fetch_links=True).to_list()
@@ -142,21 +175,152 @@ async def _cleanup_expired_stories_async():
             # Delete associated data
             await StoryView.find(StoryView.story_id == str(story.id)).delete()
             
-            # Fetch and delete media from Cloudinary
+            # Fetch and delete media from storage (shared files only when unused)
             media = await story.media.fetch()
             if media and media.public_id:
                 try:
-                    configure_cloudinary()
-                    resource_type = "video" if media.file_type == MediaType.VIDEO else "image"
-                    cloudinary.uploader.destroy(media.public_id, resource_type=resource_type)
-                    print(f"Deleted Cloudinary asset: {media.public_id}")
+                    await MediaService.release_assets([media])
+                    print(f"Released stored asset: {media.public_id}")
                 except Exception as e:
-                    print(f"Cloudinary delete failed for {media.public_id}: {e}")
+                    print(f"Storage delete failed for {media.public_id}: {e}")
                 
                 await media.delete()
 
             await story.delete()
             print(f"Deleted story {story.id} and its associated media.")
 
-    finally:
-        client.close()
\ No newline at end of file
+@c_app.task
+def process_post_outbox(event_ids: List[str]):
+    """
+    Runs hashtags, mention notifications and timeline fan-out for freshly created posts.
+    Queued by PostService.create_post right after the post is written.
+    """
+    async_to_sync(_process_post_outbox_async)(event_ids)
+
+@c_app.task
+def sweep_post_outbox():
+    """
+    Periodic safety net: processes outbox events that were never queued, whose
+    worker died (lease expired) or whose last attempt failed.
+    """
+    async_to_sync(_process_post_outbox_async)(None)
+
+async def _process_post_outbox_async(event_ids: Optional[List[str]]):
+    from app.core.db.models import User, UserFollows
+    from app.discovery.models import Hashtag, PostTag
+    from app.feed.models import TimelineEntry
+    from app.notification.models import Notification
+    from app.posts.models import PostOutboxEvent
+    from app.posts.outbox import PostOutboxProcessor
+
+    async with _database([
+        User, UserFollows, Post, Media, Location, Hashtag, PostTag,
+        Notification, TimelineEntry, PostOutboxEvent
+    ]):
+        processor = PostOutboxProcessor()
+        if event_ids is not None:
+            await processor.process(await processor.claim(event_ids))
+            return
+
+        # Drain the backlog one batch at a time, bounded so a sweep can't run forever
+        for _ in range(settings.OUTBOX_SWEEP_MAX_BATCHES):
+            events = await processor.claim()
+            if not events:
+                break
+            await processor.process(events)
+
+@c_app.task
+def purge_posts(job_ids: List[str]):
+    """
+    Removes what deleted posts leave behind. Queued by PostService.delete_post right
+    after the post is marked deleted.
+    """
+    async_to_sync(_purge_posts_async)(job_ids)
+
+@c_app.task
+def sweep_post_purge():
+    """
+    Periodic safety net: resumes purge jobs that were never queued, whose worker died
+    (lease expired) or whose last attempt failed, and purges shares of deleted posts.
+    """
+    async_to_sync(_purge_posts_async)(None)
+
+async def _purge_posts_async(job_ids: Optional[List[str]]):
+    from app.discovery.models import Hashtag, PostTag
+    from app.engagement.models import Bookmark, Comment, CommentLike, PostLike
+    from app.feed.models import TimelineEntry
+    from app.posts.models import PostPurgeJob
+    from app.posts.purge import PostPurgeProcessor
+
+    async with _database([
+        Post, Media, MediaAsset, Location, Hashtag, PostTag, PostLike, Bookmark, Comment, CommentLike,
+        TimelineEntry, PostPurgeJob
+    ]):
+        processor = PostPurgeProcessor()
+        if job_ids is not None:
+            await processor.process(await processor.claim(job_ids))
+            return
+
+        # Bounded, like the outbox sweep
+        for _ in range(settings.PURGE_SWEEP_MAX_BATCHES):
+            jobs = await processor.claim()
+            if not jobs:
+                break
+            await processor.process(jobs)
+
+@c_app.task
+def delete_account_data(job_ids: List[str]):
+    """
+    Removes what a deleted account leaves behind. Queued by UserService.delete_user
+    right after the user document is deleted.
+    """
+    async_to_sync(_delete_accounts_async)(job_ids)
+
+@c_app.task
+def sweep_account_deletions():
+    """
+    Periodic safety net: resumes account deletions that were never queued, whose worker
+    died (lease expired) or whose last attempt failed.
+    """
+    async_to_sync(_delete_accounts_async)(None)
+
+async def _delete_accounts_async(job_ids: Optional[List[str]]):
+    from app.core.auth.deletion import AccountDeletionProcessor
+    from app.core.db.models import AccountDeletionJob, User, UserBlocks, UserFollows
+    from app.engagement.models import Bookmark, Comment, CommentLike, PostLike
+    from app.feed.models import TimelineEntry
+    from app.messenger.models import Conversation, Message
+    from app.notification.models import Notification
+    from app.posts.models import PostPurgeJob
+
+    async with _database([
+        User, UserFollows, UserBlocks, AccountDeletionJob, Post, Media, MediaAsset, Location, PostPurgeJob,
+        PostLike, Comment, CommentLike, Bookmark, TimelineEntry, Story, StoryView,
+        Notification, Conversation, Message
+    ]):
+        processor = AccountDeletionProcessor()
+        if job_ids is not None:
+            await processor.process(await processor.claim(job_ids))
+            return
+
+        # One account per claim; bounded so a backlog doesn't pin the worker
+        for _ in range(settings.ACCOUNT_DELETION_SWEEP_MAX_ACCOUNTS):
+            jobs = await processor.claim()
+            if not jobs:
+                break
+            await processor.process(jobs)
+
+@c_app.task
+def reconcile_direct_uploads():
+    """
+    Activates client-direct uploads whose storage callback never arrived and fails the
+    ones that were never uploaded.
+    """
+    async_to_sync(_reconcile_direct_uploads_async)()
+
+async def _reconcile_direct_uploads_async():
+    from app.core.media.direct import DirectUploadService
+
+    async with _database([Media, MediaAsset, Post, Location]):
+        configure_cloudinary()
+        await DirectUploadService().reconcile()
@@ -4,19 +4,19 @@ from ..config import settings
 JTI_EXPIRY = settings.JTI_EXPIRY
 
 
-# Use settings from config
-pool = redis.ConnectionPool(
-    host=settings.REDIS_HOST,
-    port=int(settings.REDIS_PORT),
-    db=settings.REDIS_DB,
-    decode_responses=settings.DECODE_RESPONSES,
-    username=settings.REDIS_USERNAME,
-    password=settings.REDIS_PASSWORD,
-    max_connections=10,  # <--- THIS IS THE KEY FIX
-)
+# Shared client for the app process: blocklist, graph cache, post cache (including its
+# pub/sub listener, which holds one connection for good) and feed warm-up. Connections
+# are opened lazily on first command, so importing this module never opens one. When
+# all are busy a command waits for one (up to REDIS_POOL_TIMEOUT) instead of failing.
+redis_client = redis.Redis(connection_pool=redis.BlockingConnectionPool.from_url(
+    settings.redis_url,
+    decode_responses=True,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+))
 
-# 2. Initialize the Redis client using that pool
-token_blocklist = redis.Redis(connection_pool=pool)
+# The blocklist predates the shared client and keeps its name
+token_blocklist = redis_client
 async def add_jti_to_blocklist(jti: str):
     await token_blocklist.set(name=jti, value="1", ex=JTI_EXPIRY)
 
@@ -0,0 +1,141 @@
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Awaitable, Callable, List, Optional, Set, Type, TypeVar
+
+from beanie import Document, PydanticObjectId
+from pymongo.errors import OperationFailure
+
+# Job documents (PostOutboxEvent, PostPurgeJob, ...) share these fields:
+#   status, completed_steps, attempts, lock_token, locked_until, last_error, created_at, processed_at
+# and are processed in leased batches: a claimed job is invisible to other workers until its
+# lease runs out, so a crashed worker's jobs simply become due again.
+
+J = TypeVar("J", bound=Document)
+
+# Server error code for "Transaction numbers are only allowed on a replica set member or mongos"
+_TRANSACTIONS_UNSUPPORTED = 20
+
+
+class JobStatus(str, Enum):
+    PENDING = "PENDING"   # Waiting for (or being retried by) a worker
+    DONE = "DONE"         # Every step completed
+    FAILED = "FAILED"     # Gave up after the job's max attempts
+
+
+async def run_in_transaction(client, write: Callable[[Optional[object]], Awaitable[None]]):
+    """
+    Runs write(session) in a transaction. Transactions need a replica set (Atlas always
+    is one); on a standalone server write(None) runs without one, so order the writes
+    so that a partial write is harmless.
+    """
+    try:
+        async with client.start_session() as session:
+            await session.with_transaction(write)
+    except OperationFailure as e:
+        if e.code != _TRANSACTIONS_UNSUPPORTED:
+            raise
+        await write(None)
+
+
+async def claim_jobs(
+    model: Type[J],
+    lease_seconds: int,
+    limit: int,
+    job_ids: Optional[List[str]] = None,
+    min_age_seconds: int = 0
+) -> List[J]:
+    """
+    Leases up to `limit` due jobs, oldest first (or just `job_ids`, if they're due).
+    `min_age_seconds` leaves fresh jobs to the task queued for them.
+    """
+    now = datetime.now(timezone.utc)
+    due = {
+        "status": JobStatus.PENDING.value,
+        "$or": [{"locked_until": None}, {"locked_until": {"$lt": now}}]
+    }
+    if job_ids is not None:
+        due["_id"] = {"$in": [PydanticObjectId(i) for i in job_ids if PydanticObjectId.is_valid(i)]}
+    elif min_age_seconds:
+        due["created_at"] = {"$lt": now - timedelta(seconds=min_age_seconds)}
+
+    # 1. Pick candidates, oldest first
+    collection = model.get_pymongo_collection()
+    cursor = collection.find(due, {"_id": 1}).sort("created_at", 1).limit(limit)
+    ids = [doc["_id"] async for doc in cursor]
+    if not ids:
+        return []
+
+    # 2. Lease them; the due filter is repeated so a concurrent claimer can't take the same job
+    token = uuid.uuid4().hex
+    await collection.update_many(
+        {**due, "_id": {"$in": ids}},
+        {
+            "$set": {"lock_token": token, "locked_until": now + timedelta(seconds=lease_seconds)},
+            "$inc": {"attempts": 1}
+        }
+    )
+
+    # 3. Whatever carries our token is ours
+    return await model.find({"lock_token": token}).to_list()
+
+
+async def extend_lease(model: Type[J], job: J, lease_seconds: int):
+    """
+    Pushes out the lease of a long-running job; call it between batches.
+    """
+    await model.get_pymongo_collection().update_one(
+        {"_id": job.id, "lock_token": job.lock_token},
+        {"$set": {"locked_until": datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)}}
+    )
+
+
+async def mark_step(model: Type[J], jobs: List[J], step: Enum):
+    """
+    Records a finished step so a retried job doesn't redo it.
+    """
+    if not jobs:
+        return
+    for job in jobs:
+        job.completed_steps.append(step)
+    await model.get_pymongo_collection().update_many(
+        {"_id": {"$in": [job.id for job in jobs]}},
+        {"$addToSet": {"completed_steps": step.value}}
+    )
+
+
+async def finish_jobs(model: Type[J], jobs: List[J]):
+    if not jobs:
+        return
+    await model.get_pymongo_collection().update_many(
+        {"_id": {"$in": [job.id for job in jobs]}},
+        {
+            "$set": {"status": JobStatus.DONE.value, "processed_at": datetime.now(timezone.utc), "last_error": None},
+            "$unset": {"lock_token": "", "locked_until": ""}
+        }
+    )
+
+
+async def fail_jobs(model: Type[J], jobs: List[J], error: str, max_attempts: int):
+    """
+    Releases the lease so the next sweep retries, or gives up after `max_attempts`.
+    """
+    retry: Set[PydanticObjectId] = {job.id for job in jobs if job.attempts < max_attempts}
+    give_up = [job.id for job in jobs if job.id not in retry]
+    collection = model.get_pymongo_collection()
+
+    if retry:
+        await collection.update_many(
+            {"_id": {"$in": list(retry)}},
+            {"$set": {"last_error": error}, "$unset": {"lock_token": "", "locked_until": ""}}
+        )
+    if give_up:
+        logging.warning(f"Giving up on {model.Settings.name} jobs {[str(i) for i in give_up]}: {error}")
+        await collection.update_many(
+            {"_id": {"$in": give_up}},
+            {
+                "$set": {"status": JobStatus.FAILED.value, "last_error": error},
+                "$unset": {"lock_token": "", "locked_until": ""}
+            }
+        )
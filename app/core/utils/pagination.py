@@ -0,0 +1,99 @@
+import base64
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
+
+from app.core.errors import InvalidCursorException
+
+T = TypeVar("T")
+
+# Sort used by every chronological post list: newest first, _id breaks ties
+# so two posts created in the same millisecond never swap between pages.
+CHRONOLOGICAL_SORT: List[Tuple[str, int]] = [("created_at", -1), ("_id", -1)]
+CHRONOLOGICAL_TYPES: Tuple[type, ...] = (datetime, ObjectId)
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Packs the sort-key values of the last item on a page into an opaque string.
+    Extended JSON keeps datetimes and ObjectIds typed across the round trip.
+    """
+    raw = json_util.dumps(list(values)).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int, types: Optional[Sequence[type]] = None) -> List[Any]:
+    """
+    Reverses encode_cursor. Raises InvalidCursorException for anything that
+    wasn't produced by encode_cursor with the same number of sort keys, or, given
+    `types`, whose values aren't of the type each sort key expects.
+
+    Values go straight into Mongo filters, so documents and arrays (which could
+    carry query operators) are always rejected.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError, InvalidId):
+        raise InvalidCursorException()
+
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorException()
+    if any(isinstance(v, (dict, list)) for v in values):
+        raise InvalidCursorException()
+    if types is not None:
+        for value, expected in zip(values, types):
+            # bool is an int subclass, but never a sort key value
+            if not isinstance(value, expected) or isinstance(value, bool):
+                raise InvalidCursorException()
+    return values
+
+
+def keyset_filter(sort: Sequence[Tuple[str, int]], values: Sequence[Any]) -> dict:
+    """
+    Builds the Mongo filter matching everything strictly after `values` in `sort` order.
+    For [(a, -1), (b, -1)] this is: a < va OR (a == va AND b < vb).
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+def after_cursor(
+    cursor: Optional[str],
+    sort: Sequence[Tuple[str, int]] = CHRONOLOGICAL_SORT,
+    types: Sequence[type] = CHRONOLOGICAL_TYPES
+) -> dict:
+    """
+    Filter selecting the page after `cursor`, or {} for the first page.
+    `types` holds the type of each sort key's value, in `sort` order.
+    Meant to be passed as an extra positional filter to Document.find().
+    """
+    if not cursor:
+        return {}
+    if len(types) != len(sort):
+        raise ValueError("after_cursor needs one type per sort key")
+    return keyset_filter(sort, decode_cursor(cursor, len(sort), types))
+
+
+def chronological_key(doc: Any) -> Tuple[Any, Any]:
+    """
+    Cursor values for documents ordered by CHRONOLOGICAL_SORT.
+    """
+    return doc.created_at, doc.id
+
+
+def slice_page(items: List[T], limit: int, key: Callable[[T], Sequence[Any]]) -> Tuple[List[T], Optional[str]]:
+    """
+    Expects up to limit + 1 items. Trims the extra one and, if it existed,
+    returns a cursor pointing at the last item that was kept.
+    """
+    if len(items) > limit:
+        items = items[:limit]
+        return items, encode_cursor(*key(items[-1]))
+    return items, None
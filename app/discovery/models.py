@@ -18,7 +18,7 @@ class PostTag(Document):
         name = "post_tags"
         indexes = [
             IndexModel([("post_id", 1), ("hashtag_id", 1)], unique=True),
-            IndexModel([("hashtag_id", 1)])
+            IndexModel([("hashtag_id", 1), ("_id", -1)])
         ]
 
 class GeoLocation(BaseModel):
@@ -3,14 +3,11 @@ from typing import List, Union, Any, Optional
 from pydantic import BaseModel
 from app.discovery.service import DiscoveryService
 from app.discovery.schemas import HashtagResponse, LocationResponse, UserSearchResponse
-from app.posts.schemas import PostResponse
+from app.posts.schemas import PostResponse, PostPageResponse
 from app.core.auth.dependencies import get_current_user
 from app.core.db.models import User
-from app.engagement.service import EngagementService
-from app.core.auth.schemas import UserPublicModel
-from beanie import PydanticObjectId
-from beanie.operators import In
-import asyncio
+from app.posts.hydrator import PostHydrator
+from app.core.responses import FastJSONResponse, page_response
 
 router = APIRouter(prefix="/discovery", tags=["discovery"])
 
@@ -60,118 +57,32 @@ async def get_trending_hashtags(limit: int = Query(10, le=50)):
         ) for tag in hashtags
     ]
 
-@router.get("/places/{location_id}", response_model=List[PostResponse])
+@router.get("/places/{location_id}", response_model=PostPageResponse)
 async def get_posts_by_location(
     location_id: str,
-    limit: int = Query(20, le=50),
-    offset: int = 0,
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
     service = DiscoveryService()
-    engagement_service = EngagementService()
-    
-    posts = await service.get_posts_by_location(location_id, limit, offset)
-    
-    if not posts:
-        return []
+    posts, next_cursor = await service.get_posts_by_location(location_id, limit, cursor)
 
-    # Fetch authors
-    owner_ids = list({PydanticObjectId(post.owner_id) for post in posts})
-    users = await User.find(In(User.id, owner_ids)).to_list()
-    user_map = {str(u.id): u for u in users}
-    
-    def get_author_model(owner_id):
-        user = user_map.get(owner_id)
-        return UserPublicModel(**user.model_dump()) if user else None
-
-    # Fetch engagement status
-    post_ids = [str(p.id) for p in posts]
-    liked_ids, bookmarked_ids = await asyncio.gather(
-        engagement_service.get_liked_post_ids(str(current_user.id), post_ids),
-        engagement_service.get_bookmarked_post_ids(str(current_user.id), post_ids)
-    )
-    liked_set = set(liked_ids)
-    bookmarked_set = set(bookmarked_ids)
-
-    return [
-        PostResponse(
-            id=str(post.id),
-            owner_id=post.owner_id,
-            author=get_author_model(post.owner_id),
-            caption=post.caption,
-            media=[
-                {
-                    "media_id": str(media.id),
-                    "view_link": media.view_link,
-                    "media_type": media.media_type
-                } for media in post.media
-            ],
-            likes_count=post.likes_count,
-            comments_count=post.comments_count,
-            share_count=post.share_count,
-            created_at=post.created_at,
-            location=post.location,
-            is_liked=str(post.id) in liked_set,
-            is_bookmarked=str(post.id) in bookmarked_set
-        ) for post in posts
-    ]
+    hydrator = PostHydrator(str(current_user.id))
+    return page_response(await hydrator.hydrate_dicts(posts), next_cursor)
 
-@router.get("/tags/{tag_name}", response_model=List[PostResponse])
+@router.get("/tags/{tag_name}", response_model=PostPageResponse)
 async def get_posts_by_tag(
     tag_name: str,
-    limit: int = Query(20, le=50),
-    offset: int = 0,
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = None,
     type: Optional[str] = Query(None, pattern="^(image|video)$"),
     current_user: User = Depends(get_current_user)
 ):
     service = DiscoveryService()
-    engagement_service = EngagementService()
-    
-    posts = await service.get_posts_by_hashtag(tag_name, limit, offset, media_type=type)
-    
-    if not posts:
-        return []
-
-    # Fetch authors
-    owner_ids = list({PydanticObjectId(post.owner_id) for post in posts if PydanticObjectId.is_valid(post.owner_id)})
-    users = await User.find(In(User.id, owner_ids)).to_list()
-    user_map = {str(u.id): u for u in users}
-    
-    def get_author_model(owner_id):
-        user = user_map.get(owner_id)
-        return UserPublicModel(**user.model_dump()) if user else None
-
-    # Fetch engagement status
-    post_ids = [str(p.id) for p in posts]
-    liked_ids, bookmarked_ids = await asyncio.gather(
-        engagement_service.get_liked_post_ids(str(current_user.id), post_ids),
-        engagement_service.get_bookmarked_post_ids(str(current_user.id), post_ids)
-    )
-    liked_set = set(liked_ids)
-    bookmarked_set = set(bookmarked_ids)
+    posts, next_cursor = await service.get_posts_by_hashtag(tag_name, limit, cursor, media_type=type)
 
-    return [
-        PostResponse(
-            id=str(post.id),
-            owner_id=post.owner_id,
-            author=get_author_model(post.owner_id),
-            caption=post.caption,
-            media=[
-                {
-                    "media_id": str(media.id),
-                    "view_link": media.view_link,
-                    "media_type": media.media_type or (f"video/mp4" if media.file_type == "video" else "image/jpeg")
-                } for media in post.media
-            ] if post.media else [],
-            likes_count=post.likes_count,
-            comments_count=post.comments_count,
-            share_count=post.share_count,
-            created_at=post.created_at,
-            location=post.location,
-            is_liked=str(post.id) in liked_set,
-            is_bookmarked=str(post.id) in bookmarked_set
-        ) for post in posts
-    ]
+    hydrator = PostHydrator(str(current_user.id))
+    return page_response(await hydrator.hydrate_dicts(posts), next_cursor)
 
 @router.get("/geocode/reverse")
 async def reverse_geocode(lat: float, lng: float):
@@ -204,10 +115,10 @@ async def create_custom_place(payload: CustomLocationRequest, current_user: User
     )
     return loc
 
-@router.get("/explore", response_model=List[PostResponse])
+@router.get("/explore", response_model=PostPageResponse)
 async def get_explore_feed(
-    limit: int = Query(20, le=50),
-    offset: int = 0,
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = None,
     type: Optional[str] = Query(None, pattern="^(image|video)$"),
     current_user: User = Depends(get_current_user)
 ):
@@ -215,51 +126,10 @@ async def get_explore_feed(
     Explore Feed: Discover engaging content from users you don't follow.
     """
     service = DiscoveryService()
-    engagement_service = EngagementService()
-    
-    posts = await service.get_explore_feed(str(current_user.id), limit, offset, media_type=type)
-    
-    if not posts:
-        return []
-    # Fetch authors
-    owner_ids = list({PydanticObjectId(post.owner_id) for post in posts if PydanticObjectId.is_valid(post.owner_id)})
-    users = await User.find(In(User.id, owner_ids)).to_list()
-    user_map = {str(u.id): u for u in users}
-    
-    def get_author_model(owner_id):
-        user = user_map.get(owner_id)
-        return UserPublicModel(**user.model_dump()) if user else None
+    posts, next_cursor = await service.get_explore_feed(str(current_user.id), limit, cursor, media_type=type)
 
-    # Fetch engagement status
-    post_ids = [str(p.id) for p in posts]
-    liked_ids, bookmarked_ids = await asyncio.gather(
-        engagement_service.get_liked_post_ids(str(current_user.id), post_ids),
-        engagement_service.get_bookmarked_post_ids(str(current_user.id), post_ids)
-    )
-    liked_set = set(liked_ids)
-    bookmarked_set = set(bookmarked_ids)
-    return [
-        PostResponse(
-            id=str(post.id),
-            owner_id=post.owner_id,
-            author=get_author_model(post.owner_id),
-            caption=post.caption,
-            media=[
-                {
-                    "media_id": str(media.id),
-                    "view_link": media.view_link,
-                    "media_type": media.media_type or (f"video/mp4" if media.file_type == "video" else "image/jpeg")
-                } for media in post.media
-            ] if post.media else [],
-            likes_count=post.likes_count,
-            comments_count=post.comments_count,
-            share_count=post.share_count,
-            created_at=post.created_at,
-            location=post.location,
-            is_liked=str(post.id) in liked_set,
-            is_bookmarked=str(post.id) in bookmarked_set
-        ) for post in posts
-    ]
+    hydrator = PostHydrator(str(current_user.id))
+    return page_response(await hydrator.hydrate_dicts(posts), next_cursor)
 
 @router.get("/shorts", response_model=List[PostResponse])
 async def get_shorts_feed(
@@ -271,50 +141,7 @@ async def get_shorts_feed(
     Shorts Feed: Discover video content from all users globally.
     """
     service = DiscoveryService()
-    engagement_service = EngagementService()
-    
     posts = await service.get_global_videos_feed(str(current_user.id), limit, offset)
-    
-    if not posts:
-        return []
-
-    # Fetch authors
-    owner_ids = list({PydanticObjectId(post.owner_id) for post in posts if PydanticObjectId.is_valid(post.owner_id)})
-    users = await User.find(In(User.id, owner_ids)).to_list()
-    user_map = {str(u.id): u for u in users}
-    
-    def get_author_model(owner_id):
-        user = user_map.get(owner_id)
-        return UserPublicModel(**user.model_dump()) if user else None
 
-    # Fetch engagement status
-    post_ids = [str(p.id) for p in posts]
-    liked_ids, bookmarked_ids = await asyncio.gather(
-        engagement_service.get_liked_post_ids(str(current_user.id), post_ids),
-        engagement_service.get_bookmarked_post_ids(str(current_user.id), post_ids)
-    )
-    liked_set = set(liked_ids)
-    bookmarked_set = set(bookmarked_ids)
-
-    return [
-        PostResponse(
-            id=str(post.id),
-            owner_id=post.owner_id,
-            author=get_author_model(post.owner_id),
-            caption=post.caption,
-            media=[
-                {
-                    "media_id": str(media.id),
-                    "view_link": media.view_link,
-                    "media_type": media.media_type or (f"video/mp4" if media.file_type == "video" else "image/jpeg")
-                } for media in post.media
-            ] if post.media else [],
-            likes_count=post.likes_count,
-            comments_count=post.comments_count,
-            share_count=post.share_count,
-            created_at=post.created_at,
-            location=post.location,
-            is_liked=str(post.id) in liked_set,
-            is_bookmarked=str(post.id) in bookmarked_set
-        ) for post in posts
-    ]
+    hydrator = PostHydrator(str(current_user.id))
+    return FastJSONResponse(await hydrator.hydrate_dicts(posts))
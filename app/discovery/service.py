@@ -1,16 +1,35 @@
 from app.discovery.models import Hashtag, PostTag, Location
 from app.posts.models import Post
-from app.core.db.models import User, UserFollows, UserBlocks, FollowStatus
+from app.posts.pipelines import find_post_page, find_posts_by_ids
+from app.posts.snapshots import media_file_types
+from app.core.db.models import User
 from beanie import PydanticObjectId
-from typing import List, Dict, Any, Optional
+from bson import ObjectId
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
 import httpx
 import asyncio
 import random
 from app.core.config import settings
 import re
 import logging
+from app.following.graph_cache import SocialGraphCache
+from app.core.utils.pagination import CHRONOLOGICAL_SORT, after_cursor, chronological_key, encode_cursor, slice_page
+
+# Explore ranks by engagement first; the trailing keys make the order total for cursors
+EXPLORE_SORT = [("likes_count", -1), ("comments_count", -1), ("created_at", -1), ("_id", -1)]
+EXPLORE_TYPES = (int, int, datetime, ObjectId)
+ID_SORT = [("_id", -1)]
+ID_TYPES = (ObjectId,)
+
+
+def explore_key(post: Post):
+    return post.likes_count, post.comments_count, post.created_at, post.id
 
 class DiscoveryService:
+    def __init__(self):
+        self.graph_cache = SocialGraphCache()
+
     async def get_trending_hashtags(self, limit: int = 10) -> List[Hashtag]:
         return await Hashtag.find_all().sort("-post_count").limit(limit).to_list()
 
@@ -99,21 +118,11 @@ class DiscoveryService:
         user_ids = [str(u.id) for u in users]
         
         # 2. Check Connections (Friend-of-Friend / Direct Follows)
-        # "I follow them"
-        i_follow = await UserFollows.find({
-            "follower_id": current_user_id,
-            "following_id": {"$in": user_ids},
-            "status": FollowStatus.ACTIVE
-        }).to_list()
-        following_ids = {f.following_id for f in i_follow}
-        
-        # "They follow me"
-        follows_me = await UserFollows.find({
-            "follower_id": {"$in": user_ids},
-            "following_id": current_user_id,
-            "status": FollowStatus.ACTIVE
-        }).to_list()
-        follower_ids = {f.follower_id for f in follows_me}
+        # "I follow them" / "They follow me", both from the graph cache
+        following_ids, follower_ids = await asyncio.gather(
+            self.graph_cache.get_following(current_user_id),
+            self.graph_cache.followers_among(user_ids, current_user_id)
+        )
         
         results = []
         for user in users:
@@ -137,37 +146,33 @@ class DiscoveryService:
         
         return results[:limit]
 
-    async def get_posts_by_hashtag(self, hashtag_name: str, limit: int = 20, offset: int = 0, media_type: Optional[str] = None) -> List[Post]:
+    async def get_posts_by_hashtag(self, hashtag_name: str, limit: int = 20, cursor: Optional[str] = None, media_type: Optional[str] = None) -> Tuple[List[Post], Optional[str]]:
         # 1. Find Hashtag ID
         tag = await Hashtag.find_one({"name": hashtag_name})
         if not tag:
-            return []
+            return [], None
         
-        # 2. Find PostTags
-        post_tags = await PostTag.find(PostTag.hashtag_id == str(tag.id)).skip(offset).limit(limit).to_list()
-        post_ids = [PydanticObjectId(pt.post_id) for pt in post_tags]
+        # 2. Find PostTags (newest first; PostTag ids are time-ordered ObjectIds)
+        post_tags = await PostTag.find(
+            PostTag.hashtag_id == str(tag.id), after_cursor(cursor, ID_SORT, ID_TYPES)
+        ).sort("-_id").limit(limit + 1).to_list()
+        post_tags, next_cursor = slice_page(post_tags, limit, lambda pt: (pt.id,))
         
-        # 3. Fetch Posts
-        query = {"_id": {"$in": post_ids}}
+        # 3. Fetch Posts (links resolved in the same query, PostTag order kept)
+        posts = await find_posts_by_ids([pt.post_id for pt in post_tags])
         
         # 4. Media Type Filter (requires join/lookup if we want to be strict, but for explorer we can fetch and filter or add simpler check)
-        # For hashtags, we'll fetch and then filter if media_type is provided, though pagination might be slightly off.
-        # Better: use aggregation pipeline for strict filtering.
-        
-        posts = await Post.find(query, fetch_links=True).to_list()
+        # For hashtags, we'll fetch and then filter if media_type is provided, so a page can be shorter than limit.
+        # The cursor follows the PostTag scan, so filtered-out posts never cause skipped or repeated pages.
         
         if media_type:
-            posts = [p for p in posts if p.media and any(str(m.file_type) == media_type for m in p.media)]
+            posts = [p for p in posts if media_type in media_file_types(p)]
             
-        return posts
+        return posts, next_cursor
 
     async def get_suggested_users(self, current_user_id: str, limit: int = 3) -> List[Dict[str, Any]]:
         # 1. Get IDs of users already followed
-        following = await UserFollows.find({
-            "follower_id": current_user_id,
-            "status": FollowStatus.ACTIVE
-        }).to_list()
-        following_ids = {f.following_id for f in following}
+        following_ids = set(await self.graph_cache.get_following(current_user_id))
         following_ids.add(current_user_id) # Exclude self
         
         # 2. Find top users by follower count who are NOT in following_ids
@@ -184,29 +189,19 @@ class DiscoveryService:
             "followers_count": u.followers_count
         } for u in top_users]
 
-    async def get_explore_feed(self, current_user_id: str, limit: int = 20, offset: int = 0, media_type: Optional[str] = None) -> List[Post]:
+    async def get_explore_feed(self, current_user_id: str, limit: int = 20, cursor: Optional[str] = None, media_type: Optional[str] = None) -> Tuple[List[Post], Optional[str]]:
         """
         Retrieves engaging content from users the current user does not follow.
         """
         # 1. Get Following and Blocked IDs
-        following_task = UserFollows.find({
-            "follower_id": current_user_id,
-            "status": FollowStatus.ACTIVE
-        }).to_list()
-        
-        blocked_task = UserBlocks.find({
-            "$or": [
-                {"blocker_id": current_user_id},
-                {"blocked_id": current_user_id}
-            ]
-        }).to_list()
-        
-        following_records, blocked_records = await asyncio.gather(following_task, blocked_task)
+        following_ids, blocked_ids = await asyncio.gather(
+            self.graph_cache.get_following(current_user_id),
+            self.graph_cache.get_blocked(current_user_id)
+        )
         
         excluded_user_ids = {current_user_id}
-        excluded_user_ids.update(r.following_id for r in following_records)
-        excluded_user_ids.update(r.blocker_id for r in blocked_records)
-        excluded_user_ids.update(r.blocked_id for r in blocked_records)
+        excluded_user_ids.update(following_ids)
+        excluded_user_ids.update(blocked_ids)
 
         # 2. Query Posts
         # Strategy: Freshness + Engagement weighting
@@ -217,33 +212,34 @@ class DiscoveryService:
             # Note: Complex aggregation for explore feed to handle links + filtering
             # For now, we'll use a simpler approach: fetch more and filter in memory if limit is small
             # Or ideally use $lookup. Since this is an explorer, fetching slightly more is fine.
-            posts = await Post.find(query, fetch_links=True).sort("-likes_count", "-comments_count", "-created_at").skip(offset).limit(limit * 5).to_list()
-            filtered = [p for p in posts if p.media and any(m.file_type == media_type for m in p.media)]
-            return filtered[:limit]
+            scan_size = limit * 5
+            posts = await find_post_page(query, after_cursor(cursor, EXPLORE_SORT, EXPLORE_TYPES), sort=EXPLORE_SORT, limit=scan_size)
+
+            filtered = []
+            last_scanned = None
+            for p in posts:
+                last_scanned = p
+                if media_type in media_file_types(p):
+                    filtered.append(p)
+                    if len(filtered) == limit:
+                        break
+
+            # Resume after the last post we looked at, whether or not it matched
+            has_more = len(filtered) == limit or len(posts) == scan_size
+            next_cursor = encode_cursor(*explore_key(last_scanned)) if has_more and last_scanned else None
+            return filtered, next_cursor
             
-        posts = await Post.find(
-            query,
-            fetch_links=True
-        ).sort("-likes_count", "-comments_count", "-created_at").skip(offset).limit(limit).to_list()
+        posts = await find_post_page(query, after_cursor(cursor, EXPLORE_SORT, EXPLORE_TYPES), sort=EXPLORE_SORT, limit=limit + 1)
         
-        return posts
+        return slice_page(posts, limit, explore_key)
 
     async def get_global_videos_feed(self, current_user_id: str, limit: int = 20, offset: int = 0) -> List[Post]:
         """
         Retrieves all video posts globally using aggregation for efficient filtering.
         """
         # 1. Get Blocked IDs
-        blocked_records = await UserBlocks.find({
-            "$or": [
-                {"blocker_id": current_user_id},
-                {"blocked_id": current_user_id}
-            ]
-        }).to_list()
-        
         # Base exclusion (Blocked users)
-        blocked_user_ids = set()
-        blocked_user_ids.update(r.blocker_id for r in blocked_records)
-        blocked_user_ids.update(r.blocked_id for r in blocked_records)
+        blocked_user_ids = set(await self.graph_cache.get_blocked(current_user_id))
 
         # ------------------------------------------------------------------
         # Strategy: "Prioritized Mix"
@@ -322,10 +318,7 @@ class DiscoveryService:
             return []
 
         # 3. Fetch full documents conformant with the rest of the app (relations loaded)
-        posts = await Post.find(
-            {"_id": {"$in": found_ids}},
-            fetch_links=True
-        ).to_list()
+        posts = await find_post_page({"_id": {"$in": found_ids}})
         
         # Since $sample order is lost in the $in query, we shuffle again to ensure random order
         random.shuffle(posts)
@@ -511,22 +504,25 @@ class DiscoveryService:
         await new_loc.save()
         return new_loc
 
-    async def get_posts_by_location(self, location_id: str, limit: int = 20, offset: int = 0) -> List[Post]:
+    async def get_posts_by_location(self, location_id: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Post], Optional[str]]:
         # 1. Verify Location
         try:
             if not PydanticObjectId.is_valid(location_id):
-                 return []
+                 return [], None
             location = await Location.get(PydanticObjectId(location_id))
         except Exception:
-             return []
+             return [], None
              
         if not location:
-            return []
+            return [], None
         
         # 2. Find Posts
-        # Note: We query the 'location.id' field or the link. 
-        # Beanie models link objects, so we can query on the reference or use aggregate.
-        # Simple match:
-        posts = await Post.find(Post.location.id == PydanticObjectId(location_id), fetch_links=True).sort("-created_at").skip(offset).limit(limit).to_list()
-        
-        return posts
\ No newline at end of file
+        # Note: Location is stored as a DBRef, so we match on its '$id'.
+        posts = await find_post_page(
+            {"location.$id": PydanticObjectId(location_id)},
+            after_cursor(cursor),
+            sort=CHRONOLOGICAL_SORT,
+            limit=limit + 1
+        )
+        
+        return slice_page(posts, limit, chronological_key)
@@ -17,7 +17,9 @@ class PostLike(Document):
             IndexModel(
                 [("post_id", 1), ("user_id", 1)],
                 unique=True
-            )
+            ),
+            # "Liked posts" tab, newest like first
+            IndexModel([("user_id", 1), ("created_at", -1), ("_id", -1)])
         ]
 
 class Comment(Document):
@@ -36,7 +38,9 @@ class Comment(Document):
         name = "comments"
         indexes = [
             [("post_id", 1), ("created_at", -1)],
-            [("parent_id", 1)]
+            [("parent_id", 1)],
+            # Viewer's recent comments (timeline affinity)
+            [("user_id", 1), ("created_at", -1)]
         ]
 
 class Bookmark(Document):
@@ -50,7 +54,9 @@ class Bookmark(Document):
             IndexModel(
                 [("user_id", 1), ("post_id", 1)],
                 unique=True
-            )
+            ),
+            # Purging a deleted post's bookmarks
+            IndexModel([("post_id", 1)])
         ]
 
 class CommentLike(Document):
@@ -64,5 +70,7 @@ class CommentLike(Document):
             IndexModel(
                 [("comment_id", 1), ("user_id", 1)],
                 unique=True
-            )
+            ),
+            # Account deletion
+            IndexModel([("user_id", 1)])
         ]
\ No newline at end of file
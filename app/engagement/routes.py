@@ -5,6 +5,8 @@ from app.core.db.models import User
 from app.engagement.service import EngagementService
 from app.engagement.schemas import CommentCreate, CommentTreeResponse, SharePostRequest
 from app.posts.schemas import PostResponse
+from app.posts.hydrator import PostHydrator
+from app.core.responses import FastJSONResponse
 
 router = APIRouter(prefix="/posts", tags=["engagement"])
 
@@ -130,7 +132,7 @@ async def get_user_bookmarks_endpoint(
     """
     service = EngagementService()
     result = await service.get_user_bookmarks(user_id=str(current_user.id), limit=limit, offset=offset)
-    return result
+    return FastJSONResponse(result)
 
 @router.post("/{post_id}/share", status_code=status.HTTP_201_CREATED, response_model=PostResponse)
 async def share_post_endpoint(
@@ -149,29 +151,7 @@ async def share_post_endpoint(
         tags=body.tags,
         location_id=body.location_id
     )
-    
-    # Helper to map a Post document to PostResponse
-    def map_post(p):
-        return {
-            "_id": str(p.id),
-            "owner_id": p.owner_id,
-            "caption": p.caption,
-            "media": [
-                {
-                    "media_id": str(m.id),
-                    "view_link": m.view_link,
-                    "media_type": m.media_type
-                } for m in p.media
-            ] if p.media else [],
-            "likes_count": p.likes_count,
-            "comments_count": p.comments_count,
-            "share_count": p.share_count,
-            "created_at": p.created_at,
-            # Dynamic fields (defaults for new post)
-            "is_bookmarked": False,
-            "is_liked": False,
-            "original_post": map_post(p.original_post) if p.original_post else None,
-            "location": p.location
-        }
 
-    return map_post(new_post)
\ No newline at end of file
+    hydrator = PostHydrator(str(current_user.id))
+    hydrator.prime_users(current_user)
+    return await hydrator.hydrate_one(new_post)
@@ -2,7 +2,13 @@ from beanie import PydanticObjectId
 from beanie.operators import In
 from pymongo.errors import DuplicateKeyError
 from app.engagement.models import PostLike, Comment, CommentLike, Bookmark
-from app.posts.models import Post
+from app.posts.models import Post, PostOutboxEvent
+from app.posts.outbox import enqueue_post_event, insert_post_with_outbox, normalize_tags
+from app.posts.snapshots import apply_snapshots
+from app.posts.grid import apply_cover
+from app.posts.cache import post_cache
+from app.posts.hydrator import PostHydrator
+from app.posts.pipelines import find_posts_by_ids
 import uuid
 import asyncio
 from typing import List, Optional, Dict, Any
@@ -12,12 +18,14 @@ from app.discovery.models import Location
 from app.core.db.models import User
 from app.core.auth.schemas import UserPublicModel
 from app.notification.service import NotificationService
+from app.feed.service import TimelineService
 from app.notification.models import NotificationType
 from app.core.utils.text import extract_mentions, extract_hashtags
 
 class EngagementService:
     def __init__(self):
         self.notification_service = NotificationService()
+        self.timeline_service = TimelineService()
 
     async def like_post(self, user_id: str, post_id: str):
         """
@@ -37,6 +45,7 @@ class EngagementService:
         post = await Post.get(PydanticObjectId(post_id))
         if post:
             await post.inc({Post.likes_count: 1})
+            await post_cache.invalidate_posts(post_id)
             
             # send_like_notification.apply_async(args=[post.owner_id, user_id, post_id], countdown=10)
             # The task would check if the PostLike record still exists before sending.
@@ -75,13 +84,14 @@ class EngagementService:
             # Ensure we don't go below zero (though logic shouldn't allow it)
             if post.likes_count > 0:
                 await post.inc({Post.likes_count: -1})
+                await post_cache.invalidate_posts(post_id)
 
         return {"status": "success", "message": "Post unliked"}
 
     async def add_comment(self, user_id: str, post_id: str, content: str, parent_id: Optional[str] = None) -> Comment:
         # Validate Post
         post = await Post.get(PydanticObjectId(post_id))
-        if not post:
+        if not post or post.is_deleted:
             raise PostNotFoundException()
             
         # Validate Content
@@ -124,6 +134,7 @@ class EngagementService:
         
         # Increment post comments count
         await post.inc({Post.comments_count: 1})
+        await post_cache.invalidate_posts(post_id)
         
         # Notification for post owner
         await self.notification_service.create_notification(
@@ -244,6 +255,7 @@ class EngagementService:
             post = await Post.get(PydanticObjectId(comment.post_id))
             if post:
                 await post.inc({Post.comments_count: -1})
+                await post_cache.invalidate_posts(comment.post_id)
                 
         return {"status": "success", "message": "Comment deleted"}
 
@@ -331,7 +343,7 @@ class EngagementService:
 
     async def bookmark_post(self, user_id: str, post_id: str):
         post = await Post.get(PydanticObjectId(post_id))
-        if not post:
+        if not post or post.is_deleted:
             raise PostNotFoundException()
             
         try:
@@ -374,7 +386,7 @@ class EngagementService:
         ).to_list()
         return [l.post_id for l in likes]
 
-    async def get_user_bookmarks(self, user_id: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    async def get_user_bookmarks(self, user_id: str, limit: int = 20, offset: int = 0) -> List[dict]:
         # 1. Fetch Bookmarks (Newest first)
         bookmarks = await Bookmark.find(
             Bookmark.user_id == user_id
@@ -383,102 +395,16 @@ class EngagementService:
         if not bookmarks:
             return []
             
-        post_ids = [b.post_id for b in bookmarks]
-        
-        # Rule 3: Parallelism - Fetch Posts and Likes simultaneously
-        posts_task = Post.find(
-            In(Post.id, [PydanticObjectId(pid) for pid in post_ids]),
-            fetch_links=True
-        ).to_list()
-        
-        likes_task = self.get_liked_post_ids(user_id, post_ids)
-        
-        posts, liked_ids = await asyncio.gather(posts_task, likes_task)
-        
-        # Fetch Authors of Original Posts (for shared posts)
-        op_owner_ids = []
-        for p in posts:
-            if p.original_post:
-                op_owner_ids.append(PydanticObjectId(p.original_post.owner_id))
-
-        # Fetch Authors
-        owner_ids = list({PydanticObjectId(p.owner_id) for p in posts})
-        if op_owner_ids:
-            owner_ids.extend(op_owner_ids)
-        users = await User.find(In(User.id, owner_ids)).to_list()
-        user_map = {str(u.id): u for u in users}
+        # 2. Posts with their links resolved, in bookmark order; bookmarks of deleted posts are skipped
+        posts = await find_posts_by_ids([b.post_id for b in bookmarks])
 
-        posts_map = {str(p.id): p for p in posts}
-        
-        liked_set = set(liked_ids)
-        
-        results = []
-        for b in bookmarks:
-            post = posts_map.get(b.post_id)
-            if post:
-                # Convert Post to dict structure compatible with PostResponse
-                post_dict = post.model_dump()
-                post_dict["_id"] = str(post.id) # Ensure ID is string
-                
-                # Populate Author
-                author = user_map.get(post.owner_id)
-                if author:
-                    post_dict["author"] = UserPublicModel(**author.model_dump()).model_dump()
-                
-                # Map media objects to match MediaResponse schema (id -> media_id)
-                if post.media:
-                    post_dict["media"] = [
-                        {
-                            "media_id": str(m.id),
-                            "view_link": m.view_link,
-                            "media_type": m.media_type
-                        } for m in post.media
-                    ]
-
-                # Map location if exists
-                if post.location:
-                    # Since post.location is a Link/Document, we can dump it.
-                    # The LocationResponse validator we updated will handle the dict structure.
-                    loc_dump = post.location.model_dump()
-                    # Ensure ID is string for the validator to pick it up if needed, 
-                    # though model_dump usually keeps ObjectId unless configured otherwise.
-                    loc_dump["_id"] = str(post.location.id)
-                    post_dict["location"] = loc_dump
-                
-                # Map original_post if exists
-                if post.original_post:
-                    op = post.original_post
-                    op_dict = op.model_dump()
-                    op_dict["_id"] = str(op.id)
-                    op_dict["id"] = str(op.id)
-                    
-                    op_author = user_map.get(op.owner_id)
-                    if op_author:
-                        op_dict["author"] = UserPublicModel(**op_author.model_dump()).model_dump()
-                        
-                    if op.media:
-                        op_dict["media"] = [
-                            {
-                                "media_id": str(m.id),
-                                "view_link": m.view_link,
-                                "media_type": m.media_type
-                            } for m in op.media
-                        ]
-                    else:
-                        op_dict["media"] = []
-                        
-                    post_dict["original_post"] = op_dict
-
-                post_dict["is_bookmarked"] = True
-                post_dict["is_liked"] = b.post_id in liked_set
-                results.append(post_dict)
-                
-        return results
+        # 3. Authors, likes and bookmark state in one batched pass, as PostResponse-shaped dicts
+        return await PostHydrator(user_id).hydrate_dicts(posts)
 
     async def share_post(self, user_id: str, post_id: str, caption: Optional[str] = None, tags: List[str] = [], location_id: Optional[str] = None) -> Post:
         # 1. Validate Original Post
         original_post = await Post.get(PydanticObjectId(post_id))
-        if not original_post:
+        if not original_post or original_post.is_deleted:
             raise PostNotFoundException()
             
         # 2. Flattening: If sharing a share, share the root
@@ -494,7 +420,12 @@ class EngagementService:
             if not location:
                 raise ContentValidationException(f"Invalid location_id: {location_id}")
             
-        # 4. Create New Post
+        target_post = original_post if target_post_id == original_post.id else await Post.get(target_post_id)
+        if target_post and target_post.is_deleted:
+            raise PostNotFoundException()
+
+        # 4. Create New Post (hashtags and fan-out go through the post outbox)
+        tags = normalize_tags(tags or [])
         new_post = Post(
             owner_id=user_id,
             caption=caption,
@@ -503,12 +434,17 @@ class EngagementService:
             location=location,
             media=[] # Shares typically reference media via original_post, not copy it
         )
-        await new_post.save()
+        apply_snapshots(new_post)
+        # The grid shows the shared post's cover
+        if target_post:
+            apply_cover(new_post, source=target_post)
+        event = PostOutboxEvent(post_id="", owner_id=user_id, tags=tags)
+        await insert_post_with_outbox(new_post, event)
         
         # 4. Increment Share Count on Target
-        target_post = await Post.get(target_post_id)
         if target_post:
             await target_post.inc({Post.share_count: 1})
+            await post_cache.invalidate_posts(str(target_post.id))
             
             if str(target_post.owner_id) != user_id:
                 await self.notification_service.create_notification(
@@ -519,14 +455,13 @@ class EngagementService:
                     metadata={"preview": caption[:50] if caption else "shared your post"}
                 )
         
-        # 5. Fetch links for response
-        await new_post.fetch_link(Post.original_post)
-        if new_post.original_post:
-            await new_post.original_post.fetch_link(Post.media)
+        # 5. Reuse the target we already loaded instead of fetching the link again;
+        # PostHydrator resolves its media in the same batch as everything else
+        if target_post:
+            new_post.original_post = target_post
 
-        # 6. Integrate Discovery: Process Hashtags
-        if tags:
-            discovery_service = DiscoveryService()
-            await discovery_service.process_post_tags(str(new_post.id), tags)
+        # 6. Author's own timeline now; hashtags and follower fan-out in the outbox worker
+        await self.timeline_service.add_own_post(new_post)
+        await enqueue_post_event(event)
             
         return new_post
\ No newline at end of file
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from beanie import Document
+from pymongo import IndexModel
+
+
+class TimelineEntry(Document):
+    """
+    One row of a user's materialized home timeline.
+    Written at post time (fan-out-on-write) so reads are a single range scan.
+    """
+    owner_id: str       # The user whose timeline this row belongs to
+    post_id: str
+    author_id: str
+    created_at: datetime  # Copied from the post so entries sort like posts
+
+    class Settings:
+        name = "timelines"
+        indexes = [
+            # Idempotent fan-out: a post lands on a timeline at most once
+            IndexModel([("owner_id", 1), ("post_id", 1)], unique=True),
+            # Range read for the home feed (post_id breaks ties for cursors)
+            IndexModel([("owner_id", 1), ("created_at", -1), ("post_id", -1)]),
+            # Pruning on unfollow / block
+            IndexModel([("owner_id", 1), ("author_id", 1)]),
+            # Cleanup when a post is deleted
+            IndexModel([("post_id", 1)])
+        ]
@@ -1,95 +1,76 @@
 from fastapi import APIRouter, Query, Depends
-from typing import List
-from app.posts.models import Post
-from app.posts.schemas import PostResponse
+from typing import Optional, Union
+from app.posts.hydrator import PostHydrator
+from app.core.responses import page_response
+from app.core.utils.pagination import encode_cursor
 from app.core.auth.dependencies import get_current_user
-from app.core.db.models import User, UserFollows, FollowStatus
-from app.engagement.service import EngagementService
-from beanie import PydanticObjectId
-import asyncio
-from app.core.auth.schemas import UserPublicModel
+from app.core.db.models import User
+from app.core.config import settings
+from app.feed.schemas import RankedTimelineResponse, TimelinePageResponse, TimelineSinceResponse
+from app.feed.service import TimelineService
+from app.feed.warmup import pop_warm_timeline
 
 router = APIRouter(prefix="/feed", tags=["feed"])
 
 
-@router.get("/timeline", response_model=List[PostResponse])
+@router.get("/timeline", response_model=Union[RankedTimelineResponse, TimelinePageResponse])
 async def get_timeline(
-    limit: int = Query(10, le=50), 
-    offset: int = 0,
+    limit: int = Query(10, ge=1, le=50), 
+    cursor: Optional[str] = None,
+    ranking: str = Query("chronological", pattern="^(chronological|relevance)$"),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get the personalized timeline (posts from users the current user follows).
+    ranking=relevance orders recent posts by score and includes the score breakdown;
+    cursors are only valid within the mode that produced them.
     """
-    # 1. Get list of users I follow
-    following_records = await UserFollows.find(
-        UserFollows.follower_id == str(current_user.id),
-        UserFollows.status == FollowStatus.ACTIVE
-    ).to_list()
-    
-    following_ids = [r.following_id for r in following_records]
-    # Include own posts in timeline
-    following_ids.append(str(current_user.id))
+    # 0. First page prefetched at login / token refresh
+    if ranking == "chronological" and cursor is None and limit == settings.FEED_WARMUP_PAGE_SIZE:
+        warm_page = await pop_warm_timeline(str(current_user.id))
+        if warm_page:
+            return warm_page
 
-    # 2. Fetch Posts
-    posts = await Post.find(
-        {"owner_id": {"$in": following_ids}},
-        fetch_links=True
-    ).sort(-Post.created_at).skip(offset).limit(limit).to_list()
+    # 1. Read the materialized timeline (single range read + batched post fetch)
+    timeline_service = TimelineService()
+    scores = None
+    if ranking == "relevance":
+        posts, scores, next_cursor = await timeline_service.get_ranked_timeline_posts(str(current_user.id), limit, cursor)
+    else:
+        posts, next_cursor = await timeline_service.get_timeline_posts(str(current_user.id), limit, cursor)
 
-    # 3. Hydrate (Likes/Bookmarks/Authors)
-    engagement_service = EngagementService()
-    
-    post_ids = [str(p.id) for p in posts]
-    original_ids = [str(p.original_post.id) for p in posts if p.original_post]
-    all_ids_to_check = list(set(post_ids + original_ids))
-    
-    # Batch user lookups for authors
-    author_ids = list(set([p.owner_id for p in posts]))
-    authors = await User.find({"_id": {"$in": [PydanticObjectId(aid) for aid in author_ids if PydanticObjectId.is_valid(aid)]}}).to_list()
-    author_map = {str(u.id): u for u in authors}
+    # 2. Hydrate (Likes/Bookmarks/Authors/Media) with one batched query per kind
+    hydrator = PostHydrator(str(current_user.id))
+    hydrator.prime_users(current_user)
 
+    items = await hydrator.hydrate_dicts(posts)
+    if scores is not None:
+        return page_response(items, next_cursor, scores=[s.model_dump() for s in scores])
+    return page_response(items, next_cursor, head_cursor=TimelineService.head_cursor(posts) if cursor is None else None)
 
-    liked_ids, bookmarked_ids = await asyncio.gather(
-        engagement_service.get_liked_post_ids(str(current_user.id), all_ids_to_check),
-        engagement_service.get_bookmarked_post_ids(str(current_user.id), all_ids_to_check)
-    )
-    
-    liked_set = set(liked_ids)
-    bookmarked_set = set(bookmarked_ids)
 
-    def map_user(u):
-        if not u: return None
-        return UserPublicModel(
-            _id=u.id,
-            username=u.username,
-            email=u.email,
-            first_name=u.first_name,
-            last_name=u.last_name,
-            bio=u.bio,
-            avatar_url=u.avatar_url,
-            is_private=getattr(u, 'is_private', False),
-            followers_count=getattr(u, 'followers_count', 0),
-            following_count=getattr(u, 'following_count', 0),
-            created_at=u.created_at
-        )
+@router.get("/timeline/since", response_model=TimelineSinceResponse)
+async def get_timeline_since(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=100),
+    include_ids: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Cheap poll for the "N new posts" banner.
+    cursor is the head_cursor of the newest page the client holds (omit it if the
+    timeline was empty). Only index entries are read; nothing is hydrated.
+    """
+    timeline_service = TimelineService()
+    refs = await timeline_service.get_refs_since(str(current_user.id), cursor, limit + 1)
 
-    def map_post(p):
-        author_user = author_map.get(p.owner_id)
-        return PostResponse(
-            id=str(p.id),
-            owner_id=p.owner_id,
-            author=map_user(author_user),
-            caption=p.caption,
-            media=[{"media_id": str(m.id), "view_link": m.view_link, "media_type": m.media_type} for m in p.media] if p.media else [],
-            likes_count=p.likes_count,
-            comments_count=p.comments_count,
-            share_count=p.share_count,
-            created_at=p.created_at,
-            is_liked=str(p.id) in liked_set,
-            is_bookmarked=str(p.id) in bookmarked_set,
-            original_post=map_post(p.original_post) if p.original_post else None,
-            location=p.location
-        )
+    has_more = len(refs) > limit
+    refs = refs[:limit]
 
-    return [map_post(p) for p in posts]
+    return {
+        "count": len(refs),
+        "has_more": has_more,
+        "post_ids": [post_id for _, post_id in refs] if include_ids else None,
+        # Nothing new: the client's cursor is still the head
+        "head_cursor": encode_cursor(*refs[0]) if refs else cursor
+    }
@@ -0,0 +1,42 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.posts.schemas import PostPageResponse
+
+
+class ScoreBreakdown(BaseModel):
+    """
+    How a post was scored in relevance mode. Exposed for debugging the ranking.
+    """
+    post_id: str
+    score: float
+    recency: float
+    velocity: float
+    affinity: float
+
+
+class RankedTimelineResponse(PostPageResponse):
+    """
+    A page of the relevance-ranked timeline; scores[i] belongs to items[i].
+    """
+    scores: List[ScoreBreakdown]
+
+
+class TimelinePageResponse(PostPageResponse):
+    """
+    A page of the chronological timeline. head_cursor is set on the first page and
+    points at its newest post; pass it to /feed/timeline/since to poll for newer posts.
+    """
+    head_cursor: Optional[str] = None
+
+
+class TimelineSinceResponse(BaseModel):
+    """
+    What changed above the client's newest post. count is capped at the requested
+    limit; has_more means there are even more new posts than that.
+    """
+    count: int
+    has_more: bool = False
+    post_ids: Optional[List[str]] = None
+    head_cursor: Optional[str] = None
@@ -0,0 +1,427 @@
+import asyncio
+import heapq
+from collections import Counter
+from itertools import islice
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from beanie import PydanticObjectId
+from beanie.operators import In
+from pydantic import BaseModel, Field, ConfigDict
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.utils.pagination import CHRONOLOGICAL_SORT, decode_cursor, encode_cursor, keyset_filter, slice_page
+from app.core.db.models import User, UserFollows, FollowStatus
+from app.core.errors import InvalidCursorException
+from app.engagement.models import PostLike, Comment
+from app.feed.models import TimelineEntry
+from app.feed.ranking import score_candidates
+from app.feed.schemas import ScoreBreakdown
+from app.following.graph_cache import SocialGraphCache
+from app.posts.models import LIVE_POSTS, Post
+from app.posts.pipelines import find_posts_by_ids
+
+
+class FollowerProjection(BaseModel):
+    follower_id: str
+
+
+class EntryRefProjection(BaseModel):
+    post_id: str
+    created_at: datetime
+
+
+class PostIdProjection(BaseModel):
+    post_id: str
+
+
+class PostOwnerProjection(BaseModel):
+    id: PydanticObjectId = Field(alias="_id")
+    owner_id: str
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class PostStatsProjection(BaseModel):
+    id: PydanticObjectId = Field(alias="_id")
+    owner_id: str
+    likes_count: int = 0
+    comments_count: int = 0
+    share_count: int = 0
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class PostRefProjection(BaseModel):
+    id: PydanticObjectId = Field(alias="_id")
+    created_at: datetime
+    model_config = ConfigDict(populate_by_name=True)
+
+
+# (created_at, post_id) - the unit every timeline source is merged and paginated on.
+# Post ids are fixed-width hex, so string order matches ObjectId order.
+TimelineRef = Tuple[datetime, str]
+TIMELINE_SORT = [("created_at", -1), ("post_id", -1)]
+
+# Same keys in the opposite direction: keyset_filter over these selects newer items
+NEWER_TIMELINE_SORT = [("created_at", 1), ("post_id", 1)]
+NEWER_CHRONOLOGICAL_SORT = [("created_at", 1), ("_id", 1)]
+
+# Sorts after every real post id, so (snapshot, MAX_POST_ID) as an `after` value
+# selects everything created before the snapshot
+MAX_POST_ID = "f" * 24
+
+
+def merge_timeline_refs(*streams: Iterable[TimelineRef]) -> Iterator[TimelineRef]:
+    """
+    k-way merge of newest-first streams into one newest-first stream.
+    A post present in several streams (e.g. pushed before its author crossed
+    the pull threshold) is yielded once.
+    """
+    seen: Set[str] = set()
+    for created_at, post_id in heapq.merge(*streams, reverse=True):
+        if post_id in seen:
+            continue
+        seen.add(post_id)
+        yield created_at, post_id
+
+
+def is_pull_author(user: Optional[User]) -> bool:
+    """
+    High-follower authors are not fanned out on write; their posts are merged in at read time.
+    """
+    return bool(user) and user.followers_count >= settings.TIMELINE_PULL_THRESHOLD
+
+
+class TimelineService:
+    """
+    Maintains the materialized home timeline stored in the `timelines` collection.
+
+    Writes happen when a post is created or shared (fan-out to every active follower),
+    when a follow becomes active (backfill) and when a relationship ends (prune).
+    Authors above TIMELINE_PULL_THRESHOLD followers are skipped at write time and
+    merged into the page at read time, which keeps write amplification bounded.
+    """
+
+    def __init__(self):
+        self.graph_cache = SocialGraphCache()
+
+    @staticmethod
+    def _upsert_op(owner_id: str, post: Post) -> UpdateOne:
+        # Upsert keeps fan-out idempotent if it runs twice for the same post
+        return UpdateOne(
+            {"owner_id": owner_id, "post_id": str(post.id)},
+            {"$setOnInsert": {
+                "owner_id": owner_id,
+                "post_id": str(post.id),
+                "author_id": post.owner_id,
+                "created_at": post.created_at
+            }},
+            upsert=True
+        )
+
+    async def _write(self, ops: List[UpdateOne]):
+        if ops:
+            await TimelineEntry.get_pymongo_collection().bulk_write(ops, ordered=False)
+
+    async def add_own_post(self, post: Post):
+        """
+        Puts a new post on its author's timeline only. fan_out_post repeats this write
+        harmlessly, so callers that defer fan-out can show the author their post at once.
+        """
+        await self._write([self._upsert_op(post.owner_id, post)])
+
+    async def fan_out_post(self, post: Post, author: Optional[User] = None):
+        """
+        Pushes a new post onto the author's own timeline and every active follower's timeline.
+        Followers are streamed in batches so large audiences don't load into memory at once.
+        """
+        ops = [self._upsert_op(post.owner_id, post)]
+
+        if author is None:
+            author = await User.get(PydanticObjectId(post.owner_id))
+
+        if is_pull_author(author):
+            # Followers pick this post up at read time
+            await self._write(ops)
+            return
+
+        followers = UserFollows.find(
+            UserFollows.following_id == post.owner_id,
+            UserFollows.status == FollowStatus.ACTIVE
+        ).project(FollowerProjection)
+
+        async for follow in followers:
+            ops.append(self._upsert_op(follow.follower_id, post))
+            if len(ops) >= settings.TIMELINE_FANOUT_BATCH_SIZE:
+                await self._write(ops)
+                ops = []
+
+        await self._write(ops)
+
+    async def backfill(self, follower_id: str, author_id: str, author: Optional[User] = None):
+        """
+        Copies the author's most recent posts into the follower's timeline.
+        Called when a follow becomes active so the feed isn't empty until the next post.
+        """
+        if author is None:
+            author = await User.get(PydanticObjectId(author_id))
+
+        if is_pull_author(author):
+            return
+
+        posts = await Post.find(
+            Post.owner_id == author_id, LIVE_POSTS
+        ).sort(-Post.created_at).limit(settings.TIMELINE_BACKFILL_LIMIT).to_list()
+
+        await self._write([self._upsert_op(follower_id, p) for p in posts])
+
+    async def prune(self, follower_id: str, author_id: str):
+        """
+        Removes every entry authored by author_id from follower_id's timeline.
+        """
+        await TimelineEntry.find(
+            TimelineEntry.owner_id == follower_id,
+            TimelineEntry.author_id == author_id
+        ).delete()
+
+    async def remove_post(self, post_id: str):
+        await TimelineEntry.find(TimelineEntry.post_id == post_id).delete()
+
+    async def rebuild(self, user_id: str, exclude_author_ids: Iterable[str] = ()) -> int:
+        """
+        Materializes a timeline from scratch using the pull query.
+        Used for accounts whose timeline predates fan-out-on-write.
+        """
+        following = await self.graph_cache.get_following(user_id)
+
+        author_ids = list(following - set(exclude_author_ids))
+        author_ids.append(user_id)
+
+        posts = await Post.find(
+            In(Post.owner_id, author_ids), LIVE_POSTS
+        ).sort(-Post.created_at).limit(settings.TIMELINE_MAX_ENTRIES).to_list()
+
+        await self._write([self._upsert_op(user_id, p) for p in posts])
+        await User.get_pymongo_collection().update_one(
+            {"_id": PydanticObjectId(user_id)}, {"$set": {"timeline_built_at": datetime.now(timezone.utc)}}
+        )
+        return len(posts)
+
+    async def _needs_rebuild(self, user_id: str) -> bool:
+        """
+        True until the user's timeline has been rebuilt once. Entries written by fan-out
+        since the deploy don't count: they say nothing about the posts from before it.
+        """
+        user = await User.get_pymongo_collection().find_one(
+            {"_id": PydanticObjectId(user_id)}, {"timeline_built_at": 1}
+        )
+        return user is not None and user.get("timeline_built_at") is None
+
+    async def get_timeline_posts(self, user_id: str, limit: int = 10, cursor: Optional[str] = None) -> Tuple[List[Post], Optional[str]]:
+        """
+        Reads a page of the timeline and returns the posts in timeline order plus the next cursor.
+        Materialized entries are merged with recent posts from followed pull authors.
+        """
+        after = self._decode_timeline_cursor(cursor)
+
+        # limit + 1 from every source tells us whether another page exists
+        refs = await self._read_refs(user_id, limit + 1, after, allow_rebuild=after is None)
+
+        refs, next_cursor = slice_page(refs, limit, lambda ref: ref)
+        if not refs:
+            return [], None
+
+        # Entries whose post has been deleted are simply skipped
+        posts = await find_posts_by_ids([post_id for _, post_id in refs])
+        return posts, next_cursor
+
+    async def get_refs_since(self, user_id: str, cursor: Optional[str], limit: int) -> List[TimelineRef]:
+        """
+        Refs newer than the post `cursor` points at, newest first, at most `limit`.
+        Timeline entries are read from the (owner_id, created_at, post_id) index alone.
+        Posts of followed pull authors walk the (owner_id, created_at) index but fetch
+        each match to check is_deleted, which is cheap since there are few of them.
+        """
+        head = self._decode_timeline_cursor(cursor)
+
+        entry_query = {"owner_id": user_id}
+        if head:
+            entry_query = {"$and": [entry_query, keyset_filter(NEWER_TIMELINE_SORT, head)]}
+
+        entries = await TimelineEntry.get_pymongo_collection().find(
+            entry_query, {"_id": 0, "created_at": 1, "post_id": 1}
+        ).sort(TIMELINE_SORT).limit(limit).to_list(None)
+        refs = [(e["created_at"], e["post_id"]) for e in entries]
+
+        pull_author_ids = await self._followed_pull_authors(user_id)
+        if pull_author_ids:
+            pull_query = {"owner_id": {"$in": pull_author_ids}, **LIVE_POSTS}
+            if head:
+                newer = keyset_filter(NEWER_CHRONOLOGICAL_SORT, [head[0], PydanticObjectId(head[1])])
+                pull_query = {"$and": [pull_query, newer]}
+
+            pulled = await Post.get_pymongo_collection().find(
+                pull_query, {"_id": 1, "created_at": 1}
+            ).sort(CHRONOLOGICAL_SORT).limit(limit).to_list(None)
+            pulled_refs = [(p["created_at"], str(p["_id"])) for p in pulled]
+            refs = list(islice(merge_timeline_refs(refs, pulled_refs), limit))
+
+        return refs
+
+    @staticmethod
+    def head_cursor(posts: List[Post]) -> Optional[str]:
+        """
+        Cursor pointing at the newest post of a first page, for /feed/timeline/since.
+        """
+        return encode_cursor(posts[0].created_at, str(posts[0].id)) if posts else None
+
+    @staticmethod
+    def _decode_timeline_cursor(cursor: Optional[str]) -> Optional[List]:
+        after = decode_cursor(cursor, len(TIMELINE_SORT), (datetime, str)) if cursor else None
+        if after and not PydanticObjectId.is_valid(after[1]):
+            raise InvalidCursorException()
+        return after
+
+    async def get_ranked_timeline_posts(self, user_id: str, limit: int = 10, cursor: Optional[str] = None) -> Tuple[List[Post], List[ScoreBreakdown], Optional[str]]:
+        """
+        Relevance mode: scores the newest TIMELINE_RANK_WINDOW timeline posts in one
+        vectorized batch and returns a page of them in score order with their breakdown.
+
+        The cursor pins the snapshot time and the offset into the ranking, so later pages
+        rank the same candidate window the same way (only counters can move in between).
+        """
+        snapshot, offset = self._decode_rank_cursor(cursor)
+
+        refs = await self._read_refs(
+            user_id,
+            settings.TIMELINE_RANK_WINDOW,
+            [snapshot, MAX_POST_ID],
+            allow_rebuild=cursor is None
+        )
+        if not refs:
+            return [], [], None
+
+        stats, affinity = await asyncio.gather(
+            Post.find(
+                In(Post.id, [PydanticObjectId(post_id) for _, post_id in refs])
+            ).project(PostStatsProjection).to_list(),
+            self._author_affinity(user_id)
+        )
+        stats_map = {str(s.id): s for s in stats}
+        candidates = [(created_at, stats_map[post_id]) for created_at, post_id in refs if post_id in stats_map]
+
+        ranked = score_candidates(
+            created_at=[c for c, _ in candidates],
+            likes=[s.likes_count for _, s in candidates],
+            comments=[s.comments_count for _, s in candidates],
+            shares=[s.share_count for _, s in candidates],
+            author_ids=[s.owner_id for _, s in candidates],
+            author_affinity=affinity,
+            now=snapshot
+        )
+
+        page = range(offset, min(offset + limit, len(candidates)))
+        scores = {}
+        for rank in page:
+            post_id = str(candidates[ranked.order[rank]][1].id)
+            scores[post_id] = ScoreBreakdown(
+                post_id=post_id,
+                score=round(float(ranked.score[rank]), 4),
+                recency=round(float(ranked.recency[rank]), 4),
+                velocity=round(float(ranked.velocity[rank]), 4),
+                affinity=round(float(ranked.affinity[rank]), 4)
+            )
+
+        next_cursor = encode_cursor(snapshot, offset + limit) if offset + limit < len(candidates) else None
+
+        # Posts deleted since the stats read are skipped along with their score
+        posts = await find_posts_by_ids(list(scores))
+        return posts, [scores[str(p.id)] for p in posts], next_cursor
+
+    @staticmethod
+    def _decode_rank_cursor(cursor: Optional[str]) -> Tuple[datetime, int]:
+        if not cursor:
+            # Naive UTC, like the datetimes Mongo hands back
+            return datetime.now(timezone.utc).replace(tzinfo=None), 0
+
+        snapshot, offset = decode_cursor(cursor, 2)
+        if not isinstance(snapshot, datetime) or not isinstance(offset, int) or offset < 0:
+            raise InvalidCursorException()
+        return snapshot.replace(tzinfo=None), offset
+
+    async def _author_affinity(self, user_id: str) -> Dict[str, float]:
+        """
+        How often the viewer recently liked or commented on each author's posts.
+        """
+        lookback = settings.TIMELINE_RANK_AFFINITY_LOOKBACK
+        likes, comments = await asyncio.gather(
+            PostLike.find(PostLike.user_id == user_id).sort("-created_at").limit(lookback).project(PostIdProjection).to_list(),
+            Comment.find(
+                Comment.user_id == user_id,
+                Comment.is_deleted == False
+            ).sort("-created_at").limit(lookback).project(PostIdProjection).to_list()
+        )
+
+        post_ids = [i.post_id for i in likes + comments]
+        object_ids = {PydanticObjectId(pid) for pid in post_ids if PydanticObjectId.is_valid(pid)}
+        if not object_ids:
+            return {}
+
+        owners = await Post.find(In(Post.id, list(object_ids))).project(PostOwnerProjection).to_list()
+        owner_of = {str(p.id): p.owner_id for p in owners}
+
+        counts = Counter(owner_of[pid] for pid in post_ids if pid in owner_of)
+        counts.pop(user_id, None)  # Engaging with your own posts says nothing about taste
+        return dict(counts)
+
+    async def _read_refs(self, user_id: str, limit: int, after: Optional[List], allow_rebuild: bool) -> List[TimelineRef]:
+        """
+        Newest-first refs after `after`: materialized entries merged with followed pull authors.
+        """
+        pull_author_ids = await self._followed_pull_authors(user_id)
+
+        if allow_rebuild and await self._needs_rebuild(user_id):
+            # Lazy migration: history from before fan-out-on-write is materialized on the
+            # first read (upserts, so entries fan-out already wrote are kept as they are)
+            await self.rebuild(user_id, exclude_author_ids=pull_author_ids)
+
+        refs = await self._read_entry_refs(user_id, limit, after)
+
+        if pull_author_ids:
+            pulled = await self._read_pull_refs(pull_author_ids, limit, after)
+            refs = list(islice(merge_timeline_refs(refs, pulled), limit))
+
+        return refs
+
+    async def _read_entry_refs(self, user_id: str, limit: int, after: Optional[List]) -> List[TimelineRef]:
+        query = {"owner_id": user_id}
+        if after:
+            query = {"$and": [query, keyset_filter(TIMELINE_SORT, after)]}
+
+        entries = await TimelineEntry.find(query).sort(
+            "-created_at", "-post_id"
+        ).limit(limit).project(EntryRefProjection).to_list()
+        return [(e.created_at, e.post_id) for e in entries]
+
+    async def _followed_pull_authors(self, user_id: str) -> List[str]:
+        """
+        Returns the pull authors the user actively follows: the cached pull author set
+        intersected with the cached following set.
+        """
+        pull_authors = await self.graph_cache.get_pull_authors()
+        if not pull_authors:
+            return []
+
+        following = await self.graph_cache.get_following(user_id)
+        return sorted(pull_authors & following)
+
+    async def _read_pull_refs(self, author_ids: List[str], limit: int, after: Optional[List]) -> List[TimelineRef]:
+        query = {"owner_id": {"$in": author_ids}, **LIVE_POSTS}
+        if after:
+            # Timeline cursors carry the post id as a string; posts are keyed by ObjectId
+            query = {"$and": [query, keyset_filter(CHRONOLOGICAL_SORT, [after[0], PydanticObjectId(after[1])])]}
+
+        posts = await Post.find(query).sort(
+            "-created_at", "-_id"
+        ).limit(limit).project(PostRefProjection).to_list()
+        return [(p.created_at, str(p.id)) for p in posts]
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from typing import List, Optional, Set
+
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.services.redis import redis_client
+from app.feed.schemas import TimelinePageResponse
+from app.feed.service import TimelineService
+from app.following.graph_cache import SocialGraphCache
+from app.posts.hydrator import PostHydrator
+from app.stories.schemas import StoryFeedItem
+from app.stories.service import StoryService
+
+# Warm-ups never hold more than FEED_WARMUP_CONCURRENCY Mongo-heavy jobs at once per
+# process, and logins beyond FEED_WARMUP_MAX_PENDING queued jobs simply skip the warm-up.
+_semaphore = asyncio.Semaphore(settings.FEED_WARMUP_CONCURRENCY)
+_pending: Set[str] = set()
+_tasks: Set[asyncio.Task] = set()  # Strong refs so running tasks aren't garbage collected
+
+_story_tray = TypeAdapter(List[StoryFeedItem])
+
+
+def _timeline_key(user_id: str) -> str:
+    return f"feed:warm:timeline:{user_id}"
+
+
+def _stories_key(user_id: str) -> str:
+    return f"feed:warm:stories:{user_id}"
+
+
+def _lock_key(user_id: str) -> str:
+    return f"feed:warm:lock:{user_id}"
+
+
+def schedule_feed_warmup(user_id: str):
+    """
+    Starts a background warm-up of the user's first timeline page and story tray.
+    Returns immediately; duplicate and excess requests are dropped.
+    """
+    if user_id in _pending or len(_pending) >= settings.FEED_WARMUP_MAX_PENDING:
+        return
+
+    _pending.add(user_id)
+    task = asyncio.create_task(_run_warmup(user_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _run_warmup(user_id: str):
+    try:
+        # Cross-process dedup: one warm-up per user per TTL window
+        claimed = await redis_client.set(_lock_key(user_id), "1", nx=True, ex=settings.FEED_WARMUP_TTL)
+        if not claimed:
+            return
+
+        async with _semaphore:
+            await warm_up_feed(user_id)
+    except RedisError as e:
+        logging.warning(f"Feed warm-up skipped for {user_id}, cache unavailable: {e}")
+    except Exception as e:
+        logging.exception(e)
+    finally:
+        _pending.discard(user_id)
+
+
+async def warm_up_feed(user_id: str):
+    """
+    Loads everything the first feed screen needs and parks it in Redis for one read:
+    the graph cache sets, the (lazily rebuilt) timeline, its hydrated first page and
+    the story tray.
+    """
+    graph_cache = SocialGraphCache()
+    await asyncio.gather(graph_cache.get_following(user_id), graph_cache.get_blocked(user_id))
+
+    timeline_service = TimelineService()
+    posts, next_cursor = await timeline_service.get_timeline_posts(user_id, settings.FEED_WARMUP_PAGE_SIZE)
+    page = TimelinePageResponse(
+        items=await PostHydrator(user_id).hydrate(posts),
+        next_cursor=next_cursor,
+        head_cursor=TimelineService.head_cursor(posts)
+    )
+
+    tray = await StoryService.get_stories_feed(user_id)
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.set(_timeline_key(user_id), page.model_dump_json(by_alias=True), ex=settings.FEED_WARMUP_TTL)
+        pipe.set(_stories_key(user_id), _story_tray.dump_json(tray), ex=settings.FEED_WARMUP_TTL)
+        await pipe.execute()
+
+
+async def pop_warm_timeline(user_id: str) -> Optional[TimelinePageResponse]:
+    """
+    Returns the prefetched first timeline page, if any. Each prefetch is served once.
+    """
+    try:
+        cached = await redis_client.getdel(_timeline_key(user_id))
+    except RedisError:
+        return None
+    return TimelinePageResponse.model_validate_json(cached) if cached else None
+
+
+async def pop_warm_story_tray(user_id: str) -> Optional[List[StoryFeedItem]]:
+    """
+    Returns the prefetched story tray, if any. Each prefetch is served once.
+    """
+    try:
+        cached = await redis_client.getdel(_stories_key(user_id))
+    except RedisError:
+        return None
+    return _story_tray.validate_json(cached) if cached else None
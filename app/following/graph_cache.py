@@ -0,0 +1,236 @@
+import logging
+from typing import Awaitable, Callable, Iterable, Set
+
+from beanie import PydanticObjectId
+from pydantic import BaseModel, ConfigDict, Field
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.db.models import User, UserFollows, UserBlocks, FollowStatus
+from app.core.services.redis import redis_client
+
+# Every cached set carries this member once it has been loaded from Mongo, so an
+# empty graph ("follows nobody") can be told apart from a cache miss.
+_LOADED = "*"
+
+# Every write bumps the set's generation (KEYS[2]), loaded or not, then adds/removes the
+# member only if the set is loaded; otherwise the next read loads it from Mongo anyway
+# and a partial set without TTL would just linger.
+_WRITE_IF_LOADED = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1 then
+    return redis.call(ARGV[2], KEYS[1], ARGV[3])
+end
+return 0
+"""
+
+# Stores a set loaded from Mongo only if no write happened since the load started (the
+# generation is still ARGV[1]); otherwise the load may predate the write and is dropped.
+_STORE_IF_CURRENT = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+for i = 3, #ARGV, 1000 do
+    redis.call('SADD', KEYS[1], unpack(ARGV, i, math.min(i + 999, #ARGV)))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class FollowingProjection(BaseModel):
+    following_id: str
+
+
+class FollowerProjection(BaseModel):
+    follower_id: str
+
+
+class BlockProjection(BaseModel):
+    blocker_id: str
+    blocked_id: str
+
+
+class UserIdProjection(BaseModel):
+    id: PydanticObjectId = Field(alias="_id")
+    model_config = ConfigDict(populate_by_name=True)
+
+
+# Shared by every reader; no write-through, PULL_AUTHORS_CACHE_TTL bounds staleness
+_PULL_AUTHORS_KEY = "graph:pull_authors"
+
+
+def _following_key(user_id: str) -> str:
+    return f"graph:following:{user_id}"
+
+
+def _blocks_key(user_id: str) -> str:
+    return f"graph:blocks:{user_id}"
+
+
+def _generation_key(key: str) -> str:
+    return f"{key}:gen"
+
+
+class SocialGraphCache:
+    """
+    Redis-backed copy of each user's following set (active follows only) and block
+    set (users they blocked or were blocked by).
+
+    Sets are loaded from Mongo on first read and kept current write-through by
+    FollowService. GRAPH_CACHE_TTL bounds how long an idle set (or one that missed a
+    write while Redis was unreachable) lives. If Redis is down, reads fall back to Mongo.
+    """
+
+    def __init__(self):
+        self.redis = redis_client
+        self._write_if_loaded = self.redis.register_script(_WRITE_IF_LOADED)
+        self._store_if_current = self.redis.register_script(_STORE_IF_CURRENT)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    async def get_following(self, user_id: str) -> Set[str]:
+        """
+        IDs of users that user_id actively follows.
+        """
+        return await self._read(_following_key(user_id), lambda: self._load_following(user_id))
+
+    async def get_blocked(self, user_id: str) -> Set[str]:
+        """
+        IDs of users on either side of a block with user_id.
+        """
+        return await self._read(_blocks_key(user_id), lambda: self._load_blocked(user_id))
+
+    async def get_pull_authors(self) -> Set[str]:
+        """
+        IDs of users with at least TIMELINE_PULL_THRESHOLD followers (see
+        app/feed/service.py). An author who crosses the threshold is picked up by the
+        next reload, at most PULL_AUTHORS_CACHE_TTL seconds later.
+        """
+        return await self._read(_PULL_AUTHORS_KEY, self._load_pull_authors, ttl=settings.PULL_AUTHORS_CACHE_TTL)
+
+    async def followers_among(self, user_ids: Iterable[str], target_id: str) -> Set[str]:
+        """
+        Returns the subset of user_ids that actively follow target_id.
+        Answered from each candidate's cached following set in one pipelined round trip;
+        only candidates whose set isn't cached are checked in Mongo.
+        """
+        user_ids = list(user_ids)
+        if not user_ids:
+            return set()
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for uid in user_ids:
+                    pipe.smismember(_following_key(uid), [_LOADED, target_id])
+                results = await pipe.execute()
+        except RedisError as e:
+            logging.warning(f"Graph cache unavailable, falling back to Mongo: {e}")
+            results = [None] * len(user_ids)
+
+        found, uncached = set(), []
+        for uid, result in zip(user_ids, results):
+            if result and result[0]:
+                if result[1]:
+                    found.add(uid)
+            else:
+                uncached.append(uid)
+
+        if uncached:
+            records = await UserFollows.find({
+                "follower_id": {"$in": uncached},
+                "following_id": target_id,
+                "status": FollowStatus.ACTIVE
+            }).project(FollowerProjection).to_list()
+            found.update(r.follower_id for r in records)
+
+        return found
+
+    # ------------------------------------------------------------------
+    # Write-through (called by FollowService after the Mongo write)
+    # ------------------------------------------------------------------
+
+    async def add_following(self, follower_id: str, following_id: str):
+        await self._write(_following_key(follower_id), "SADD", following_id)
+
+    async def remove_following(self, follower_id: str, following_id: str):
+        await self._write(_following_key(follower_id), "SREM", following_id)
+
+    async def add_block(self, blocker_id: str, blocked_id: str):
+        await self._write(_blocks_key(blocker_id), "SADD", blocked_id)
+        await self._write(_blocks_key(blocked_id), "SADD", blocker_id)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    async def _read(self, key: str, loader: Callable[[], Awaitable[Set[str]]], ttl: int = None) -> Set[str]:
+        try:
+            # The generation is read before Mongo, so a write landing during the load is noticed
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.smembers(key)
+                pipe.get(_generation_key(key))
+                members, generation = await pipe.execute()
+        except RedisError as e:
+            logging.warning(f"Graph cache unavailable, falling back to Mongo: {e}")
+            return await loader()
+
+        if _LOADED in members:
+            members.discard(_LOADED)
+            return members
+
+        ids = await loader()
+        await self._store(key, ids, generation or "", ttl or settings.GRAPH_CACHE_TTL)
+        return ids
+
+    async def _store(self, key: str, ids: Set[str], generation: str, ttl: int):
+        try:
+            await self._store_if_current(
+                keys=[key, _generation_key(key)],
+                args=[generation, ttl, _LOADED, *ids]
+            )
+        except RedisError as e:
+            logging.warning(f"Could not cache {key}: {e}")
+
+    async def _write(self, key: str, command: str, member: str):
+        try:
+            await self._write_if_loaded(
+                keys=[key, _generation_key(key)], args=[_LOADED, command, member, settings.GRAPH_CACHE_TTL]
+            )
+        except RedisError as e:
+            # The set may now be stale; dropping it forces a reload from Mongo
+            logging.warning(f"Graph cache write failed for {key}: {e}")
+            try:
+                await self.redis.delete(key)
+            except RedisError:
+                pass
+
+    async def _load_following(self, user_id: str) -> Set[str]:
+        records = await UserFollows.find(
+            UserFollows.follower_id == user_id,
+            UserFollows.status == FollowStatus.ACTIVE
+        ).project(FollowingProjection).to_list()
+        return {r.following_id for r in records}
+
+    async def _load_pull_authors(self) -> Set[str]:
+        # One small query on the followers_count index: pull authors are rare
+        users = await User.find(
+            User.followers_count >= settings.TIMELINE_PULL_THRESHOLD
+        ).project(UserIdProjection).to_list()
+        return {str(u.id) for u in users}
+
+    async def _load_blocked(self, user_id: str) -> Set[str]:
+        records = await UserBlocks.find({
+            "$or": [
+                {"blocker_id": user_id},
+                {"blocked_id": user_id}
+            ]
+        }).project(BlockProjection).to_list()
+        blocked = {r.blocked_id for r in records}
+        blocked.update(r.blocker_id for r in records)
+        blocked.discard(user_id)
+        return blocked
@@ -45,7 +45,7 @@ async def get_user_profile(identifier: str):
 @router.get("/{user_id}/followers", response_model=FollowListResponse)
 async def get_followers(
     user_id: str,
-    limit: int = Query(20, le=100),
+    limit: int = Query(20, ge=1, le=100),
     cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
@@ -59,7 +59,7 @@ async def get_followers(
 @router.get("/{user_id}/following", response_model=FollowListResponse)
 async def get_following(
     user_id: str,
-    limit: int = Query(20, le=100),
+    limit: int = Query(20, ge=1, le=100),
     cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
@@ -108,7 +108,7 @@ async def unfollow_user_endpoint(
 
 @router.get("/requests/pending", response_model=FollowListResponse)
 async def get_pending_requests(
-    limit: int = Query(20, le=100),
+    limit: int = Query(20, ge=1, le=100),
     cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
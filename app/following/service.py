@@ -9,10 +9,14 @@ from pydantic import BaseModel, Field, ConfigDict
 from app.core.errors import SelfOperationException, UnauthorizedActionException, UserNotFoundException, RelationshipNotFoundException, PrivacyException, ContentValidationException
 from app.notification.service import NotificationService
 from app.notification.models import NotificationType
+from app.feed.service import TimelineService
+from app.following.graph_cache import SocialGraphCache
 
 class FollowService:
     def __init__(self):
         self.notification_service = NotificationService()
+        self.timeline_service = TimelineService()
+        self.graph_cache = SocialGraphCache()
 
     async def follow_user(self, follower_id: str, target_user_id: str):
         """
@@ -111,6 +115,11 @@ class FollowService:
         )
         await new_follow.save()
 
+        # Seed the follower's timeline with the target's recent posts
+        if status == FollowStatus.ACTIVE:
+            await self.graph_cache.add_following(follower_id, target_user_id)
+            await self.timeline_service.backfill(follower_id, target_user_id, author=target_user)
+
         return {
             "status": "success",
             "relationship_status": status
@@ -140,6 +149,10 @@ class FollowService:
                 await follower.inc({User.following_count: -1})
 
         await follow_record.delete()
+        await self.graph_cache.remove_following(follower_id, following_id)
+
+        # Drop the former followee's posts from the follower's timeline
+        await self.timeline_service.prune(follower_id, following_id)
         return True
 
     async def unfollow_user(self, follower_id: str, target_user_id: str):
@@ -175,6 +188,7 @@ class FollowService:
         # 2. Create Block Entry
         new_block = UserBlocks(blocker_id=blocker_id, blocked_id=blocked_id)
         await new_block.save()
+        await self.graph_cache.add_block(blocker_id, blocked_id)
 
         # 3. Destructive Cleanup: Unfollow blocker -> blocked
         await self._remove_relationship(blocker_id, blocked_id)
@@ -182,9 +196,13 @@ class FollowService:
         # 4. Destructive Cleanup: Force unfollow blocked -> blocker
         await self._remove_relationship(blocked_id, blocker_id)
 
-        # 5. Cache Invalidation
-        # TODO: Clear any cached feeds for current_user (blocker) that might contain blocked_id's content.
-        # e.g., await redis.delete(f"feed:{blocker_id}")
+        # 5. Timeline Cleanup
+        # _remove_relationship prunes when a follow existed; prune again in case
+        # the timeline holds entries from an earlier follow (e.g. a lazy rebuild).
+        await asyncio.gather(
+            self.timeline_service.prune(blocker_id, blocked_id),
+            self.timeline_service.prune(blocked_id, blocker_id)
+        )
 
         return {"status": "success", "message": "User blocked successfully."}
 
@@ -210,6 +228,7 @@ class FollowService:
         if action == "accept":
             follow_record.status = FollowStatus.ACTIVE
             await follow_record.save()
+            await self.graph_cache.add_following(follower_id, target_user_id)
 
             # Increment counts
             target_user = await User.get(PydanticObjectId(target_user_id))
@@ -219,6 +238,8 @@ class FollowService:
             follower = await User.get(PydanticObjectId(follower_id))
             if follower:
                 await follower.inc({User.following_count: 1})
+
+            await self.timeline_service.backfill(follower_id, target_user_id, author=target_user)
             
             # Notification for the follower that their request was accepted
             await self.notification_service.create_notification(
@@ -4,7 +4,7 @@ from fastapi import WebSocket
 
 from app.messenger.models import Conversation, Message
 from app.messenger.schemas import StartConversationRequest, SendMessageRequest, ConversationResponse, MessageResponse
-from app.posts.models import Media
+from app.core.media.service import MediaService
 from app.core.db.models import User
 from app.core.errors import ConversationNotFoundException, ContentValidationException
 from beanie.operators import In, And
@@ -149,9 +149,8 @@ class MessengerService:
 
         media_link = None
         if req.media_id:
-             media_item = await Media.get(req.media_id)
-             if media_item:
-                 media_link = media_item.to_ref() # Or Just link
+            [media_item] = await MediaService.resolve_owned_media(user_id, [req.media_id])
+            media_link = media_item.to_ref()
 
         msg = Message(
             conversation_id=conversation_id,
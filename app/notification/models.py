@@ -2,6 +2,7 @@ from enum import Enum
 from datetime import datetime
 from typing import Optional, Dict, Any
 from beanie import Document, Indexed
+from pymongo import IndexModel
 from pydantic import Field
 
 class NotificationType(str, Enum):
@@ -25,4 +26,12 @@ class Notification(Document):
         name = "notifications"
         indexes = [
             [("recipient_id", 1), ("created_at", -1)],
+            [("actor_id", 1)], # Account deletion
+            # Mentions are written by create_notifications_once, which upserts on this key;
+            # the index stops two replays of the same outbox event from both inserting
+            IndexModel(
+                [("recipient_id", 1), ("actor_id", 1), ("type", 1), ("target_id", 1)],
+                unique=True,
+                partialFilterExpression={"type": NotificationType.MENTION.value}
+            ),
         ]
@@ -1,6 +1,8 @@
 from datetime import datetime
 from typing import List, Optional
 from beanie import PydanticObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from .models import Notification, NotificationType
 from app.core.db.models import User
 
@@ -26,6 +28,29 @@ class NotificationService:
         await notification.save()
         return notification
 
+    async def create_notifications_once(self, notifications: List[Notification]):
+        """
+        Writes many notifications in one round trip. Each is upserted on
+        (recipient, actor, type, target), so replaying the same batch notifies nobody twice.
+        For mentions that key is unique, so concurrent replays can't both insert either.
+        """
+        ops = []
+        for n in notifications:
+            if n.recipient_id == n.actor_id:
+                continue  # Don't notify yourself
+            doc = n.model_dump(exclude={"id", "revision_id"})
+            doc["type"] = n.type.value
+            key = {"recipient_id": n.recipient_id, "actor_id": n.actor_id, "type": doc["type"], "target_id": n.target_id}
+            ops.append(UpdateOne(key, {"$setOnInsert": doc}, upsert=True))
+
+        if ops:
+            try:
+                await Notification.get_pymongo_collection().bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                # A concurrent replay inserted the same notification first: already done
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    raise
+
     async def get_user_notifications(self, user_id: str, limit: int = 20, offset: int = 0):
         notifications = await Notification.find(
             Notification.recipient_id == user_id
@@ -0,0 +1,293 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.services.redis import redis_client
+from app.posts.schemas import PostResponse
+
+# Viewer-specific; never stored, always False in a cached response
+_VIEWER_FIELDS = {"is_liked", "is_bookmarked"}
+_EXCLUDE = {**{f: True for f in _VIEWER_FIELDS}, "original_post": {f: True for f in _VIEWER_FIELDS}}
+
+# Every process drops its in-memory copies when a message arrives here
+_INVALIDATION_CHANNEL = "postcache:invalidate"
+
+# How long other processes wait for the one loading a missed post before loading it themselves
+_FILL_WAIT_STEPS = 10
+_FILL_WAIT_SECONDS = 0.05
+
+
+def _post_key(post_id: str) -> str:
+    return f"postcache:post:{post_id}"
+
+
+def _fill_lock_key(post_id: str) -> str:
+    return f"postcache:fill:{post_id}"
+
+
+def _post_deps_key(post_id: str) -> str:
+    # Cached posts that embed post_id (shares of it)
+    return f"postcache:deps:post:{post_id}"
+
+
+def _user_deps_key(user_id: str) -> str:
+    # Cached posts that embed user_id as author or original author
+    return f"postcache:deps:user:{user_id}"
+
+
+def _dependencies(response: PostResponse) -> Tuple[Set[str], Set[str]]:
+    """
+    Post ids and user ids whose changes make this cached response stale.
+    """
+    post_ids, user_ids = {response.id}, {response.owner_id}
+    if response.original_post:
+        post_ids.add(response.original_post.id)
+        user_ids.add(response.original_post.owner_id)
+    return post_ids, user_ids
+
+
+class PostCache:
+    """
+    Two-tier read-through cache of viewer-independent PostResponses for GET /posts/{id}.
+
+    Tier 1 is a per-process LRU with a short TTL (POST_CACHE_LOCAL_TTL); tier 2 is Redis
+    (POST_CACHE_TTL). A miss is loaded once: concurrent requests in the same process await
+    the same load, and other processes wait briefly on a Redis fill lock.
+
+    Writers call invalidate_posts / invalidate_user after the Mongo write. That deletes
+    the Redis entries (including shares that embed the post, and posts by the user) and
+    publishes the ids so every process drops its local copies too. If Redis is down the
+    cache degrades to the local tier and plain loads.
+    """
+
+    def __init__(self):
+        self.redis = redis_client
+        # post_id -> (expires_at, json, post dependencies, user dependencies)
+        self._local: "OrderedDict[str, Tuple[float, str, Set[str], Set[str]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Bumped on invalidation so a load that started before it isn't stored locally
+        self._generation: Dict[str, int] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    async def get(self, post_id: str, loader: Callable[[], Awaitable[PostResponse]]) -> PostResponse:
+        """
+        Returns the cached response for post_id, calling `loader` on a miss.
+        Exceptions raised by the loader (e.g. PostNotFoundException) reach every waiter.
+        """
+        cached = self._get_local(post_id)
+        if cached is not None:
+            return PostResponse.model_validate_json(cached)
+
+        inflight = self._inflight.get(post_id)
+        if inflight is not None:
+            try:
+                return PostResponse.model_validate_json(await asyncio.shield(inflight))
+            except asyncio.CancelledError:
+                # The request doing the load went away; load it ourselves unless we were cancelled too
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                return await self.get(post_id, loader)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[post_id] = future
+        try:
+            payload = await self._fill(post_id, loader)
+            future.set_result(payload)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody may be waiting; don't let the loop log "exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(post_id, None)
+
+        return PostResponse.model_validate_json(payload)
+
+    async def _fill(self, post_id: str, loader: Callable[[], Awaitable[PostResponse]]) -> str:
+        generation = self._generation.get(post_id, 0)
+
+        # 1. Redis; if another process is already loading this post, give it a moment
+        payload = await self._get_remote(post_id)
+        if payload is None and not await self._claim_fill(post_id):
+            for _ in range(_FILL_WAIT_STEPS):
+                await asyncio.sleep(_FILL_WAIT_SECONDS)
+                payload = await self._get_remote(post_id)
+                if payload is not None:
+                    break
+
+        if payload is not None:
+            response = PostResponse.model_validate_json(payload)
+        else:
+            # 2. Mongo
+            response = await loader()
+            payload = response.model_dump_json(by_alias=True, exclude=_EXCLUDE)
+            await self._set_remote(post_id, payload, *_dependencies(response))
+
+        if self._generation.get(post_id, 0) == generation:
+            self._set_local(post_id, payload, *_dependencies(response))
+        else:
+            # Invalidated while loading: what we read may predate the write
+            await self._delete_remote(post_id)
+        return payload
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    async def invalidate_posts(self, *post_ids: str):
+        """
+        Drops the given posts, and every cached share that embeds them, from both tiers.
+        Call after a post is edited, deleted or its counters change.
+        """
+        await self._invalidate(post_ids=set(post_ids), user_ids=set())
+
+    async def invalidate_user(self, user_id: str):
+        """
+        Drops every cached post that shows user_id as author (e.g. after a profile edit).
+        """
+        await self._invalidate(post_ids=set(), user_ids={user_id})
+
+    async def _invalidate(self, post_ids: Set[str], user_ids: Set[str]):
+        self._drop_local(post_ids, user_ids)
+
+        dep_keys = [_post_deps_key(p) for p in post_ids] + [_user_deps_key(u) for u in user_ids]
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in dep_keys:
+                    pipe.smembers(key)
+                dependents = await pipe.execute()
+
+            stale = set(post_ids).union(*dependents)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                if stale:
+                    pipe.delete(*[_post_key(p) for p in stale])
+                pipe.delete(*dep_keys)
+                pipe.publish(_INVALIDATION_CHANNEL, json.dumps({"posts": list(stale), "users": list(user_ids)}))
+                await pipe.execute()
+        except RedisError as e:
+            # Entries expire after POST_CACHE_TTL either way
+            logging.warning(f"Post cache invalidation failed for posts {post_ids} / users {user_ids}: {e}")
+
+    # ------------------------------------------------------------------
+    # Cross-process invalidation listener (started in the app lifespan)
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self):
+        backoff = 1
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(_INVALIDATION_CHANNEL)
+                    backoff = 1
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        data = json.loads(message["data"])
+                        self._drop_local(set(data.get("posts", [])), set(data.get("users", [])))
+            except RedisError as e:
+                # Local entries may now miss invalidations; clear them and retry
+                logging.warning(f"Post cache invalidation listener disconnected: {e}")
+                self._local.clear()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+    # ------------------------------------------------------------------
+    # Tiers
+    # ------------------------------------------------------------------
+
+    def _get_local(self, post_id: str) -> Optional[str]:
+        entry = self._local.get(post_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._local[post_id]
+            return None
+        self._local.move_to_end(post_id)
+        return entry[1]
+
+    def _set_local(self, post_id: str, payload: str, post_deps: Set[str], user_deps: Set[str]):
+        self._local[post_id] = (time.monotonic() + settings.POST_CACHE_LOCAL_TTL, payload, post_deps, user_deps)
+        self._local.move_to_end(post_id)
+        while len(self._local) > settings.POST_CACHE_LOCAL_SIZE:
+            self._local.popitem(last=False)
+
+    def _drop_local(self, post_ids: Iterable[str], user_ids: Iterable[str]):
+        post_ids, user_ids = set(post_ids), set(user_ids)
+        for post_id in post_ids:
+            self._generation[post_id] = self._generation.get(post_id, 0) + 1
+        stale = [
+            key for key, (_, _, post_deps, user_deps) in self._local.items()
+            if post_deps & post_ids or user_deps & user_ids
+        ]
+        for key in stale:
+            del self._local[key]
+        # Generations only matter while a load is running
+        for post_id in list(self._generation):
+            if post_id not in self._inflight:
+                del self._generation[post_id]
+
+    async def _get_remote(self, post_id: str) -> Optional[str]:
+        try:
+            return await self.redis.get(_post_key(post_id))
+        except RedisError as e:
+            logging.warning(f"Post cache unavailable: {e}")
+            return None
+
+    async def _delete_remote(self, post_id: str):
+        try:
+            await self.redis.delete(_post_key(post_id))
+        except RedisError as e:
+            logging.warning(f"Could not drop cached post {post_id}: {e}")
+
+    async def _claim_fill(self, post_id: str) -> bool:
+        try:
+            return bool(await self.redis.set(
+                _fill_lock_key(post_id), "1", nx=True, px=int(_FILL_WAIT_STEPS * _FILL_WAIT_SECONDS * 1000)
+            ))
+        except RedisError:
+            return True
+
+    async def _set_remote(self, post_id: str, payload: str, post_deps: Set[str], user_deps: Set[str]):
+        ttl = settings.POST_CACHE_TTL
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.set(_post_key(post_id), payload, ex=ttl)
+                for dep in post_deps:
+                    pipe.sadd(_post_deps_key(dep), post_id)
+                    pipe.expire(_post_deps_key(dep), ttl)
+                for dep in user_deps:
+                    pipe.sadd(_user_deps_key(dep), post_id)
+                    pipe.expire(_user_deps_key(dep), ttl)
+                pipe.delete(_fill_lock_key(post_id))
+                await pipe.execute()
+        except RedisError as e:
+            logging.warning(f"Could not cache post {post_id}: {e}")
+
+
+post_cache = PostCache()
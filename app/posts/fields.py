@@ -0,0 +1,83 @@
+from typing import FrozenSet, Iterable, List, Optional
+
+from fastapi import Query
+
+from app.core.errors import ContentValidationException
+
+# Plain values on the post document (or derived from it without a lookup)
+SCALAR_FIELDS = frozenset({
+    "id", "owner_id", "caption", "likes_count", "comments_count", "share_count", "created_at",
+    "is_liked", "is_bookmarked",
+    "thumbnail_url"  # First media item's thumbnail; only returned when asked for
+})
+
+# Fields that cost a lookup to resolve
+RELATION_FIELDS = frozenset({"author", "media", "location", "original_post"})
+
+DEFAULT_FIELDS = (SCALAR_FIELDS - {"thumbnail_url"}) | RELATION_FIELDS
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+class PostFieldSet:
+    """
+    The PostResponse fields a caller asked for with ?fields= / ?expand=.
+
+    Everything that isn't selected is neither looked up (the page pipeline skips the
+    joins, PostHydrator skips the queries) nor emitted by PostHydrator.hydrate_dicts.
+    `id` is always included.
+    """
+
+    def __init__(self, selected: Iterable[str]):
+        self.selected: FrozenSet[str] = frozenset(selected) | {"id"}
+
+    @classmethod
+    def parse(cls, fields: Optional[str], expand: Optional[str]) -> Optional["PostFieldSet"]:
+        """
+        `fields` picks top-level fields (all of them if omitted); `expand` adds relations
+        (author, media, location, original_post) to it. With neither, returns None:
+        the full, unchanged PostResponse.
+        """
+        if fields is None and expand is None:
+            return None
+
+        requested = _split(fields) if fields is not None else list(SCALAR_FIELDS - {"thumbnail_url"})
+        relations = _split(expand)
+
+        unknown = [f for f in requested if f not in SCALAR_FIELDS | RELATION_FIELDS]
+        unknown += [r for r in relations if r not in RELATION_FIELDS]
+        if unknown:
+            raise ContentValidationException(f"Unknown post fields: {', '.join(unknown)}")
+
+        return cls([*requested, *relations])
+
+    def includes(self, name: str) -> bool:
+        return name in self.selected
+
+    @property
+    def needs_media(self) -> bool:
+        return "media" in self.selected or "thumbnail_url" in self.selected
+
+    @property
+    def needs_engagement(self) -> bool:
+        return "is_liked" in self.selected or "is_bookmarked" in self.selected
+
+
+ALL_FIELDS = PostFieldSet(DEFAULT_FIELDS)
+
+
+def post_fields(
+    fields: Optional[str] = Query(
+        None, description="Comma-separated PostResponse fields, e.g. id,thumbnail_url,likes_count"
+    ),
+    expand: Optional[str] = Query(
+        None, description="Relations to include: author, media, location, original_post"
+    )
+) -> Optional[PostFieldSet]:
+    """
+    Dependency for post list endpoints. None means the full response.
+    """
+    return PostFieldSet.parse(fields, expand)
+
@@ -0,0 +1,195 @@
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import certifi
+from beanie import PydanticObjectId, init_beanie
+from beanie.operators import In
+from pydantic import BaseModel, Field
+from pymongo import AsyncMongoClient, UpdateOne
+
+from app.core.config import settings
+from app.posts.models import Media, MediaStatus, MediaType, Post
+
+# Denormalized on Post so a grid page never loads the media documents
+COVER_FIELDS = ("cover_media_id", "cover_thumbnail_url", "cover_media_type", "media_count")
+
+
+class GridPostProjection(BaseModel):
+    """
+    Everything a grid tile needs, read from the post document itself (the owner_id
+    index finds and orders the page; only limit + 1 documents are fetched).
+    """
+    id: PydanticObjectId = Field(alias="_id")
+    created_at: datetime
+    cover_thumbnail_url: Optional[str] = None
+    cover_media_type: Optional[MediaType] = None
+    media_count: Optional[int] = None  # None: the post predates the cover fields
+    likes_count: int = 0
+    comments_count: int = 0
+
+
+def _cover_thumbnail(media: Optional[Media]) -> Optional[str]:
+    # A PENDING video's public_id is a placeholder; the worker fills this in on activation
+    if media is None or media.status == MediaStatus.PENDING:
+        return None
+    return media.thumbnail_url or None
+
+
+def cover_fields(media: List[Media]) -> dict:
+    """
+    Cover values for a post with these (fetched) media items, in order.
+    """
+    first = media[0] if media else None
+    return {
+        "cover_media_id": str(first.id) if first else None,
+        "cover_thumbnail_url": _cover_thumbnail(first),
+        "cover_media_type": first.file_type if first else None,
+        "media_count": len(media)
+    }
+
+
+def apply_cover(post: Post, source: Optional[Post] = None):
+    """
+    Sets the cover fields from the post's fetched media, or, for a share, copies them
+    from the post it shares.
+    """
+    if source is not None:
+        values = {name: getattr(source, name) for name in COVER_FIELDS}
+    else:
+        values = cover_fields([m for m in post.media if isinstance(m, Media)])
+    for name, value in values.items():
+        setattr(post, name, value)
+
+
+async def refresh_covers(media: Media) -> int:
+    """
+    Rewrites the cover thumbnail of every post (and share) whose cover is `media`.
+    Returns the number of posts updated.
+    """
+    result = await Post.get_pymongo_collection().update_many(
+        {"cover_media_id": str(media.id)},
+        {"$set": {"cover_thumbnail_url": _cover_thumbnail(media), "cover_media_type": media.file_type.value}}
+    )
+    return result.modified_count
+
+
+async def _first_media_refs(post_ids: List[PydanticObjectId]) -> Dict[PydanticObjectId, dict]:
+    pipeline = [
+        {"$match": {"_id": {"$in": post_ids}}},
+        {"$project": {
+            "first_media": {"$first": {"$ifNull": ["$media", []]}},
+            "media_count": {"$size": {"$ifNull": ["$media", []]}},
+            "original_post": 1
+        }}
+    ]
+    docs = await Post.get_pymongo_collection().aggregate(pipeline)
+    return {d["_id"]: d async for d in docs}
+
+
+async def resolve_covers(post_ids: List[PydanticObjectId]) -> Dict[PydanticObjectId, dict]:
+    """
+    Computes cover values for posts that don't have them stored, in at most three
+    queries: the posts' first media links, the same for the posts they share, and the media.
+    """
+    # 1. First media link of each post
+    docs = await _first_media_refs(post_ids)
+
+    # 2. Shares show the cover of the post they share (shares are flattened, one level)
+    original_ids = list({d["original_post"].id for d in docs.values() if d.get("original_post")})
+    originals = await _first_media_refs(original_ids) if original_ids else {}
+
+    def source(doc: dict) -> dict:
+        ref = doc.get("original_post")
+        return originals.get(ref.id, {}) if ref else doc
+
+    # 3. The media documents themselves
+    media_ids = {source(d)["first_media"].id for d in docs.values() if source(d).get("first_media")}
+    media = await Media.find(In(Media.id, list(media_ids))).to_list() if media_ids else []
+    media_map = {m.id: m for m in media}
+
+    covers = {}
+    for post_id, doc in docs.items():
+        src = source(doc)
+        first = media_map.get(src["first_media"].id) if src.get("first_media") else None
+        covers[post_id] = {
+            **cover_fields([first] if first else []),
+            "media_count": src.get("media_count", 0)
+        }
+    return covers
+
+
+def grid_item(row: GridPostProjection) -> dict:
+    """
+    A PostGridItem as a plain dict, for FastJSONResponse.
+    """
+    return {
+        "post_id": str(row.id),
+        "thumbnail_url": row.cover_thumbnail_url,
+        "media_type": row.cover_media_type.value if row.cover_media_type else None,
+        "media_count": row.media_count or 0,
+        "likes_count": row.likes_count,
+        "comments_count": row.comments_count
+    }
+
+
+async def backfill_grid_covers(batch_size: int = 500, after: Optional[str] = None) -> int:
+    """
+    Stores cover fields on every post that has none, walking `posts` in _id order.
+    Safe to stop and resume: pass the last printed id as `after`.
+    """
+    collection = Post.get_pymongo_collection()
+    query = {"media_count": None}
+    if after:
+        query["_id"] = {"$gt": PydanticObjectId(after)}
+
+    updated = 0
+    while True:
+        # 1. Next batch of posts without covers
+        docs = await collection.find(query, {"_id": 1}).sort("_id", 1).limit(batch_size).to_list()
+        if not docs:
+            break
+
+        # 2. Covers for the whole batch; the filter skips posts that got one in the meantime
+        covers = await resolve_covers([d["_id"] for d in docs])
+        ops = [
+            UpdateOne(
+                {"_id": post_id, "media_count": None},
+                {"$set": {**cover, "cover_media_type": cover["cover_media_type"].value if cover["cover_media_type"] else None}}
+            )
+            for post_id, cover in covers.items()
+        ]
+        if ops:
+            result = await collection.bulk_write(ops, ordered=False)
+            updated += result.modified_count
+
+        last_id = docs[-1]["_id"]
+        query["_id"] = {"$gt": last_id}
+        print(f"Backfilled {updated} grid covers so far (last _id {last_id})")
+
+    return updated
+
+
+async def _main(batch_size: int, after: Optional[str]):
+    mongo_options = {}
+    if settings.VALIDATE_CERTS and "localhost" not in settings.MONGODB_URL and "127.0.0.1" not in settings.MONGODB_URL:
+        mongo_options["tlsCAFile"] = certifi.where()
+        mongo_options["tls"] = True
+
+    client = AsyncMongoClient(settings.MONGODB_URL, **mongo_options)
+    try:
+        await init_beanie(database=client[settings.DB_NAME], document_models=[Post, Media])
+        total = await backfill_grid_covers(batch_size=batch_size, after=after)
+        print(f"Done: {total} posts backfilled")
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    # python -m app.posts.grid [--batch-size 500] [--after <post_id>]
+    parser = argparse.ArgumentParser(description="Store profile grid covers on existing posts.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--after", help="Resume after this post _id")
+    args = parser.parse_args()
+    asyncio.run(_main(args.batch_size, args.after))
@@ -0,0 +1,359 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional, Set
+
+from beanie import Link, PydanticObjectId
+from beanie.operators import In
+
+from app.core.auth.schemas import UserPublicModel
+from app.core.db.models import User
+from app.discovery.models import Location
+from app.engagement.models import PostLike, Bookmark
+from app.posts.models import LIVE_POSTS, Media, MediaSnapshot, MediaType, Post
+from app.posts.schemas import MediaResponse, PostResponse
+from app.posts.snapshots import has_media_snapshots
+from app.posts.fields import ALL_FIELDS, PostFieldSet
+
+
+# (JSON key, attribute) pairs of UserPublicModel, resolved once at import
+_AUTHOR_KEYS = [(field.alias or name, name) for name, field in UserPublicModel.model_fields.items()]
+
+# Post attributes that are copied into the response as they are
+_SCALAR_POST_FIELDS = ("owner_id", "caption", "likes_count", "comments_count", "share_count", "created_at")
+
+
+def ref_id(value) -> Optional[str]:
+    """
+    Returns the id behind a Beanie Link, whether or not it has been fetched.
+    """
+    if value is None:
+        return None
+    if isinstance(value, Link):
+        return str(value.ref.id)
+    return str(value.id)
+
+
+def _object_ids(ids: Iterable[str]) -> List[PydanticObjectId]:
+    return [PydanticObjectId(i) for i in ids if PydanticObjectId.is_valid(i)]
+
+
+class PostHydrator:
+    """
+    Turns Post documents into PostResponse objects for one viewer.
+
+    Everything a page needs is loaded with one batched query per kind: original
+    (shared) posts, then authors, media, locations, the viewer's likes and the
+    viewer's bookmarks together. The query count is the same for 1 post or 50.
+
+    An instance is request-scoped: results are cached on it, so hydrating more
+    posts with the same instance (e.g. a post and its share) never looks up the
+    same user, post or media twice.
+
+    With a sparse `fields` selection, only the selected fields are resolved, and
+    hydrate_dicts only emits those (see app/posts/fields.py).
+    """
+
+    def __init__(self, viewer_id: Optional[str] = None, fields: Optional[PostFieldSet] = None):
+        self.viewer_id = viewer_id
+        self.sparse = fields is not None
+        self.fields = fields or ALL_FIELDS
+
+        self._posts: Dict[str, Post] = {}
+        self._users: Dict[str, Optional[User]] = {}
+        self._media: Dict[str, Optional[Media]] = {}
+        self._locations: Dict[str, Optional[Location]] = {}
+
+        # Serialized authors / media, shared by every post of the page that uses them
+        self._author_dicts: Dict[str, Optional[dict]] = {}
+        self._media_dicts: Dict[str, dict] = {}
+
+        # Engagement state is only known for ids in _engagement_checked
+        self._engagement_checked: Set[str] = set()
+        self._liked: Set[str] = set()
+        self._bookmarked: Set[str] = set()
+
+    def prime_users(self, *users: User):
+        """
+        Seeds the author cache with users the caller already has (e.g. current_user).
+        """
+        for user in users:
+            if user:
+                self._users[str(user.id)] = user
+
+    async def hydrate(self, posts: List[Post]) -> List[PostResponse]:
+        await self._load(posts)
+        return [self._build(p) for p in posts]
+
+    async def hydrate_one(self, post: Post) -> PostResponse:
+        return (await self.hydrate([post]))[0]
+
+    async def hydrate_dicts(self, posts: List[Post]) -> List[dict]:
+        """
+        Like hydrate, but returns JSON-ready dicts in the PostResponse shape for
+        FastJSONResponse, skipping model construction and validation. This is the
+        path for list endpoints, and the only one that honours a sparse `fields`.
+        """
+        await self._load(posts)
+        return [self._build_dict(p) for p in posts]
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _register_post(self, post: Post):
+        self._posts[str(post.id)] = post
+
+        # Links that were already fetched by the caller seed the caches for free
+        for m in post.media or []:
+            if isinstance(m, Media):
+                self._media[str(m.id)] = m
+        if isinstance(post.location, Location):
+            self._locations[str(post.location.id)] = post.location
+        if isinstance(post.original_post, Post):
+            self._register_post(post.original_post)
+
+    async def _load(self, posts: List[Post]):
+        for p in posts:
+            self._register_post(p)
+
+        f = self.fields
+
+        # 1. Original posts of shares (needed before we know every author / media id)
+        missing_originals = {
+            ref_id(p.original_post) for p in posts
+            if p.original_post is not None and ref_id(p.original_post) not in self._posts
+        } if f.includes("original_post") else set()
+        if missing_originals:
+            originals = await Post.find(In(Post.id, _object_ids(missing_originals)), LIVE_POSTS).to_list()
+            for op in originals:
+                self._register_post(op)
+
+        # Everything rendered: the page plus the originals it embeds
+        rendered = list(posts)
+        for p in posts:
+            op = self._posts.get(ref_id(p.original_post)) if p.original_post and f.includes("original_post") else None
+            if op:
+                rendered.append(op)
+
+        # 2. Everything else in parallel, one query each; embedded snapshots and
+        # fields that weren't asked for need no lookup
+        user_ids = {p.owner_id for p in rendered} - self._users.keys() if f.includes("author") else set()
+        media_ids = {
+            ref_id(m) for p in rendered if not has_media_snapshots(p) for m in self._needed_media(p)
+        } - self._media.keys() if f.needs_media else set()
+        location_ids = {
+            ref_id(p.location) for p in rendered if p.location and p.location_snapshot is None
+        } - self._locations.keys() if f.includes("location") else set()
+        engagement_ids = {str(p.id) for p in rendered} - self._engagement_checked if f.needs_engagement else set()
+
+        await asyncio.gather(
+            self._load_users(user_ids),
+            self._load_media(media_ids),
+            self._load_locations(location_ids),
+            self._load_engagement(engagement_ids)
+        )
+
+    def _needed_media(self, post: Post) -> list:
+        # A thumbnail alone only needs the first item
+        media = post.media or []
+        return media if self.fields.includes("media") else media[:1]
+
+    async def _load_users(self, user_ids: Set[str]):
+        if not user_ids:
+            return
+        users = await User.find(In(User.id, _object_ids(user_ids))).to_list()
+        found = {str(u.id): u for u in users}
+        for uid in user_ids:
+            self._users[uid] = found.get(uid)
+
+    async def _load_media(self, media_ids: Set[str]):
+        if not media_ids:
+            return
+        media = await Media.find(In(Media.id, _object_ids(media_ids))).to_list()
+        found = {str(m.id): m for m in media}
+        for mid in media_ids:
+            self._media[mid] = found.get(mid)
+
+    async def _load_locations(self, location_ids: Set[str]):
+        if not location_ids:
+            return
+        locations = await Location.find(In(Location.id, _object_ids(location_ids))).to_list()
+        found = {str(loc.id): loc for loc in locations}
+        for lid in location_ids:
+            self._locations[lid] = found.get(lid)
+
+    async def _load_engagement(self, post_ids: Set[str]):
+        if not post_ids or not self.viewer_id:
+            return
+        ids = list(post_ids)
+        likes, bookmarks = await asyncio.gather(
+            PostLike.find(PostLike.user_id == self.viewer_id, In(PostLike.post_id, ids)).to_list(),
+            Bookmark.find(Bookmark.user_id == self.viewer_id, In(Bookmark.post_id, ids)).to_list()
+        )
+        self._liked.update(like.post_id for like in likes)
+        self._bookmarked.update(b.post_id for b in bookmarks)
+        self._engagement_checked.update(post_ids)
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def _author(self, owner_id: str) -> Optional[UserPublicModel]:
+        user = self._users.get(owner_id)
+        return UserPublicModel(**user.model_dump()) if user else None
+
+    def _media_response(self, media: Media) -> MediaResponse:
+        return MediaResponse(
+            media_id=str(media.id),
+            view_link=media.view_link,
+            media_type=media.media_type or ("video/mp4" if media.file_type == MediaType.VIDEO else "image/jpeg"),
+            hls_url=media.hls_url,
+            optimized_url=media.optimized_url,
+            thumbnail_url=media.thumbnail_url
+        )
+
+    def _snapshot_response(self, snapshot: MediaSnapshot) -> MediaResponse:
+        return MediaResponse(
+            media_id=snapshot.id,
+            view_link=snapshot.view_link,
+            media_type=snapshot.media_type,
+            hls_url=snapshot.hls_url,
+            optimized_url=snapshot.optimized_url,
+            thumbnail_url=snapshot.thumbnail_url
+        )
+
+    def _media_list(self, post: Post) -> List[MediaResponse]:
+        if has_media_snapshots(post):
+            return [self._snapshot_response(s) for s in post.media_snapshots]
+        loaded = [self._media.get(ref_id(m)) for m in (post.media or [])]
+        return [self._media_response(m) for m in loaded if m]
+
+    def _thumbnail(self, post: Post) -> Optional[str]:
+        if has_media_snapshots(post):
+            return post.media_snapshots[0].thumbnail_url if post.media_snapshots else None
+        first = self._media.get(ref_id(post.media[0])) if post.media else None
+        return first.thumbnail_url if first else None
+
+    def _location(self, post: Post):
+        if post.location_snapshot is not None:
+            return post.location_snapshot
+        if post.location:
+            return self._locations.get(ref_id(post.location))
+        return None
+
+    def _build(self, post: Post, nested: bool = False) -> PostResponse:
+        post_id = str(post.id)
+
+        original = None
+        if post.original_post is not None and not nested:
+            op = self._posts.get(ref_id(post.original_post))
+            # Shares are flattened to the root post, so one level is enough
+            original = self._build(op, nested=True) if op else None
+
+        return PostResponse(
+            id=post_id,
+            owner_id=post.owner_id,
+            author=self._author(post.owner_id),
+            caption=post.caption,
+            media=self._media_list(post),
+            likes_count=post.likes_count,
+            comments_count=post.comments_count,
+            share_count=post.share_count,
+            created_at=post.created_at,
+            is_liked=post_id in self._liked,
+            is_bookmarked=post_id in self._bookmarked,
+            original_post=original,
+            location=self._location(post)
+        )
+
+    # ------------------------------------------------------------------
+    # Building plain dicts (list endpoints)
+    # ------------------------------------------------------------------
+
+    def _author_dict(self, owner_id: str) -> Optional[dict]:
+        if owner_id in self._author_dicts:
+            return self._author_dicts[owner_id]
+        user = self._users.get(owner_id)
+        author = None
+        if user:
+            author = {key: getattr(user, name) for key, name in _AUTHOR_KEYS}
+            author["_id"] = str(user.id)
+        self._author_dicts[owner_id] = author
+        return author
+
+    def _media_dict(self, media: Media) -> dict:
+        media_id = str(media.id)
+        cached = self._media_dicts.get(media_id)
+        if cached is None:
+            cached = self._media_dicts[media_id] = {
+                "media_id": media_id,
+                "view_link": media.view_link,
+                "media_type": media.media_type or ("video/mp4" if media.file_type == MediaType.VIDEO else "image/jpeg"),
+                "hls_url": media.hls_url,
+                "optimized_url": media.optimized_url,
+                "thumbnail_url": media.thumbnail_url
+            }
+        return cached
+
+    @staticmethod
+    def _snapshot_dict(snapshot: MediaSnapshot) -> dict:
+        return {
+            "media_id": snapshot.id,
+            "view_link": snapshot.view_link,
+            "media_type": snapshot.media_type,
+            "hls_url": snapshot.hls_url,
+            "optimized_url": snapshot.optimized_url,
+            "thumbnail_url": snapshot.thumbnail_url
+        }
+
+    def _media_dicts_of(self, post: Post) -> List[dict]:
+        if has_media_snapshots(post):
+            return [self._snapshot_dict(s) for s in post.media_snapshots]
+        loaded = [self._media.get(ref_id(m)) for m in (post.media or [])]
+        return [self._media_dict(m) for m in loaded if m]
+
+    def _location_dict(self, post: Post) -> Optional[dict]:
+        location = self._location(post)
+        if location is None:
+            return None
+        longitude, latitude = location.location.coordinates[:2]
+        return {
+            "_id": str(location.id),
+            "name": location.name,
+            "latitude": float(latitude),
+            "longitude": float(longitude),
+            "address": getattr(location, "address", None)
+        }
+
+    def _build_dict(self, post: Post, nested: bool = False) -> dict:
+        """
+        Same JSON as PostResponse.model_dump(mode="json", by_alias=True) (minus the
+        fields that weren't selected), built from plain attribute reads.
+        """
+        f = self.fields
+        post_id = str(post.id)
+        values = {"_id": post_id}
+
+        for name in _SCALAR_POST_FIELDS:
+            if f.includes(name):
+                values[name] = getattr(post, name)
+        if f.includes("author"):
+            values["author"] = self._author_dict(post.owner_id)
+        if f.includes("media"):
+            values["media"] = self._media_dicts_of(post)
+        if f.includes("is_bookmarked"):
+            values["is_bookmarked"] = post_id in self._bookmarked
+        if f.includes("is_liked"):
+            values["is_liked"] = post_id in self._liked
+        if f.includes("original_post"):
+            op = None
+            if post.original_post is not None and not nested:
+                op = self._posts.get(ref_id(post.original_post))
+            values["original_post"] = self._build_dict(op, nested=True) if op else None
+        if f.includes("location"):
+            values["location"] = self._location_dict(post)
+        if f.includes("thumbnail_url"):
+            values["thumbnail_url"] = self._thumbnail(post)
+        elif not self.sparse:
+            values["thumbnail_url"] = None
+
+        return values
@@ -4,7 +4,9 @@ from enum import Enum
 
 from beanie import Document, Link
 from pydantic import BaseModel, Field
-from app.discovery.models import Location
+from pymongo import IndexModel
+from app.discovery.models import GeoLocation, Location
+from app.core.utils.jobs import JobStatus
 
 # --- Enums ---
 
@@ -17,8 +19,30 @@ class MediaStatus(str, Enum):
     ACTIVE = "ACTIVE"     # Successfully uploaded and public
     FAILED = "FAILED"     # Upload failed
 
+class UploadSessionStatus(str, Enum):
+    UPLOADING = "UPLOADING"   # Accepting chunks
+    FINALIZED = "FINALIZED"   # Handed to the video upload task
+
+class OutboxStep(str, Enum):
+    TAGS = "tags"
+    MENTIONS = "mentions"
+    FAN_OUT = "fan_out"
+
+class PurgeStep(str, Enum):
+    SHARES = "shares"          # Soft-delete shares of the post (each gets its own purge job)
+    ENGAGEMENT = "engagement"  # Likes and bookmarks
+    COMMENTS = "comments"      # Comments and their likes
+    TAGS = "tags"              # post_tags and hashtag counts
+    MEDIA = "media"            # Stored assets and Media documents
+    POST = "post"              # Timeline entries, the share count of the original, the post itself
+
 # --- Database Models ---
 
+class MediaVariantUrls(BaseModel):
+    hls_url: str = ""
+    optimized_url: str = ""
+    thumbnail_url: str = ""
+
 class Media(Document):
     """
     Represents a media file (Image/Video).
@@ -40,30 +64,142 @@ class Media(Document):
     # download_link: Optional[str] = None
 
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Client-direct uploads only: a PENDING row is marked FAILED if its asset hasn't
+    # arrived by then (app/core/media/direct.py)
+    upload_expires_at: Optional[datetime] = None
+    # Storage backend holding the file (app/core/media/storage.py); None: cloudinary
+    storage: Optional[str] = None
+    # SHA-256 of the file when it is shared through a MediaAsset (app/core/media/dedup.py);
+    # asset_released is set once this row's reference has been given back
+    content_hash: Optional[str] = None
+    asset_released: bool = False
     
+    # Stored when the media becomes ACTIVE; rows from before that compute them on read
+    variant_urls: Optional[MediaVariantUrls] = None
+
+    def _variant_url(self, variant: str) -> str:
+        from app.core.media.storage import DEFAULT_BACKEND, cached_variant_url
+        return cached_variant_url(self.storage or DEFAULT_BACKEND, self.public_id, self.file_type.value, variant)
+
     @property
     def hls_url(self) -> str:
+        if self.variant_urls is not None:
+            return self.variant_urls.hls_url
         if self.file_type == MediaType.VIDEO and self.public_id:
-            from app.core.media.cloudinary_utils import generate_hls_url
-            return generate_hls_url(self.public_id)
+            return self._variant_url("hls")
         return ""
 
     @property
     def optimized_url(self) -> str:
+        if self.variant_urls is not None:
+            return self.variant_urls.optimized_url
         if self.file_type == MediaType.VIDEO and self.public_id:
-            from app.core.media.cloudinary_utils import generate_optimized_mp4_url
-            return generate_optimized_mp4_url(self.public_id)
+            return self._variant_url("optimized")
         return self.view_link
 
     @property
     def thumbnail_url(self) -> str:
+        if self.variant_urls is not None:
+            return self.variant_urls.thumbnail_url
         if self.file_type == MediaType.VIDEO and self.public_id:
-            from app.core.media.cloudinary_utils import generate_thumbnail_url
-            return generate_thumbnail_url(self.public_id)
+            return self._variant_url("thumbnail")
         return self.view_link
 
+    def fill_variant_urls(self):
+        """
+        Computes and keeps the variant URLs; call it when the media becomes ACTIVE
+        (public_id, view_link and storage final), before saving.
+        """
+        self.variant_urls = None
+        self.variant_urls = MediaVariantUrls(
+            hls_url=self.hls_url, optimized_url=self.optimized_url, thumbnail_url=self.thumbnail_url
+        )
+
     class Settings:
         name = "media"
+        indexes = [
+            # Account deletion
+            [("owner_id", 1)],
+            # Direct upload callbacks identify the asset by public_id
+            [("public_id", 1)],
+            # Rows sharing a stored file
+            IndexModel(
+                [("content_hash", 1)],
+                name="content_hash",
+                partialFilterExpression={"content_hash": {"$type": "string"}}
+            ),
+            # Direct upload reconciliation: pending direct uploads, oldest first
+            IndexModel(
+                [("status", 1), ("created_at", 1)],
+                name="direct_upload_reconcile",
+                partialFilterExpression={"upload_expires_at": {"$type": "date"}}
+            )
+        ]
+
+
+class MediaAsset(Document):
+    """
+    A stored file shared by every Media row with the same content_hash. `refcount` is
+    the number of those rows; the file is deleted when it drops to zero.
+    """
+    content_hash: str
+    file_type: MediaType
+    storage: str
+    public_id: str
+    view_link: str
+    refcount: int = 1
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "media_assets"
+        indexes = [
+            IndexModel([("content_hash", 1)], unique=True)
+        ]
+
+
+class MediaSnapshot(BaseModel):
+    """
+    Compact copy of a Media document embedded in a Post (POST_EMBED_SNAPSHOTS), so a post
+    can be rendered without joining `media`. Refreshed when a PENDING video becomes ACTIVE.
+    """
+    id: str
+    status: MediaStatus
+    file_type: MediaType
+    media_type: str
+    public_id: str
+    view_link: str
+    hls_url: str = ""
+    optimized_url: str = ""
+    thumbnail_url: str = ""
+
+    @classmethod
+    def from_media(cls, media: Media) -> "MediaSnapshot":
+        return cls(
+            id=str(media.id),
+            status=media.status,
+            file_type=media.file_type,
+            media_type=media.media_type,
+            public_id=media.public_id,
+            view_link=media.view_link,
+            hls_url=media.hls_url,
+            optimized_url=media.optimized_url,
+            thumbnail_url=media.thumbnail_url
+        )
+
+
+class LocationSnapshot(BaseModel):
+    """
+    Compact copy of a Location embedded in a Post. Same shape LocationResponse reads.
+    """
+    id: str
+    name: str
+    location: GeoLocation
+    address: Optional[str] = None
+
+    @classmethod
+    def from_location(cls, location: Location) -> "LocationSnapshot":
+        return cls(id=str(location.id), name=location.name, location=location.location, address=location.address)
 
 
 # # Optional: Embedded model for Location to be extensible later
@@ -87,6 +223,22 @@ class Post(Document):
     comments_count: int = 0
     share_count: int = 0
     original_post: Optional[Link["Post"]] = None
+
+    # Denormalized copies of `media` / `location`; None means the post has no snapshot
+    # and readers fall back to the links
+    media_snapshots: Optional[List[MediaSnapshot]] = None
+    location_snapshot: Optional[LocationSnapshot] = None
+
+    # Profile grid cover: the first media item (the shared post's, for shares).
+    # media_count None means the post predates these fields (see app/posts/grid.py)
+    cover_media_id: Optional[str] = None
+    cover_thumbnail_url: Optional[str] = None
+    cover_media_type: Optional[MediaType] = None
+    media_count: Optional[int] = None
+
+    # Deleted posts are hidden right away and removed by the purge worker (app/posts/purge.py)
+    is_deleted: bool = False
+    deleted_at: Optional[datetime] = None
     
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -94,7 +246,112 @@ class Post(Document):
     class Settings:
         name = "posts"
         # Index for chronological feed fetching
+        # _id is the tie-breaker for keyset (cursor) pagination
+        indexes = [
+            [("created_at", -1), ("_id", -1)],
+            # Profile posts and the profile grid. Counters stay out of it: likes and
+            # comments would otherwise rewrite the index entry on every engagement
+            [("owner_id", 1), ("created_at", -1), ("_id", -1)],
+            # Finds the posts to refresh when a cover video finishes processing
+            IndexModel([("cover_media_id", 1)], sparse=True),
+            # Shares of a post (purged with it)
+            IndexModel([("original_post.$id", 1)], sparse=True),
+            # Finds the posts to refresh when a media item changes
+            IndexModel([("media_snapshots.id", 1)], sparse=True)
+        ]
+
+
+class PostOutboxEvent(Document):
+    """
+    Follow-up work for a newly created post, written in the same transaction as the post.
+    The outbox worker (app/posts/outbox.py) records each finished step in completed_steps,
+    so a retried event only redoes what didn't finish.
+    """
+    post_id: str
+    owner_id: str
+    tags: List[str] = []        # Normalized hashtags (request tags + caption)
+    mentions: List[str] = []    # Usernames mentioned in the caption
+    caption_preview: Optional[str] = None
+
+    status: JobStatus = JobStatus.PENDING
+    completed_steps: List[OutboxStep] = []
+    attempts: int = 0
+    lock_token: Optional[str] = None
+    locked_until: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    processed_at: Optional[datetime] = None
+
+    class Settings:
+        name = "post_outbox"
+        indexes = [
+            IndexModel([("post_id", 1)], unique=True),
+            # Sweep query: due pending events, oldest first
+            IndexModel([("status", 1), ("locked_until", 1), ("created_at", 1)]),
+            IndexModel([("lock_token", 1)], sparse=True),
+            # Finished events are only kept for a week for debugging
+            IndexModel([("processed_at", 1)], expireAfterSeconds=7 * 24 * 60 * 60)
+        ]
+
+
+# Filter for posts that haven't been deleted; posts from before soft deletion have no is_deleted
+LIVE_POSTS = {"is_deleted": {"$ne": True}}
+
+
+class PostPurgeJob(Document):
+    """
+    Removes everything that belongs to a deleted post, step by step (see PurgeStep).
+    Written together with the post's is_deleted flag; app/posts/purge.py records each
+    finished step in completed_steps, so a job picked up again after a crash resumes
+    where it stopped.
+    """
+    post_id: str
+    owner_id: str
+
+    status: JobStatus = JobStatus.PENDING
+    completed_steps: List[PurgeStep] = []
+    attempts: int = 0
+    lock_token: Optional[str] = None
+    locked_until: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    processed_at: Optional[datetime] = None
+
+    class Settings:
+        name = "post_purge_jobs"
+        indexes = [
+            IndexModel([("post_id", 1)], unique=True),
+            # Sweep query: due pending jobs, oldest first
+            IndexModel([("status", 1), ("locked_until", 1), ("created_at", 1)]),
+            IndexModel([("lock_token", 1)], sparse=True),
+            IndexModel([("processed_at", 1)], expireAfterSeconds=7 * 24 * 60 * 60)
+        ]
+
+
+class UploadSession(Document):
+    """
+    A resumable video upload (app/core/media/sessions.py). Chunks are appended to `path`
+    under .temp_uploads/sessions and `offset` counts the bytes stored so far, so a client
+    whose connection dropped asks for the offset and continues from there.
+    """
+    owner_id: str
+    filename: str
+    content_type: str
+    length: int                 # Total size declared when the session was created
+    offset: int = 0
+    path: str
+    status: UploadSessionStatus = UploadSessionStatus.UPLOADING
+    media_id: Optional[str] = None  # Set on finalize
+    writer: Optional[str] = None    # Token of the chunk request writing the file
+    writing_until: Optional[datetime] = None  # The writer's lease; renewed before every write
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    expires_at: datetime        # Pushed back by every chunk
+
+    class Settings:
+        name = "upload_sessions"
         indexes = [
-            [("created_at", -1)],
-            [("owner_id", 1), ("created_at", -1)]
-        ]
\ No newline at end of file
+            IndexModel([("expires_at", 1)], expireAfterSeconds=0)
+        ]
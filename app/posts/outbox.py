@@ -0,0 +1,243 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from beanie import PydanticObjectId
+from beanie.operators import In
+from pydantic import BaseModel, Field
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.db.models import User
+from app.discovery.models import Hashtag, PostTag
+from app.feed.service import TimelineService
+from app.notification.models import Notification, NotificationType
+from app.notification.service import NotificationService
+from app.posts.models import LIVE_POSTS, OutboxStep, Post, PostOutboxEvent
+from app.core.utils.jobs import claim_jobs, fail_jobs, finish_jobs, mark_step, run_in_transaction
+
+
+class HashtagIdProjection(BaseModel):
+    id: PydanticObjectId = Field(alias="_id")
+    name: str
+
+
+class MentionedUserProjection(BaseModel):
+    id: PydanticObjectId = Field(alias="_id")
+    username: str
+
+
+def normalize_tags(tags: Iterable[str]) -> List[str]:
+    """
+    Lower-cases tags and strips '#', dropping empties and duplicates (first one wins).
+    """
+    seen: Dict[str, None] = {}
+    for tag in tags:
+        name = tag.lower().replace("#", "")
+        if name:
+            seen.setdefault(name, None)
+    return list(seen)
+
+
+async def insert_post_with_outbox(post: Post, event: PostOutboxEvent):
+    """
+    Inserts the post and its outbox event atomically.
+
+    Without transactions (standalone server) the event is written first and the post
+    second; if the post insert never happens, the worker finds no post and simply
+    closes the event.
+    """
+    post.id = post.id or PydanticObjectId()
+    event.post_id = str(post.id)
+
+    async def write(session):
+        await event.insert(session=session)
+        await post.insert(session=session)
+
+    await run_in_transaction(Post.get_pymongo_collection().database.client, write)
+
+
+async def enqueue_post_event(event: PostOutboxEvent):
+    """
+    Hands the event to the Celery worker right away. If the broker is unreachable the
+    event stays PENDING and the periodic sweep picks it up instead.
+    """
+    from app.core.services.celery_worker import process_post_outbox
+
+    try:
+        # The broker client is blocking; keep it off the event loop
+        await asyncio.to_thread(process_post_outbox.delay, [str(event.id)])
+    except Exception as e:
+        logging.warning(f"Could not queue outbox event {event.id}, leaving it to the sweep: {e}")
+
+
+class PostOutboxProcessor:
+    """
+    Runs the follow-up work of newly created posts: hashtags, mention notifications
+    and timeline fan-out.
+
+    Events are claimed in batches with a lease, so two workers never process the same
+    event and a crashed worker's events become due again once the lease runs out.
+    Hashtags and mentions are resolved with a few queries per batch rather than per post,
+    and every write is an upsert so a retried step has no duplicate effects.
+    """
+
+    def __init__(self):
+        self.notification_service = NotificationService()
+        self.timeline_service = TimelineService()
+
+    # ------------------------------------------------------------------
+    # Claiming
+    # ------------------------------------------------------------------
+
+    async def claim(self, event_ids: Optional[List[str]] = None, limit: Optional[int] = None) -> List[PostOutboxEvent]:
+        """
+        Leases up to `limit` due events (or just `event_ids`, if they're due).
+        The sweep leaves fresh events to the task queued for them (and, without
+        transactions, gives the post insert time to land).
+        """
+        return await claim_jobs(
+            PostOutboxEvent,
+            lease_seconds=settings.OUTBOX_LEASE_SECONDS,
+            limit=limit or settings.OUTBOX_BATCH_SIZE,
+            job_ids=event_ids,
+            min_age_seconds=settings.OUTBOX_SWEEP_GRACE_SECONDS
+        )
+
+    # ------------------------------------------------------------------
+    # Processing
+    # ------------------------------------------------------------------
+
+    async def process(self, events: List[PostOutboxEvent]):
+        if not events:
+            return
+
+        # 1. Load the posts; an event without a post (insert failed or post deleted) has nothing to do
+        posts = await Post.find(In(Post.id, [PydanticObjectId(e.post_id) for e in events]), LIVE_POSTS).to_list()
+        posts_map = {str(p.id): p for p in posts}
+
+        orphaned = [e for e in events if e.post_id not in posts_map]
+        await self._finish(orphaned)
+        events = [e for e in events if e.post_id in posts_map]
+
+        # 2. Batched steps; a failing step is retried on the next claim without redoing earlier ones
+        for step, run in (
+            (OutboxStep.TAGS, self._process_tags),
+            (OutboxStep.MENTIONS, self._process_mentions),
+            (OutboxStep.FAN_OUT, self._process_fan_out)
+        ):
+            pending = [e for e in events if step not in e.completed_steps]
+            if not pending:
+                continue
+            try:
+                done = await run(pending, posts_map)
+            except Exception as e:
+                logging.exception(f"Outbox step {step.value} failed for {len(pending)} events")
+                await self._fail(pending, f"{step.value}: {e}")
+                failed_ids = {p.id for p in pending}
+                events = [ev for ev in events if ev.id not in failed_ids]
+                continue
+            await self._mark_step(done, step)
+
+        # 3. Close out events that finished every step
+        await self._finish([e for e in events if len(set(e.completed_steps)) == len(OutboxStep)])
+
+    async def _process_tags(self, events: List[PostOutboxEvent], posts_map: Dict[str, Post]) -> List[PostOutboxEvent]:
+        """
+        Creates missing hashtags and post_tags for the whole batch, then bumps post_count
+        for the post_tags that were actually inserted. A retry never double counts; if the
+        worker dies between the two writes the count can be one short for that post.
+        """
+        names = sorted({t for e in events for t in e.tags})
+        if not names:
+            return events
+
+        # 1. Upsert hashtags by name
+        await Hashtag.get_pymongo_collection().bulk_write(
+            [UpdateOne({"name": n}, {"$setOnInsert": {"name": n, "post_count": 0}}, upsert=True) for n in names],
+            ordered=False
+        )
+        hashtags = await Hashtag.find(In(Hashtag.name, names)).project(HashtagIdProjection).to_list()
+        hashtag_ids = {h.name: str(h.id) for h in hashtags}
+
+        # 2. Upsert post_tags; upserted_ids tells us which ones are new
+        pairs = [(e.post_id, hashtag_ids[t]) for e in events for t in e.tags if t in hashtag_ids]
+        if not pairs:
+            return events
+        result = await PostTag.get_pymongo_collection().bulk_write(
+            [
+                UpdateOne(
+                    {"post_id": post_id, "hashtag_id": hashtag_id},
+                    {"$setOnInsert": {"post_id": post_id, "hashtag_id": hashtag_id}},
+                    upsert=True
+                )
+                for post_id, hashtag_id in pairs
+            ],
+            ordered=False
+        )
+
+        # 3. Count only the new ones
+        increments: Dict[str, int] = {}
+        for index in result.upserted_ids:
+            hashtag_id = pairs[index][1]
+            increments[hashtag_id] = increments.get(hashtag_id, 0) + 1
+        if increments:
+            await Hashtag.get_pymongo_collection().bulk_write(
+                [UpdateOne({"_id": PydanticObjectId(h)}, {"$inc": {"post_count": n}}) for h, n in increments.items()],
+                ordered=False
+            )
+
+        return events
+
+    async def _process_mentions(self, events: List[PostOutboxEvent], posts_map: Dict[str, Post]) -> List[PostOutboxEvent]:
+        usernames = {u for e in events for u in e.mentions}
+        if not usernames:
+            return events
+
+        # 1. Resolve every mentioned username in the batch at once
+        users = await User.find(In(User.username, list(usernames))).project(MentionedUserProjection).to_list()
+        user_ids = {u.username: str(u.id) for u in users}
+
+        # 2. One upsert per (post, mentioned user)
+        notifications = [
+            Notification(
+                recipient_id=user_ids[username],
+                actor_id=e.owner_id,
+                type=NotificationType.MENTION,
+                target_id=e.post_id,
+                metadata={"preview": e.caption_preview or "", "source": "post"}
+            )
+            for e in events for username in e.mentions if username in user_ids
+        ]
+        await self.notification_service.create_notifications_once(notifications)
+        return events
+
+    async def _process_fan_out(self, events: List[PostOutboxEvent], posts_map: Dict[str, Post]) -> List[PostOutboxEvent]:
+        # Authors are loaded once for the batch; fan_out_post itself upserts in batches
+        owner_ids = {e.owner_id for e in events}
+        authors = await User.find(In(User.id, [PydanticObjectId(i) for i in owner_ids])).to_list()
+        authors_map = {str(a.id): a for a in authors}
+
+        done = []
+        for e in events:
+            try:
+                await self.timeline_service.fan_out_post(posts_map[e.post_id], author=authors_map.get(e.owner_id))
+            except Exception as exc:
+                logging.exception(f"Fan-out failed for post {e.post_id}")
+                await self._fail([e], f"{OutboxStep.FAN_OUT.value}: {exc}")
+                continue
+            done.append(e)
+        return done
+
+    # ------------------------------------------------------------------
+    # Bookkeeping
+    # ------------------------------------------------------------------
+
+    async def _mark_step(self, events: List[PostOutboxEvent], step: OutboxStep):
+        await mark_step(PostOutboxEvent, events, step)
+
+    async def _finish(self, events: List[PostOutboxEvent]):
+        await finish_jobs(PostOutboxEvent, events)
+
+    async def _fail(self, events: List[PostOutboxEvent], error: str):
+        await fail_jobs(PostOutboxEvent, events, error, settings.OUTBOX_MAX_ATTEMPTS)
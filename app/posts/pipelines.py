@@ -0,0 +1,156 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from beanie import PydanticObjectId
+
+from app.discovery.models import Location
+from app.posts.fields import ALL_FIELDS, PostFieldSet
+from app.posts.models import LIVE_POSTS, Media, Post
+
+# Links are stored as DBRefs ({"$ref": ..., "$id": ...}). "$id" can't be used as a
+# plain field path inside expressions, so it is read with $getField.
+_REF_ID = {"$getField": {"field": {"$literal": "$id"}, "input": "$$ref"}}
+
+
+def _media_stages() -> List[Dict[str, Any]]:
+    """
+    Replaces the `media` DBRefs of the current document with the Media documents,
+    keeping the order the author attached them in ($lookup alone returns them in
+    collection order). Refs to missing media are dropped.
+    Posts with media_snapshots keep their DBRefs: there is nothing to join.
+    """
+    return [
+        {"$set": {"_media_refs": {"$cond": [
+            {"$isArray": "$media_snapshots"}, [], {"$ifNull": ["$media", []]}
+        ]}}},
+        {"$lookup": {
+            "from": Media.Settings.name,
+            "localField": "_media_refs.$id",
+            "foreignField": "_id",
+            "as": "_media_docs"
+        }},
+        {"$set": {"media": {"$cond": [
+            {"$eq": [{"$size": "$_media_refs"}, 0]},
+            "$media",
+            {"$filter": {
+                "input": {"$map": {
+                    "input": "$_media_refs",
+                    "as": "ref",
+                    "in": {"$first": {"$filter": {
+                        "input": "$_media_docs",
+                        "as": "doc",
+                        "cond": {"$eq": ["$$doc._id", _REF_ID]}
+                    }}}
+                }},
+                "as": "m",
+                "cond": {"$ne": ["$$m", None]}
+            }}
+        ]}}},
+        {"$unset": ["_media_refs", "_media_docs"]}
+    ]
+
+
+def _location_stages() -> List[Dict[str, Any]]:
+    """
+    Same for `location`; posts with a location_snapshot keep the DBRef.
+    """
+    return [
+        {"$set": {"_location_ref": {"$cond": [
+            {"$ifNull": ["$location_snapshot", False]}, None, "$location"
+        ]}}},
+        {"$lookup": {
+            "from": Location.Settings.name,
+            "localField": "_location_ref.$id",
+            "foreignField": "_id",
+            "as": "_location_docs"
+        }},
+        {"$set": {"location": {"$cond": [
+            {"$ifNull": ["$_location_ref", False]}, {"$first": "$_location_docs"}, "$location"
+        ]}}},
+        {"$unset": ["_location_ref", "_location_docs"]}
+    ]
+
+
+def post_lookup_stages(fields: Optional[PostFieldSet] = None) -> List[Dict[str, Any]]:
+    """
+    Stages that resolve every link a PostResponse needs: media, location and the
+    original post of a share together with its own media and location.
+    Shares are flattened to the root post, so one level of original_post is enough.
+    Links covered by embedded snapshots (see app/posts/snapshots.py) are not joined,
+    and neither are relations left out of `fields`.
+    """
+    fields = fields or ALL_FIELDS
+    stages: List[Dict[str, Any]] = []
+    if fields.needs_media:
+        stages += _media_stages()
+    if fields.includes("location"):
+        stages += _location_stages()
+    if fields.includes("original_post"):
+        stages += [
+            {"$lookup": {
+                "from": Post.Settings.name,
+                "localField": "original_post.$id",
+                "foreignField": "_id",
+                "as": "_original_docs",
+                "pipeline": [
+                    # A deleted original renders as missing until the purge removes its shares
+                    {"$match": LIVE_POSTS},
+                    *(_media_stages() if fields.needs_media else []),
+                    *(_location_stages() if fields.includes("location") else [])
+                ]
+            }},
+            {"$set": {"original_post": {"$first": "$_original_docs"}}},
+            {"$unset": "_original_docs"}
+        ]
+    return stages
+
+
+def post_page_pipeline(
+    *filters: Dict[str, Any],
+    sort: Optional[Sequence[Tuple[str, int]]] = None,
+    limit: Optional[int] = None,
+    fields: Optional[PostFieldSet] = None
+) -> List[Dict[str, Any]]:
+    """
+    Builds one aggregation that selects a page of posts and resolves their links.
+    Sort and limit run before the lookups so only the page itself is joined.
+    Deleted posts are always left out.
+    """
+    filters = [LIVE_POSTS, *(f for f in filters if f)]
+    pipeline: List[Dict[str, Any]] = []
+
+    if filters:
+        pipeline.append({"$match": filters[0] if len(filters) == 1 else {"$and": filters}})
+    if sort:
+        pipeline.append({"$sort": dict(sort)})
+    if limit is not None:
+        pipeline.append({"$limit": limit})
+
+    return pipeline + post_lookup_stages(fields)
+
+
+async def find_post_page(
+    *filters: Dict[str, Any],
+    sort: Optional[Sequence[Tuple[str, int]]] = None,
+    limit: Optional[int] = None,
+    fields: Optional[PostFieldSet] = None
+) -> List[Post]:
+    """
+    Runs post_page_pipeline in a single round trip. The returned Posts have media,
+    location and original_post populated, so PostHydrator needs no extra lookups for them.
+    """
+    pipeline = post_page_pipeline(*filters, sort=sort, limit=limit, fields=fields)
+    return await Post.aggregate(pipeline, projection_model=Post).to_list()
+
+
+async def find_posts_by_ids(post_ids: Sequence[Any], fields: Optional[PostFieldSet] = None) -> List[Post]:
+    """
+    Same as find_post_page for an explicit list of ids; results follow the order of post_ids.
+    Unknown or invalid ids are skipped.
+    """
+    ids = [PydanticObjectId(i) for i in post_ids if PydanticObjectId.is_valid(str(i))]
+    if not ids:
+        return []
+
+    posts = await find_post_page({"_id": {"$in": ids}}, fields=fields)
+    posts_map = {p.id: p for p in posts}
+    return [posts_map[i] for i in ids if i in posts_map]
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Type
+
+from beanie import Document, PydanticObjectId
+from beanie.operators import In
+from pydantic import BaseModel, Field
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.core.media.service import MediaService
+from app.core.utils.jobs import JobStatus, claim_jobs, fail_jobs, finish_jobs, mark_step, run_in_transaction
+from app.discovery.models import Hashtag, PostTag
+from app.engagement.models import Bookmark, Comment, CommentLike, PostLike
+from app.feed.models import TimelineEntry
+from app.posts.models import LIVE_POSTS, Media, Post, PostPurgeJob, PurgeStep
+
+
+class CommentIdProjection(BaseModel):
+    id: uuid.UUID = Field(alias="_id")
+
+
+async def soft_delete_post(post: Post) -> PostPurgeJob:
+    """
+    Hides the post and writes its purge job, atomically where transactions are available.
+
+    Without them the job is written first: if the flag never lands, the worker finds a
+    post that isn't deleted and closes the job without touching anything.
+    """
+    job = PostPurgeJob(post_id=str(post.id), owner_id=post.owner_id)
+    now = datetime.now(timezone.utc)
+
+    async def write(session):
+        await job.insert(session=session)
+        await Post.get_pymongo_collection().update_one(
+            {"_id": post.id}, {"$set": {"is_deleted": True, "deleted_at": now}}, session=session
+        )
+
+    await run_in_transaction(Post.get_pymongo_collection().database.client, write)
+    post.is_deleted, post.deleted_at = True, now
+    return job
+
+
+async def enqueue_purge(job: PostPurgeJob):
+    """
+    Hands the job to the Celery worker right away; the periodic sweep is the fallback.
+    """
+    from app.core.services.celery_worker import purge_posts
+
+    try:
+        await asyncio.to_thread(purge_posts.delay, [str(job.id)])
+    except Exception as e:
+        logging.warning(f"Could not queue purge job {job.id}, leaving it to the sweep: {e}")
+
+
+async def mark_posts_deleted(posts: List[dict]):
+    """
+    Soft-deletes many posts (raw documents with _id and owner_id), each with its own
+    purge job. Jobs are upserted first, so a retry never duplicates them and a post is
+    never hidden without a job.
+    """
+    if not posts:
+        return
+    now = datetime.now(timezone.utc)
+    await PostPurgeJob.get_pymongo_collection().bulk_write(
+        [
+            UpdateOne(
+                {"post_id": str(p["_id"])},
+                {"$setOnInsert": {
+                    "post_id": str(p["_id"]), "owner_id": p["owner_id"], "status": JobStatus.PENDING.value,
+                    "completed_steps": [], "attempts": 0, "created_at": now
+                }},
+                upsert=True
+            )
+            for p in posts
+        ],
+        ordered=False
+    )
+    await Post.get_pymongo_collection().update_many(
+        {"_id": {"$in": [p["_id"] for p in posts]}},
+        {"$set": {"is_deleted": True, "deleted_at": now}}
+    )
+
+
+async def _delete_in_batches(model: Type[Document], query: Dict[str, Any]) -> int:
+    """
+    delete_many in chunks of PURGE_DELETE_BATCH_SIZE, so a post with a million likes
+    never turns into one long-running write. Returns the number of documents removed.
+    """
+    collection = model.get_pymongo_collection()
+    deleted = 0
+    while True:
+        ids = [d["_id"] for d in await collection.find(query, {"_id": 1}).limit(settings.PURGE_DELETE_BATCH_SIZE).to_list()]
+        if not ids:
+            return deleted
+        result = await collection.delete_many({"_id": {"$in": ids}})
+        deleted += result.deleted_count
+
+
+class PostPurgeProcessor:
+    """
+    Removes everything a deleted post leaves behind: its shares, likes, bookmarks,
+    comments (and their likes), post_tags (decrementing hashtag counts), media (stored
+    assets included), timeline entries and finally the post document.
+
+    Jobs are claimed in leased batches and every step works on the whole batch. Each
+    finished step is recorded on the job, so a job resumed after a crash skips it. A
+    step interrupted half-way is simply run again: deletes are idempotent, only the
+    hashtag / share counters of that batch can end up off by one.
+    """
+
+    async def claim(self, job_ids: Optional[List[str]] = None, limit: Optional[int] = None) -> List[PostPurgeJob]:
+        return await claim_jobs(
+            PostPurgeJob,
+            lease_seconds=settings.PURGE_LEASE_SECONDS,
+            limit=limit or settings.PURGE_BATCH_SIZE,
+            job_ids=job_ids,
+            min_age_seconds=settings.PURGE_SWEEP_GRACE_SECONDS
+        )
+
+    async def process(self, jobs: List[PostPurgeJob]):
+        if not jobs:
+            return
+
+        # 1. Load what's left of the posts. A post that exists but isn't marked deleted
+        # means the soft delete never landed: nothing to purge
+        docs = await Post.get_pymongo_collection().find(
+            {"_id": {"$in": [PydanticObjectId(j.post_id) for j in jobs]}},
+            {"is_deleted": 1, "media": 1, "original_post": 1}
+        ).to_list()
+        posts_map = {str(d["_id"]): d for d in docs}
+
+        void = [j for j in jobs if j.post_id in posts_map and not posts_map[j.post_id].get("is_deleted")]
+        await finish_jobs(PostPurgeJob, void)
+        void_ids = {j.id for j in void}
+        jobs = [j for j in jobs if j.id not in void_ids]
+
+        # 2. Steps in order; a job whose step fails skips the rest until it is retried
+        for step, run in (
+            (PurgeStep.SHARES, self._purge_shares),
+            (PurgeStep.ENGAGEMENT, self._purge_engagement),
+            (PurgeStep.COMMENTS, self._purge_comments),
+            (PurgeStep.TAGS, self._purge_tags),
+            (PurgeStep.MEDIA, self._purge_media),
+            (PurgeStep.POST, self._purge_post)
+        ):
+            pending = [j for j in jobs if step not in j.completed_steps]
+            if not pending:
+                continue
+            try:
+                await run(pending, posts_map)
+            except Exception as e:
+                logging.exception(f"Purge step {step.value} failed for {len(pending)} jobs")
+                await fail_jobs(PostPurgeJob, pending, f"{step.value}: {e}", settings.PURGE_MAX_ATTEMPTS)
+                failed_ids = {p.id for p in pending}
+                jobs = [j for j in jobs if j.id not in failed_ids]
+                continue
+            await mark_step(PostPurgeJob, pending, step)
+
+        # 3. Close out jobs that finished every step
+        await finish_jobs(PostPurgeJob, [j for j in jobs if len(set(j.completed_steps)) == len(PurgeStep)])
+
+    async def _purge_shares(self, jobs: List[PostPurgeJob], posts_map: Dict[str, dict]):
+        """
+        Soft-deletes the shares of the batch's posts and gives each one its own purge job.
+        """
+        collection = Post.get_pymongo_collection()
+        query = {"original_post.$id": {"$in": [PydanticObjectId(j.post_id) for j in jobs]}, **LIVE_POSTS}
+        while True:
+            shares = await collection.find(query, {"_id": 1, "owner_id": 1}).limit(settings.PURGE_DELETE_BATCH_SIZE).to_list()
+            if not shares:
+                return
+            await mark_posts_deleted(shares)
+
+    async def _purge_engagement(self, jobs: List[PostPurgeJob], posts_map: Dict[str, dict]):
+        post_ids = [j.post_id for j in jobs]
+        await _delete_in_batches(PostLike, {"post_id": {"$in": post_ids}})
+        await _delete_in_batches(Bookmark, {"post_id": {"$in": post_ids}})
+
+    async def _purge_comments(self, jobs: List[PostPurgeJob], posts_map: Dict[str, dict]):
+        post_ids = [j.post_id for j in jobs]
+        while True:
+            # Comment ids are UUIDs; Beanie encodes them the way they were stored
+            comments = await Comment.find(
+                In(Comment.post_id, post_ids)
+            ).limit(settings.PURGE_DELETE_BATCH_SIZE).project(CommentIdProjection).to_list()
+            if not comments:
+                return
+            # Likes before their comments, so a retry can still find them
+            await _delete_in_batches(CommentLike, {"comment_id": {"$in": [str(c.id) for c in comments]}})
+            await Comment.find(In(Comment.id, [c.id for c in comments])).delete()
+
+    async def _purge_tags(self, jobs: List[PostPurgeJob], posts_map: Dict[str, dict]):
+        """
+        Deletes the batch's post_tags, then lowers each hashtag's post_count by the number
+        removed, in one bulk write (never below zero).
+        """
+        collection = PostTag.get_pymongo_collection()
+        post_tags = await collection.find(
+            {"post_id": {"$in": [j.post_id for j in jobs]}}, {"_id": 1, "hashtag_id": 1}
+        ).to_list()
+        if not post_tags:
+            return
+
+        await collection.delete_many({"_id": {"$in": [t["_id"] for t in post_tags]}})
+
+        decrements: Dict[str, int] = {}
+        for t in post_tags:
+            decrements[t["hashtag_id"]] = decrements.get(t["hashtag_id"], 0) + 1
+        await Hashtag.get_pymongo_collection().bulk_write(
+            [
+                UpdateOne(
+                    {"_id": PydanticObjectId(h)},
+                    [{"$set": {"post_count": {"$max": [0, {"$subtract": ["$post_count", n]}]}}}]
+                )
+                for h, n in decrements.items() if PydanticObjectId.is_valid(h)
+            ],
+            ordered=False
+        )
+
+    async def _purge_media(self, jobs: List[PostPurgeJob], posts_map: Dict[str, dict]):
+        media_ids = {
+            ref.id for j in jobs for ref in (posts_map.get(j.post_id) or {}).get("media") or []
+        }
+        if not media_ids:
+            return
+        media = await Media.find(In(Media.id, list(media_ids))).to_list()
+        if not media:
+            return
+
+        # Stored files first (shared ones only once unused): a retry can only find them
+        # through the Media documents
+        await MediaService.release_assets(media)
+        await Media.get_pymongo_collection().delete_many({"_id": {"$in": [m.id for m in media]}})
+
+    async def _purge_post(self, jobs: List[PostPurgeJob], posts_map: Dict[str, dict]):
+        post_ids = [j.post_id for j in jobs]
+        await _delete_in_batches(TimelineEntry, {"post_id": {"$in": post_ids}})
+
+        # Shares give back the share they added to their original
+        originals: Dict[PydanticObjectId, int] = {}
+        for post_id in post_ids:
+            ref = (posts_map.get(post_id) or {}).get("original_post")
+            if ref is not None:
+                originals[ref.id] = originals.get(ref.id, 0) + 1
+        if originals:
+            await Post.get_pymongo_collection().bulk_write(
+                [
+                    UpdateOne({"_id": oid}, [{"$set": {"share_count": {"$max": [0, {"$subtract": ["$share_count", n]}]}}}])
+                    for oid, n in originals.items()
+                ],
+                ordered=False
+            )
+
+        await Post.get_pymongo_collection().delete_many(
+            {"_id": {"$in": [PydanticObjectId(p) for p in post_ids]}, "is_deleted": True}
+        )
@@ -1,31 +1,36 @@
-from fastapi import APIRouter, status, Depends, UploadFile, File, HTTPException, Query
+from fastapi import APIRouter, status, Depends, UploadFile, File, HTTPException, Query, Request, Header
 from typing import List, Optional
 import uuid
-import shutil
-import os
-import asyncio
-from beanie import PydanticObjectId
-from beanie.operators import In
 # Import Schemas
-from .schemas import CreatePostRequest, PostResponse, ImageUploadResponse, VideoUploadResponse
+from .schemas import CreatePostRequest, PostResponse, PostPageResponse, PostBatchResponse, PostGridPageResponse, ImageUploadResponse, VideoUploadResponse, CreateUploadSessionRequest, UploadSessionResponse, DirectUploadRequest, DirectUploadResponse, DirectUploadStatusResponse
 
 # Import Errors
-from app.core.errors import FileSizeLimitException
+from app.core.errors import FileSizeLimitException, ContentValidationException
+from app.core.config import settings
 
 # Import Services
 from .services import PostService
 from app.core.media.service import MediaService
+from app.core.media.uploads import save_upload
+from app.core.media.sessions import UploadSessionService
+from app.core.media.direct import DirectUploadService
 from app.engagement.service import EngagementService
 from app.core.db.models import User
-from app.core.auth.schemas import UserPublicModel
+from .hydrator import PostHydrator
+from .cache import post_cache
+from .fields import PostFieldSet, post_fields
+from .grid import grid_item
+from app.core.responses import FastJSONResponse, page_response
 
 # Import Auth
 # Assuming you have a get_current_user dependency that returns the user's Pydantic model or ID
 from app.core.auth.dependencies import get_current_user 
 
 router = APIRouter(prefix="/posts", tags=["posts"])
+# Post listings that live under a user's URL
+users_router = APIRouter(prefix="/users", tags=["posts"])
 
-MAX_FILE_SIZE = 30 * 1024 * 1024 # 30MB
+MAX_FILE_SIZE = settings.UPLOAD_MAX_BYTES # 30MB
 
 @router.post("/upload/image", status_code=status.HTTP_201_CREATED, response_model=ImageUploadResponse)
 async def upload_image_endpoint(
@@ -39,10 +44,15 @@ async def upload_image_endpoint(
     if file.size and file.size > MAX_FILE_SIZE:
         raise FileSizeLimitException("File too large (max 30MB)")
 
+    # file.size is None for chunked requests: read at most one byte past the limit
+    content = await file.read(MAX_FILE_SIZE + 1)
+    if len(content) > MAX_FILE_SIZE:
+        raise FileSizeLimitException("File too large (max 30MB)")
+
     media_service = MediaService()
     response = await media_service.upload_image(
         owner_id=str(current_user.id),
-        file_content=await file.read(),
+        file_content=content,
         filename=file.filename,
         content_type=file.content_type,
         public_id=str(uuid.uuid4())
@@ -58,26 +68,120 @@ async def upload_video_endpoint(
     Endpoint to upload a video file.
     Queues the video processing task and returns a confirmation message.
     """
-    if file.size and file.size > MAX_FILE_SIZE:
-        raise FileSizeLimitException("File too large (max 30MB)")
-
-    # 1. Save file to temp disk storage
-    temp_dir = ".temp_uploads"
-    os.makedirs(temp_dir, exist_ok=True)
-    file_path = os.path.join(temp_dir, f"{uuid.uuid4()}_{file.filename}")
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # 1. Stream the file to temp disk storage (size-checked and hashed on the way)
+    upload = await save_upload(file, max_bytes=MAX_FILE_SIZE)
 
     media_service = MediaService()
     response = await media_service.process_video_background(
-        file_path=file_path,
+        file_path=upload.path,
         owner_id=str(current_user.id),
         filename=file.filename,
-        content_type=file.content_type
+        content_type=file.content_type,
+        content_hash=upload.sha256
     )
     return response
 
+def _session_response(session) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        session_id=str(session.id),
+        offset=session.offset,
+        length=session.length,
+        status=session.status.value,
+        media_id=session.media_id,
+        expires_at=session.expires_at
+    )
+
+@router.post("/upload/sessions", status_code=status.HTTP_201_CREATED, response_model=UploadSessionResponse)
+async def create_upload_session_endpoint(
+    req: CreateUploadSessionRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Starts a resumable video upload. Send the file with PATCH /upload/sessions/{id}
+    in one or more byte ranges, then call finalize.
+    """
+    session = await UploadSessionService().create_session(
+        owner_id=str(current_user.id),
+        filename=req.filename,
+        content_type=req.content_type,
+        length=req.length
+    )
+    return _session_response(session)
+
+@router.get("/upload/sessions/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session_endpoint(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Current offset of an upload: after a dropped connection, resume from here.
+    """
+    session = await UploadSessionService().get_session(str(current_user.id), session_id)
+    return _session_response(session)
+
+@router.patch("/upload/sessions/{session_id}", response_model=UploadSessionResponse)
+async def append_upload_chunk_endpoint(
+    session_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Appends the raw request body (application/offset+octet-stream) at Upload-Offset,
+    which must equal the session's current offset.
+    """
+    session = await UploadSessionService().append(
+        str(current_user.id), session_id, upload_offset, request.stream()
+    )
+    return _session_response(session)
+
+@router.post("/upload/sessions/{session_id}/finalize", status_code=status.HTTP_202_ACCEPTED, response_model=VideoUploadResponse)
+async def finalize_upload_session_endpoint(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Queues a fully uploaded session for processing, like POST /upload/video.
+    """
+    return await UploadSessionService().finalize(str(current_user.id), session_id)
+
+@router.post("/upload/direct", status_code=status.HTTP_201_CREATED, response_model=DirectUploadResponse)
+async def create_direct_upload_endpoint(
+    req: DirectUploadRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Signed parameters for uploading a file straight to storage (DIRECT_UPLOADS_ENABLED).
+    The returned media_id can be attached to a post right away; it turns ACTIVE once
+    storage confirms the upload.
+    """
+    return await DirectUploadService().create(str(current_user.id), req.filename, req.content_type)
+
+@router.post("/upload/direct/callback")
+async def direct_upload_callback_endpoint(
+    request: Request,
+    x_cld_timestamp: Optional[str] = Header(None),
+    x_cld_signature: Optional[str] = Header(None)
+):
+    """
+    Upload notification from the storage backend; authenticated by its signature.
+    """
+    body = (await request.body()).decode("utf-8")
+    await DirectUploadService().handle_callback(body, x_cld_timestamp, x_cld_signature)
+    return {"status": "ok"}
+
+@router.post("/upload/direct/{media_id}/complete", response_model=DirectUploadStatusResponse)
+async def complete_direct_upload_endpoint(
+    media_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Called by the client after its upload finished: checks storage now instead of
+    waiting for the callback.
+    """
+    media = await DirectUploadService().complete(str(current_user.id), media_id)
+    return {"media_id": str(media.id), "status": media.status.value, "view_link": media.view_link}
+
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=PostResponse)
 async def create_post_endpoint(
     req: CreatePostRequest,
@@ -90,26 +194,10 @@ async def create_post_endpoint(
     post_service = PostService()
     new_post = await post_service.create_post(user_id=str(current_user.id), req=req)
 
-    # Convert to PostResponse schema
-    post_response = PostResponse(
-        id=str(new_post.id),
-        owner_id=new_post.owner_id,
-        author=UserPublicModel(**current_user.model_dump()), # Optimization: Use the user object we already have
-        caption=new_post.caption,
-        media=[
-            {
-                "media_id": str(media.id),
-                "view_link": media.view_link,
-                "media_type": media.media_type
-            } for media in new_post.media
-        ],
-        likes_count=new_post.likes_count,
-        comments_count=new_post.comments_count,
-        created_at=new_post.created_at,
-        location=new_post.location
-    )
-    
-    return post_response
+    # Optimization: Use the user object we already have
+    hydrator = PostHydrator(str(current_user.id))
+    hydrator.prime_users(current_user)
+    return await hydrator.hydrate_one(new_post)
 
 
 @router.get("/medialist")
@@ -125,233 +213,97 @@ async def get_user_media(user_id: str):
     media_service = MediaService()
     return await media_service.get_user_media(user_id)
 
-@router.get("/", response_model=List[PostResponse])
+@router.get("/", response_model=PostPageResponse)
 async def get_posts(
-    limit: int = Query(10, le=50),
-    offset: int = 0,
+    limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = None,
+    fields: Optional[PostFieldSet] = Depends(post_fields),
     current_user: User = Depends(get_current_user)
 ):
     post_service = PostService()
-    engagement_service = EngagementService()
-    posts = await post_service.get_all_posts(limit=limit, offset=offset)
+    posts, next_cursor = await post_service.get_all_posts(limit=limit, cursor=cursor, fields=fields)
 
-    # Fetch authors for these posts to populate the 'author' field
-    owner_ids = {PydanticObjectId(post.owner_id) for post in posts}
-    
-    # Also collect original post owner IDs
-    for post in posts:
-        if post.original_post and hasattr(post.original_post, "owner_id"):
-             owner_ids.add(PydanticObjectId(post.original_post.owner_id))
+    hydrator = PostHydrator(str(current_user.id), fields)
+    return page_response(await hydrator.hydrate_dicts(posts), next_cursor)
 
-    users = await User.find(In(User.id, list(owner_ids))).to_list()
-    user_map = {str(u.id): u for u in users}
-    
-    # Helper to safely convert user to public model
-    def get_author_model(owner_id):
-        user = user_map.get(owner_id)
-        return UserPublicModel(**user.model_dump()) if user else None
+@router.get("/batch", response_model=PostBatchResponse)
+async def get_posts_batch(
+    ids: List[str] = Query(..., description="Post ids, comma-separated and/or repeated"),
+    fields: Optional[PostFieldSet] = Depends(post_fields),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Resolves up to POST_BATCH_MAX_IDS posts in one call (deep links, notification targets,
+    shared posts in messages). Posts, authors and the viewer's like / bookmark state are
+    loaded with a fixed number of queries. Items follow the requested order; missing
+    posts come back as placeholders with found=false.
+    """
+    post_ids = [i.strip() for value in ids for i in value.split(",") if i.strip()]
+    if len(post_ids) > settings.POST_BATCH_MAX_IDS:
+        raise ContentValidationException(f"At most {settings.POST_BATCH_MAX_IDS} ids per request")
 
-    # Fetch engagement status
-    post_ids = [str(p.id) for p in posts] + [str(p.original_post.id) for p in posts if p.original_post and hasattr(p.original_post, "id")]
-    
-    liked_ids, bookmarked_ids = await asyncio.gather(
-        engagement_service.get_liked_post_ids(str(current_user.id), post_ids),
-        engagement_service.get_bookmarked_post_ids(str(current_user.id), post_ids)
-    )
-    liked_set = set(liked_ids)
-    bookmarked_set = set(bookmarked_ids)
-
-    return [
-        PostResponse(
-            id=str(post.id),
-            owner_id=post.owner_id,
-            author=get_author_model(post.owner_id),
-            caption=post.caption,
-            media=[
-                {
-                    "media_id": str(media.id),
-                    "view_link": media.view_link,
-                    "media_type": media.media_type
-                } for media in post.media
-            ],
-            likes_count=post.likes_count,
-            comments_count=post.comments_count,
-            created_at=post.created_at,
-            location=post.location,
-            is_liked=str(post.id) in liked_set,
-            is_bookmarked=str(post.id) in bookmarked_set,
-            original_post=PostResponse(
-                id=str(post.original_post.id),
-                owner_id=post.original_post.owner_id,
-                author=get_author_model(post.original_post.owner_id),
-                caption=post.original_post.caption,
-                media=[
-                    {
-                        "media_id": str(m.id),
-                        "view_link": m.view_link,
-                        "media_type": m.media_type
-                    } for m in post.original_post.media
-                ] if post.original_post.media else [],
-                likes_count=post.original_post.likes_count,
-                comments_count=post.original_post.comments_count,
-                share_count=getattr(post.original_post, "share_count", 0),
-                created_at=post.original_post.created_at,
-                location=post.original_post.location,
-                is_liked=str(post.original_post.id) in liked_set,
-                is_bookmarked=str(post.original_post.id) in bookmarked_set
-            ) if post.original_post and hasattr(post.original_post, "owner_id") else None
-        ) for post in posts
-    ]
-
-@router.get("/user/{user_id}", response_model=List[PostResponse])
+    post_service = PostService()
+    posts = await post_service.get_posts_by_ids(post_ids, fields=fields)
+
+    hydrator = PostHydrator(str(current_user.id), fields)
+    hydrator.prime_users(current_user)
+    responses = {p["_id"]: p for p in await hydrator.hydrate_dicts(list(posts.values()))}
+
+    return FastJSONResponse({"items": [
+        {"id": post_id, "found": post_id in responses, "post": responses.get(post_id)}
+        for post_id in post_ids
+    ]})
+
+@router.get("/user/{user_id}", response_model=PostPageResponse)
 async def get_user_posts(
     user_id: str,
-    limit: int = Query(10, le=50),
-    offset: int = 0,
+    limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = None,
+    fields: Optional[PostFieldSet] = Depends(post_fields),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get a specific user's posts (Profile Feed).
     Includes is_liked and is_bookmarked state for the current viewer.
+    A profile grid only needs e.g. ?fields=id,thumbnail_url,likes_count,comments_count.
     """
     post_service = PostService()
-    engagement_service = EngagementService()
-    
-    posts = await post_service.get_user_posts(user_id, limit, offset)
-    
-    # Fetch the profile owner once
-    target_user = await User.get(PydanticObjectId(user_id))
-
-    # Collect IDs for batch fetching engagement status
-    # We also check original_post IDs to properly show state on shared posts
-    post_ids = [str(p.id) for p in posts]
-    original_ids = [str(p.original_post.id) for p in posts if p.original_post]
-    all_ids_to_check = list(set(post_ids + original_ids))
-    
-    # Parallel fetch of likes and bookmarks
-    liked_ids, bookmarked_ids = await asyncio.gather(
-        engagement_service.get_liked_post_ids(str(current_user.id), all_ids_to_check),
-        engagement_service.get_bookmarked_post_ids(str(current_user.id), all_ids_to_check)
-    )
-    
-    liked_set = set(liked_ids)
-    bookmarked_set = set(bookmarked_ids)
-    
-    def map_post(p, is_recursion=False):
-        if not p:
-            return None
-        
-        # If p is a Link and not fetched, we can't map it fully
-        if hasattr(p, "to_ref") and not hasattr(p, "owner_id"):
-            return None # Or handle differently
-            
-        return PostResponse(
-            id=str(p.id),
-            owner_id=p.owner_id,
-            author=UserPublicModel(**target_user.model_dump()) if target_user and not is_recursion else None,
-            caption=p.caption,
-            media=[
-                {
-                    "media_id": str(m.id),
-                    "view_link": m.view_link,
-                    "media_type": m.media_type
-                } for m in p.media if hasattr(m, "view_link")
-            ] if p.media else [],
-            likes_count=p.likes_count,
-            comments_count=p.comments_count,
-            share_count=getattr(p, "share_count", 0),
-            created_at=p.created_at,
-            is_liked=str(p.id) in liked_set,
-            is_bookmarked=str(p.id) in bookmarked_set,
-            original_post=map_post(p.original_post, is_recursion=True) if p.original_post and not is_recursion else None,
-            location=p.location
-        )
-
-    return [map_post(post) for post in posts]
-
-@router.get("/user/{user_id}/likes", response_model=List[PostResponse])
+    posts, next_cursor = await post_service.get_user_posts(user_id, limit, cursor, fields=fields)
+
+    hydrator = PostHydrator(str(current_user.id), fields)
+    return page_response(await hydrator.hydrate_dicts(posts), next_cursor)
+
+@users_router.get("/{user_id}/grid", response_model=PostGridPageResponse)
+async def get_user_grid(
+    user_id: str,
+    limit: int = Query(30, ge=1, le=60),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Profile grid: one tile per post (cover thumbnail, media type, counts), newest first.
+    Cheaper than /posts/user/{user_id} for profiles; open a post for the full response.
+    """
+    post_service = PostService()
+    rows, next_cursor = await post_service.get_user_grid(user_id, limit, cursor)
+    return page_response([grid_item(r) for r in rows], next_cursor)
+
+@router.get("/user/{user_id}/likes", response_model=PostPageResponse)
 async def get_user_liked_posts(
     user_id: str,
-    limit: int = Query(10, le=50),
-    offset: int = 0,
+    limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = None,
+    fields: Optional[PostFieldSet] = Depends(post_fields),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get posts liked by a specific user.
     """
     post_service = PostService()
-    engagement_service = EngagementService()
-    
-    posts = await post_service.get_liked_posts(user_id, limit, offset)
-    
-    if not posts:
-        return []
-
-    # Fetch authors
-    owner_ids = {PydanticObjectId(post.owner_id) for post in posts}
-    
-    # Also collect original post owner IDs
-    for post in posts:
-        if post.original_post and hasattr(post.original_post, "owner_id"):
-             owner_ids.add(PydanticObjectId(post.original_post.owner_id))
+    posts, next_cursor = await post_service.get_liked_posts(user_id, limit, cursor, fields=fields)
 
-    users = await User.find(In(User.id, list(owner_ids))).to_list()
-    user_map = {str(u.id): u for u in users}
-    
-    def get_author_model(owner_id):
-        user = user_map.get(owner_id)
-        return UserPublicModel(**user.model_dump()) if user else None
-
-    # Fetch engagement status for current_user
-    post_ids = [str(p.id) for p in posts] + [str(p.original_post.id) for p in posts if p.original_post and hasattr(p.original_post, "id")]
-    liked_ids, bookmarked_ids = await asyncio.gather(
-        engagement_service.get_liked_post_ids(str(current_user.id), post_ids),
-        engagement_service.get_bookmarked_post_ids(str(current_user.id), post_ids)
-    )
-    liked_set = set(liked_ids)
-    bookmarked_set = set(bookmarked_ids)
-
-    return [
-        PostResponse(
-            id=str(post.id),
-            owner_id=post.owner_id,
-            author=get_author_model(post.owner_id),
-            caption=post.caption,
-            media=[
-                {
-                    "media_id": str(media.id),
-                    "view_link": media.view_link,
-                    "media_type": media.media_type
-                } for media in post.media
-            ],
-            likes_count=post.likes_count,
-            comments_count=post.comments_count,
-            created_at=post.created_at,
-            location=post.location,
-            is_liked=str(post.id) in liked_set,
-            is_bookmarked=str(post.id) in bookmarked_set,
-            original_post=PostResponse(
-                id=str(post.original_post.id),
-                owner_id=post.original_post.owner_id,
-                author=get_author_model(post.original_post.owner_id),
-                caption=post.original_post.caption,
-                media=[
-                    {
-                        "media_id": str(m.id),
-                        "view_link": m.view_link,
-                        "media_type": m.media_type
-                    } for m in post.original_post.media
-                ] if post.original_post.media else [],
-                likes_count=post.original_post.likes_count,
-                comments_count=post.original_post.comments_count,
-                share_count=getattr(post.original_post, "share_count", 0),
-                created_at=post.original_post.created_at,
-                location=post.original_post.location,
-                is_liked=str(post.original_post.id) in liked_set,
-                is_bookmarked=str(post.original_post.id) in bookmarked_set
-            ) if post.original_post and hasattr(post.original_post, "owner_id") else None
-        ) for post in posts
-    ]
+    hydrator = PostHydrator(str(current_user.id), fields)
+    return page_response(await hydrator.hydrate_dicts(posts), next_cursor)
 
 # @router.post("/{post_id}/likes", status_code=status.HTTP_201_CREATED)
 # async def like_post(
@@ -388,91 +340,19 @@ async def share_post(
         tags=tags,
         location_id=location_id
     )
-    
-    original_post_resp = None
-    if new_post.original_post:
-        op = new_post.original_post
-        op_user = await User.get(PydanticObjectId(op.owner_id))
-        original_post_resp = PostResponse(
-            id=str(op.id),
-            owner_id=op.owner_id,
-            author=UserPublicModel(**op_user.model_dump()) if op_user else None,
-            caption=op.caption,
-            media=[
-                {
-                    "media_id": str(m.id),
-                    "view_link": m.view_link,
-                    "media_type": m.media_type
-                } for m in op.media
-            ] if op.media else [],
-            likes_count=op.likes_count,
-            comments_count=op.comments_count,
-            share_count=getattr(op, "share_count", 0),
-            created_at=op.created_at,
-            location=op.location
-        )
-
-    return PostResponse(
-        id=str(new_post.id),
-        owner_id=new_post.owner_id,
-        author=UserPublicModel(**current_user.model_dump()),
-        caption=new_post.caption,
-        media=[],
-        likes_count=new_post.likes_count,
-        comments_count=new_post.comments_count,
-        share_count=new_post.share_count,
-        created_at=new_post.created_at,
-        location=new_post.location,
-        original_post=original_post_resp
-    )
+
+    hydrator = PostHydrator(str(current_user.id))
+    hydrator.prime_users(current_user)
+    return await hydrator.hydrate_one(new_post)
 
 @router.get("/{post_id}", response_model=PostResponse)
 async def get_post(post_id: str):
-    post_service = PostService()
-    post = await post_service.get_post(post_id)
-    user = await User.get(PydanticObjectId(post.owner_id))
-    
-    original_post_resp = None
-    if post.original_post and hasattr(post.original_post, "owner_id"):
-        op = post.original_post
-        op_user = await User.get(PydanticObjectId(op.owner_id))
-        original_post_resp = PostResponse(
-            id=str(op.id),
-            owner_id=op.owner_id,
-            author=UserPublicModel(**op_user.model_dump()) if op_user else None,
-            caption=op.caption,
-            media=[
-                {
-                    "media_id": str(m.id),
-                    "view_link": m.view_link,
-                    "media_type": m.media_type
-                } for m in op.media
-            ] if op.media else [],
-            likes_count=op.likes_count,
-            comments_count=op.comments_count,
-            share_count=getattr(op, "share_count", 0),
-            created_at=op.created_at,
-            location=op.location
-        )
-    
-    return PostResponse(
-        id=str(post.id),
-        owner_id=post.owner_id,
-        author=UserPublicModel(**user.model_dump()) if user else None,
-        caption=post.caption,
-        media=[
-            {
-                "media_id": str(media.id),
-                "view_link": media.view_link,
-                "media_type": media.media_type
-            } for media in post.media
-        ],
-        likes_count=post.likes_count,
-        comments_count=post.comments_count,
-        created_at=post.created_at,
-        location=post.location,
-        original_post=original_post_resp
-    )
+    async def load() -> PostResponse:
+        post = await PostService().get_post(post_id)
+        # Public endpoint: no viewer, so is_liked / is_bookmarked stay False
+        return await PostHydrator().hydrate_one(post)
+
+    return await post_cache.get(post_id, load)
 
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_post(
@@ -490,21 +370,8 @@ async def update_post(
 ):
     post_service = PostService()
     updated_post = await post_service.update_post(post_id, str(current_user.id), req)
-    
-    return PostResponse(
-        id=str(updated_post.id),
-        owner_id=updated_post.owner_id,
-        author=UserPublicModel(**current_user.model_dump()), # Optimization: Use the user object we already have
-        caption=updated_post.caption,
-        media=[
-            {
-                "media_id": str(media.id),
-                "view_link": media.view_link,
-                "media_type": media.media_type
-            } for media in updated_post.media
-        ],
-        likes_count=updated_post.likes_count,
-        comments_count=updated_post.comments_count,
-        created_at=updated_post.created_at,
-        location=updated_post.location
-    )
+
+    # Optimization: Use the user object we already have
+    hydrator = PostHydrator(str(current_user.id))
+    hydrator.prime_users(current_user)
+    return await hydrator.hydrate_one(updated_post)
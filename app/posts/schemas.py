@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from app.discovery.schemas import LocationResponse
 from app.core.auth.schemas import UserPublicModel
@@ -34,6 +34,34 @@ class VideoUploadResponse(BaseModel):
     message: str
     media_id: str
 
+class DirectUploadRequest(BaseModel):
+    filename: str
+    content_type: str   # image/* or video/*
+
+class DirectUploadResponse(BaseModel):
+    media_id: str
+    upload_url: str                 # POST the file here as multipart "file"...
+    params: Dict[str, str]          # ...together with these form fields
+    expires_at: datetime
+
+class DirectUploadStatusResponse(BaseModel):
+    media_id: str
+    status: str     # PENDING until storage confirms the upload
+    view_link: str
+
+class CreateUploadSessionRequest(BaseModel):
+    filename: str
+    content_type: str
+    length: int = Field(..., gt=0)  # Total file size in bytes
+
+class UploadSessionResponse(BaseModel):
+    session_id: str
+    offset: int       # Bytes stored so far: the next chunk starts here
+    length: int
+    status: str
+    media_id: Optional[str] = None
+    expires_at: datetime
+
 # ==========================================
 # 2. Post Request Schemas (Client -> Server)
 # ==========================================
@@ -73,9 +101,47 @@ class PostResponse(BaseModel):
     is_liked: bool = False
     original_post: Optional["PostResponse"] = None
     location: Optional[LocationResponse] = None
+    # First media item's thumbnail; only filled when requested with ?fields=thumbnail_url
+    thumbnail_url: Optional[str] = None
 
     model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True)
 
 class PostCreateResponse(BaseModel):
     message: str = "Post created successfully"
-    post_id: str
\ No newline at end of file
+    post_id: str
+
+class PostBatchItem(BaseModel):
+    """
+    One slot of a multi-get, in the order the ids were requested.
+    `post` is None (and `found` False) for ids that don't exist or were deleted.
+    """
+    id: str
+    found: bool
+    post: Optional[PostResponse] = None
+
+class PostBatchResponse(BaseModel):
+    items: List[PostBatchItem]
+
+class PostPageResponse(BaseModel):
+    """
+    A page of posts. Pass next_cursor back as `cursor` to fetch the next page;
+    it is None on the last page.
+    """
+    items: List[PostResponse]
+    next_cursor: Optional[str] = None
+
+class PostGridItem(BaseModel):
+    """
+    One tile of a profile grid. media_type is the cover's file type ("image" / "video");
+    thumbnail_url is None while a cover video is still processing.
+    """
+    post_id: str
+    thumbnail_url: Optional[str] = None
+    media_type: Optional[str] = None
+    media_count: int = 0
+    likes_count: int = 0
+    comments_count: int = 0
+
+class PostGridPageResponse(BaseModel):
+    items: List[PostGridItem]
+    next_cursor: Optional[str] = None
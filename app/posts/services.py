@@ -1,30 +1,31 @@
+from typing import Dict, List, Optional, Tuple
 from app.posts.schemas import CreatePostRequest
-from .models import Media, Post, MediaStatus
+from .models import LIVE_POSTS, Post, PostOutboxEvent
 from beanie import PydanticObjectId
-from beanie.operators import In
-from bson.errors import InvalidId
-from app.core.errors import PostNotFoundException, MediaValidationException, UnauthorizedActionException, ContentValidationException
+from app.core.errors import PostNotFoundException, UnauthorizedActionException, ContentValidationException
+from app.core.media.service import MediaService
 from app.discovery.models import Location
 from app.discovery.service import DiscoveryService
 from app.notification.service import NotificationService
-from app.notification.models import NotificationType
 from app.core.utils.text import extract_mentions, extract_hashtags
+from app.core.utils.pagination import CHRONOLOGICAL_SORT, after_cursor, chronological_key, slice_page
+from .pipelines import find_post_page, find_posts_by_ids
+from .fields import PostFieldSet
+from .outbox import enqueue_post_event, insert_post_with_outbox, normalize_tags
+from .snapshots import apply_snapshots
+from .grid import GridPostProjection, apply_cover, resolve_covers
+from .purge import enqueue_purge, soft_delete_post
+from .cache import post_cache
 from app.core.db.models import User
+from app.feed.service import TimelineService
 
 class PostService:
     def __init__(self):
         self.notification_service = NotificationService()
+        self.timeline_service = TimelineService()
 
     async def create_post(self, user_id: str, req: CreatePostRequest) -> Post:
-        media_objects = []
-        for media_id in req.media_ids:
-            media = await Media.get(PydanticObjectId(media_id))
-            if not media or media.owner_id != user_id:
-                raise MediaValidationException(f"Invalid media_id: {media_id}")
-            allowed_statuses = [MediaStatus.ACTIVE, MediaStatus.PENDING]
-            if media.status not in allowed_statuses:
-                raise MediaValidationException(f"Media is not ready (Status: {media.status}): {media_id}")
-            media_objects.append(media)
+        media_objects = await MediaService.resolve_owned_media(user_id, req.media_ids)
 
         location = None
         if req.location_id:
@@ -32,146 +33,129 @@ class PostService:
             if not location:
                 raise ContentValidationException(f"Invalid location_id: {req.location_id}")
 
+        # Hashtags from the caption are merged into tags up front, so the post is written once
+        tags = normalize_tags([*(req.tags or []), *extract_hashtags(req.caption or "")])
+
         new_post = Post(
             owner_id=user_id,
             caption=req.caption,
-            tags=req.tags,
+            tags=tags,
             media=media_objects,
             location=location
         )
-        
-        await new_post.save()
+        apply_snapshots(new_post)
+        apply_cover(new_post)
+
+        # Hashtags, mention notifications and timeline fan-out run in the outbox worker,
+        # so posting latency doesn't depend on what the caption contains
+        event = PostOutboxEvent(
+            post_id="",
+            owner_id=user_id,
+            tags=tags,
+            mentions=sorted(extract_mentions(req.caption or "")),
+            caption_preview=req.caption[:50] if req.caption else None
+        )
+        await insert_post_with_outbox(new_post, event)
+
+        # The author's own timeline is one write; the worker fans out to everyone else
+        await self.timeline_service.add_own_post(new_post)
+        await enqueue_post_event(event)
 
-        # Integrate Discovery: Process Hashtags
-        tags_to_process = set(req.tags or [])
-        if req.caption:
-            tags_to_process.update(extract_hashtags(req.caption))
-            
-        if tags_to_process:
-            discovery_service = DiscoveryService()
-            await discovery_service.process_post_tags(str(new_post.id), list(tags_to_process))
-            # Optionally update the post document if we want hashtags extracted from caption to be in the tags field
-            if tags_to_process != set(req.tags or []):
-                new_post.tags = list(tags_to_process)
-                await new_post.save()
-
-        # Handle Mentions
-        if req.caption:
-            mentioned_usernames = extract_mentions(req.caption)
-            if mentioned_usernames:
-                mentioned_users = await User.find({"username": {"$in": list(mentioned_usernames)}}).to_list()
-                for m_user in mentioned_users:
-                    if str(m_user.id) != user_id:
-                        await self.notification_service.create_notification(
-                            recipient_id=str(m_user.id),
-                            actor_id=user_id,
-                            type=NotificationType.MENTION,
-                            target_id=str(new_post.id),
-                            metadata={"preview": req.caption[:50], "source": "post"}
-                        )
-            
         return new_post
 
     async def get_post(self, post_id: str) -> Post:
-        try:
-            post = await Post.get(PydanticObjectId(post_id), fetch_links=True)
-        except InvalidId:
-            raise PostNotFoundException()
-            
-        if not post:
+        if not PydanticObjectId.is_valid(post_id):
             raise PostNotFoundException()
-        return post
-
-    async def get_all_posts(self, limit: int = 10, offset: int = 0) -> list[Post]:
-        return (
-            await Post.find_all(fetch_links=True)
-            .sort(-Post.created_at)
-            .skip(offset)
-            .limit(limit)
-            .to_list()
-        )
 
-    async def get_user_posts(self, user_id: str, limit: int = 10, offset: int = 0) -> list[Post]:
-        return (
-            await Post.find(Post.owner_id == user_id, fetch_links=True)
-            .sort(-Post.created_at)
-            .skip(offset)
-            .limit(limit)
-            .to_list()
+        posts = await find_posts_by_ids([post_id])
+        if not posts:
+            raise PostNotFoundException()
+        return posts[0]
+
+    async def get_posts_by_ids(self, post_ids: List[str], fields: Optional[PostFieldSet] = None) -> Dict[str, Post]:
+        """
+        Loads many posts (links resolved) with one aggregation, keyed by id.
+        Invalid and unknown ids are simply absent.
+        """
+        posts = await find_posts_by_ids(list(dict.fromkeys(post_ids)), fields=fields)
+        return {str(p.id): p for p in posts}
+
+    async def get_all_posts(self, limit: int = 10, cursor: Optional[str] = None, fields: Optional[PostFieldSet] = None) -> Tuple[List[Post], Optional[str]]:
+        posts = await find_post_page(after_cursor(cursor), sort=CHRONOLOGICAL_SORT, limit=limit + 1, fields=fields)
+        return slice_page(posts, limit, chronological_key)
+
+    async def get_user_posts(self, user_id: str, limit: int = 10, cursor: Optional[str] = None, fields: Optional[PostFieldSet] = None) -> Tuple[List[Post], Optional[str]]:
+        posts = await find_post_page(
+            {"owner_id": user_id}, after_cursor(cursor), sort=CHRONOLOGICAL_SORT, limit=limit + 1, fields=fields
         )
-
-    async def get_liked_posts(self, user_id: str, limit: int = 10, offset: int = 0) -> list[Post]:
+        return slice_page(posts, limit, chronological_key)
+
+    async def get_user_grid(self, user_id: str, limit: int = 30, cursor: Optional[str] = None) -> Tuple[List[GridPostProjection], Optional[str]]:
+        """
+        A page of a user's profile grid. The owner_id index serves the filter and sort and
+        the page is keyset-paged, so it fetches limit + 1 projected documents whatever the
+        number of posts.
+        """
+        rows = await Post.find(
+            Post.owner_id == user_id, LIVE_POSTS, after_cursor(cursor)
+        ).sort("-created_at", "-_id").limit(limit + 1).project(GridPostProjection).to_list()
+        rows, next_cursor = slice_page(rows, limit, chronological_key)
+
+        # Posts from before the cover fields (until backfilled) are resolved in a few batched queries
+        legacy = [r.id for r in rows if r.media_count is None]
+        if legacy:
+            covers = await resolve_covers(legacy)
+            for r in rows:
+                cover = covers.get(r.id)
+                if cover:
+                    r.cover_thumbnail_url = cover["cover_thumbnail_url"]
+                    r.cover_media_type = cover["cover_media_type"]
+                    r.media_count = cover["media_count"]
+
+        return rows, next_cursor
+
+    async def get_liked_posts(self, user_id: str, limit: int = 10, cursor: Optional[str] = None, fields: Optional[PostFieldSet] = None) -> Tuple[List[Post], Optional[str]]:
         from app.engagement.models import PostLike
         
-        # Get post IDs liked by user (newest likes first)
-        likes = await PostLike.find(PostLike.user_id == user_id).sort(-PostLike.created_at).skip(offset).limit(limit).to_list()
+        # Get post IDs liked by user (newest likes first); the cursor walks the likes, not the posts
+        likes = await PostLike.find(
+            PostLike.user_id == user_id, after_cursor(cursor)
+        ).sort("-created_at", "-_id").limit(limit + 1).to_list()
+        likes, next_cursor = slice_page(likes, limit, chronological_key)
         if not likes:
-            return []
-            
-        post_ids = []
-        for like in likes:
-            try:
-                post_ids.append(PydanticObjectId(like.post_id))
-            except (InvalidId, TypeError):
-                continue
-
-        posts = await Post.find(In(Post.id, post_ids), fetch_links=True).to_list()
-        
-        # Sort posts by the order they appear in 'likes'
-        posts_map = {str(p.id): p for p in posts}
-        ordered_posts = []
-        for like in likes:
-            p = posts_map.get(like.post_id)
-            if p:
-                ordered_posts.append(p)
-                
-        return ordered_posts
+            return [], None
+
+        # Posts come back in the order they appear in 'likes'
+        posts = await find_posts_by_ids([like.post_id for like in likes], fields=fields)
+        return posts, next_cursor
 
     async def delete_post(self, post_id: str, user_id: str):
-        post = await Post.get(PydanticObjectId(post_id), fetch_links=True)
-        if not post:
+        """
+        Hides the post right away; its likes, comments, tags, media, shares and
+        timeline entries are removed by the purge worker (app/posts/purge.py).
+        """
+        post = await Post.get(PydanticObjectId(post_id))
+        if not post or post.is_deleted:
             raise PostNotFoundException()
         
         if post.owner_id != user_id:
             raise UnauthorizedActionException("You are not authorized to delete this post")
-        
-        # Delete associated media from Cloudinary and database
-        if post.media:
-            import cloudinary.uploader
-            from app.core.config import configure_cloudinary
-            configure_cloudinary()
-            
-            for media in post.media:
-                if media.public_id:
-                    try:
-                        # Determine resource type based on file type
-                        from .models import MediaType
-                        resource_type = "video" if media.file_type == MediaType.VIDEO else "image"
-                        cloudinary.uploader.destroy(media.public_id, resource_type=resource_type)
-                        print(f"Deleted Cloudinary asset: {media.public_id}")
-                    except Exception as e:
-                        # Continue with deletion even if Cloudinary fails
-                        pass
-            
-        await post.delete()
+
+        job = await soft_delete_post(post)
+        await post_cache.invalidate_posts(post_id)
+        await enqueue_purge(job)
 
     async def update_post(self, post_id: str, user_id: str, req: CreatePostRequest) -> Post:
-        post = await Post.get(PydanticObjectId(post_id), fetch_links=True)
-        if not post:
+        # Only scalar fields change and media / location are replaced outright, so the links
+        # aren't fetched; the hydrator resolves original_post for the response
+        post = await Post.get(PydanticObjectId(post_id))
+        if not post or post.is_deleted:
             raise PostNotFoundException()
             
         if post.owner_id != user_id:
             raise UnauthorizedActionException("You are not authorized to update this post")
 
-        media_objects = []
-        for media_id in req.media_ids:
-            media = await Media.get(PydanticObjectId(media_id))
-            if not media or media.owner_id != user_id:
-                raise MediaValidationException(f"Invalid media_id: {media_id}")
-            allowed_statuses = [MediaStatus.ACTIVE, MediaStatus.PENDING]
-            if media.status not in allowed_statuses:
-                raise MediaValidationException(f"Media is not ready (Status: {media.status}): {media_id}")
-            media_objects.append(media)
+        media_objects = await MediaService.resolve_owned_media(user_id, req.media_ids)
 
         location = None
         if req.location_id:
@@ -183,8 +167,11 @@ class PostService:
         post.tags = req.tags
         post.media = media_objects
         post.location = location
+        apply_snapshots(post)
+        apply_cover(post)
         
         await post.save()
+        await post_cache.invalidate_posts(post_id)
 
         # Integrate Discovery: Process Hashtags (Additive)
         if req.tags:
@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+from typing import Optional, Set
+
+import certifi
+from beanie import PydanticObjectId, init_beanie
+from beanie.operators import In
+from pymongo import AsyncMongoClient, UpdateOne
+
+from app.core.config import settings
+from app.discovery.models import Location
+from app.posts.models import LocationSnapshot, Media, MediaSnapshot, MediaStatus, Post
+
+
+def apply_snapshots(post: Post):
+    """
+    Fills media_snapshots / location_snapshot from the post's (already loaded) media and
+    location. Runs when POST_EMBED_SNAPSHOTS is on, and always for a post that already has
+    snapshots so an edit never leaves a stale copy behind.
+    """
+    if not settings.POST_EMBED_SNAPSHOTS and post.media_snapshots is None:
+        return
+
+    post.media_snapshots = [MediaSnapshot.from_media(m) for m in post.media if isinstance(m, Media)]
+    post.location_snapshot = (
+        LocationSnapshot.from_location(post.location) if isinstance(post.location, Location) else None
+    )
+
+
+def has_media_snapshots(post: Post) -> bool:
+    """
+    True if the post's media can be rendered from its snapshots alone. Snapshots of media
+    still PENDING may have missed the refresh, so those posts read the live documents.
+    """
+    return post.media_snapshots is not None and all(
+        s.status != MediaStatus.PENDING for s in post.media_snapshots
+    )
+
+
+def media_file_types(post: Post) -> Set[str]:
+    """
+    File types ("image", "video") attached to a post, from snapshots or fetched media.
+    """
+    if post.media_snapshots is not None:
+        return {s.file_type.value for s in post.media_snapshots}
+    return {m.file_type.value for m in post.media if isinstance(m, Media)}
+
+
+async def refresh_media_snapshots(media: Media) -> int:
+    """
+    Rewrites the snapshot of `media` in every post that embeds it. Returns the number
+    of posts updated.
+    """
+    media_id = str(media.id)
+    result = await Post.get_pymongo_collection().update_many(
+        {"media_snapshots.id": media_id},
+        {"$set": {"media_snapshots.$[m]": MediaSnapshot.from_media(media).model_dump(mode="json")}},
+        array_filters=[{"m.id": media_id}]
+    )
+    return result.modified_count
+
+
+async def backfill_post_snapshots(batch_size: int = 500, after: Optional[str] = None) -> int:
+    """
+    Adds snapshots to every post that has none, walking `posts` in _id order.
+    Each batch costs three reads (posts, media, locations) and one bulk write.
+    Safe to stop and resume: pass the last printed id as `after`.
+    """
+    collection = Post.get_pymongo_collection()
+    query = {"media_snapshots": None}
+    if after:
+        query["_id"] = {"$gt": PydanticObjectId(after)}
+
+    updated = 0
+    while True:
+        # 1. Next batch of posts without snapshots (links only, nothing resolved)
+        docs = await collection.find(query, {"media": 1, "location": 1}).sort("_id", 1).limit(batch_size).to_list()
+        if not docs:
+            break
+
+        # 2. Every media / location of the batch in one query each
+        media_ids = {ref.id for d in docs for ref in d.get("media") or []}
+        location_ids = {d["location"].id for d in docs if d.get("location")}
+        media = await Media.find(In(Media.id, list(media_ids))).to_list() if media_ids else []
+        locations = await Location.find(In(Location.id, list(location_ids))).to_list() if location_ids else []
+        media_map = {m.id: m for m in media}
+        locations_map = {loc.id: loc for loc in locations}
+
+        # 3. One bulk write; the filter skips posts that got snapshots in the meantime
+        ops = []
+        for d in docs:
+            snapshots = [
+                MediaSnapshot.from_media(media_map[ref.id]).model_dump(mode="json")
+                for ref in d.get("media") or [] if ref.id in media_map
+            ]
+            location = locations_map.get(d["location"].id) if d.get("location") else None
+            ops.append(UpdateOne(
+                {"_id": d["_id"], "media_snapshots": None},
+                {"$set": {
+                    "media_snapshots": snapshots,
+                    "location_snapshot": LocationSnapshot.from_location(location).model_dump(mode="json") if location else None
+                }}
+            ))
+        result = await collection.bulk_write(ops, ordered=False)
+        updated += result.modified_count
+
+        last_id = docs[-1]["_id"]
+        query["_id"] = {"$gt": last_id}
+        print(f"Backfilled {updated} posts so far (last _id {last_id})")
+
+    return updated
+
+
+async def _main(batch_size: int, after: Optional[str]):
+    mongo_options = {}
+    if settings.VALIDATE_CERTS and "localhost" not in settings.MONGODB_URL and "127.0.0.1" not in settings.MONGODB_URL:
+        mongo_options["tlsCAFile"] = certifi.where()
+        mongo_options["tls"] = True
+
+    client = AsyncMongoClient(settings.MONGODB_URL, **mongo_options)
+    try:
+        await init_beanie(database=client[settings.DB_NAME], document_models=[Post, Media, Location])
+        total = await backfill_post_snapshots(batch_size=batch_size, after=after)
+        print(f"Done: {total} posts backfilled")
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    # python -m app.posts.snapshots [--batch-size 500] [--after <post_id>]
+    parser = argparse.ArgumentParser(description="Embed media/location snapshots in existing posts.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--after", help="Resume after this post _id")
+    args = parser.parse_args()
+    asyncio.run(_main(args.batch_size, args.after))
@@ -5,6 +5,7 @@ from app.core.auth.dependencies import get_current_user
 from app.core.db.models import User
 from app.stories.schemas import CreateStoryRequest, StoryFeedItem, StoryResponse
 from app.stories.service import StoryService
+from app.feed.warmup import pop_warm_story_tray
 
 router = APIRouter(prefix="/stories", tags=["Stories"])
 
@@ -48,6 +49,10 @@ async def get_stories_feed(
     """
     Get the tray of active stories from followed users and yourself.
     """
+    # Tray prefetched at login / token refresh
+    warm_tray = await pop_warm_story_tray(str(current_user.id))
+    if warm_tray is not None:
+        return warm_tray
     return await StoryService.get_stories_feed(str(current_user.id))
 
 @router.post("/{story_id}/view", status_code=status.HTTP_200_OK)
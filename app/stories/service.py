@@ -5,21 +5,17 @@ from beanie import Document, Link, PydanticObjectId
 from app.stories.models import Story, StoryView
 from app.stories.reactions_models import StoryReaction
 from app.stories.schemas import CreateStoryRequest, StoryResponse, StoryFeedItem
-from app.posts.models import Media, MediaStatus
-from app.core.db.models import User, UserFollows
-from app.core.errors import StoryNotFoundException, MediaValidationException, UnauthorizedActionException
+from app.core.db.models import User
+from app.following.graph_cache import SocialGraphCache
+from app.core.errors import StoryNotFoundException, UnauthorizedActionException
+from app.core.media.service import MediaService
 from beanie.operators import In, And
 
 class StoryService:
     @staticmethod
     async def create_story(user_id: str, req: CreateStoryRequest) -> Story:
         # 1. Validate Media
-        media = await Media.get(PydanticObjectId(req.media_id))
-        if not media or media.owner_id != user_id:
-            raise MediaValidationException("Media not found")
-        
-        if media.status not in [MediaStatus.ACTIVE, MediaStatus.PENDING]:
-             raise MediaValidationException("Media is not ready for use")
+        [media] = await MediaService.resolve_owned_media(user_id, [req.media_id])
 
         # 2. Create Story
         # Expiry is 24 hours from now
@@ -49,10 +45,8 @@ class StoryService:
         Get active stories from people the user follows.
         Grouped by User.
         """
-        # 1. Get List of Followed IDs
-        # This can be optimized with aggregation, but simple query first
-        following = await UserFollows.find(UserFollows.follower_id == user_id).to_list()
-        followed_ids = [f.following_id for f in following]
+        # 1. Get List of Followed IDs (active follows, from the graph cache)
+        followed_ids = list(await SocialGraphCache().get_following(user_id))
         
         # Include self in stories feed (typical pattern)
         followed_ids.append(user_id)
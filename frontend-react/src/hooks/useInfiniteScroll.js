@@ -5,6 +5,8 @@ const useInfiniteScroll = (fetchFunction, options = {}) => {
     const [items, setItems] = useState([]);
     const [loading, setLoading] = useState(false);
     const [offset, setOffset] = useState(0);
+    // Cursor-paged endpoints return { items, next_cursor }; next_cursor is sent back for the next page
+    const [cursor, setCursor] = useState(null);
     const [hasMore, setHasMore] = useState(true);
     const [error, setError] = useState(null);
 
@@ -20,10 +22,12 @@ const useInfiniteScroll = (fetchFunction, options = {}) => {
 
         try {
             const currentOffset = reset ? 0 : offset;
-            const result = await fetchFunction(currentOffset, limit);
+            const currentCursor = reset ? null : cursor;
+            const result = await fetchFunction(currentOffset, limit, currentCursor);
 
+            const isCursorPage = !Array.isArray(result) && 'next_cursor' in result;
             const newItems = Array.isArray(result) ? result : result.items;
-            const fetchedCount = Array.isArray(result) ? newItems.length : result.fetchedCount;
+            const fetchedCount = Array.isArray(result) ? newItems.length : (result.fetchedCount ?? newItems.length);
 
             if (reset) {
                 setItems(newItems);
@@ -47,9 +51,14 @@ const useInfiniteScroll = (fetchFunction, options = {}) => {
                 setOffset(prev => prev + fetchedCount);
             }
 
+            if (isCursorPage) {
+                // The backend says whether another page exists
+                setCursor(result.next_cursor);
+                setHasMore(Boolean(result.next_cursor));
+            }
             // If we got fewer items than limit (based on source fetch), we reached the end
             // We use fetchedCount because that represents the backend pagination unit
-            if (fetchedCount < limit) {
+            else if (fetchedCount < limit) {
                 setHasMore(false);
             } else {
                 setHasMore(true);
@@ -62,7 +71,7 @@ const useInfiniteScroll = (fetchFunction, options = {}) => {
             setLoading(false);
             isFetching.current = false;
         }
-    }, [fetchFunction, limit, offset, hasMore, loading, deduplicate]);
+    }, [fetchFunction, limit, offset, cursor, hasMore, loading, deduplicate]);
 
     // Initial Load - Guard against infinite loops
     useEffect(() => {
@@ -82,6 +91,7 @@ const useInfiniteScroll = (fetchFunction, options = {}) => {
     const reset = useCallback(() => {
         setItems([]);
         setOffset(0);
+        setCursor(null);
         setHasMore(true);
         setLoading(false);
         // Important: trigger immediate reload after state reset
@@ -37,14 +37,16 @@ const Explore = () => {
     }, [location.search]);
 
 
-    const fetchExplore = useCallback(async (offset, limit) => {
-        let endpoint = `/discovery/explore?limit=${limit}&offset=${offset}`;
+    const fetchExplore = useCallback(async (offset, limit, cursor) => {
+        // Post feeds (explore, places, tags) are cursor-paged; searches take an offset
+        const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+        let endpoint = `/discovery/explore?limit=${limit}${cursorParam}`;
 
         // Case 1: Specific Location Feed (Posts)
         // We ensure debouncedSearchQuery matches the URL query to prevent typing from triggering this
         const urlQuery = new URLSearchParams(window.location.search).get('query');
         if (isLocationFeed && debouncedSearchQuery && debouncedSearchQuery === urlQuery) {
-            endpoint = `/discovery/places/${debouncedSearchQuery}?limit=${limit}&offset=${offset}`;
+            endpoint = `/discovery/places/${debouncedSearchQuery}?limit=${limit}${cursorParam}`;
         }
         // Case 2: Places Search (List of Places)
         // Only trigger place search if we are NOT viewing a specific location feed
@@ -54,7 +56,7 @@ const Explore = () => {
         // Case 3: Standard Search (Users/Tags)
         else if (debouncedSearchQuery) {
             if (debouncedSearchQuery.startsWith('#')) {
-                endpoint = `/discovery/tags/${debouncedSearchQuery.replace('#', '')}?limit=${limit}&offset=${offset}`;
+                endpoint = `/discovery/tags/${debouncedSearchQuery.replace('#', '')}?limit=${limit}${cursorParam}`;
             } else {
                 endpoint = `/discovery/search?q=${encodeURIComponent(debouncedSearchQuery)}&type=user&limit=${limit}&offset=${offset}`;
             }
@@ -67,8 +69,8 @@ const Explore = () => {
 
         const res = await axios.get(endpoint);
         let data = res.data;
-        if (!debouncedSearchQuery && Array.isArray(data)) {
-            data = data.filter(post => post.media && post.media.length > 0);
+        if (!debouncedSearchQuery && data.items) {
+            data = { ...data, items: data.items.filter(post => post.media && post.media.length > 0) };
         }
         return data;
     }, [debouncedSearchQuery, activeCategory, isLocationFeed]);
@@ -15,7 +15,7 @@ import { AnimatePresence } from 'framer-motion';
 const Home = () => {
     const [posts, setPosts] = useState([]);
     const [loading, setLoading] = useState(true);
-    const [offset, setOffset] = useState(0);
+    const [cursor, setCursor] = useState(null);
     const [hasMore, setHasMore] = useState(true);
     const [activeStoryGroups, setActiveStoryGroups] = useState(null);
     const [initialStoryIndex, setInitialStoryIndex] = useState(0);
@@ -24,9 +24,10 @@ const Home = () => {
 
     const fetchPosts = async (isInitial = false) => {
         try {
-            const currentOffset = isInitial ? 0 : offset;
-            const res = await axios.get(`/posts/?limit=10&offset=${currentOffset}`);
-            const fetchedPosts = res.data;
+            const currentCursor = isInitial ? null : cursor;
+            const cursorParam = currentCursor ? `&cursor=${encodeURIComponent(currentCursor)}` : '';
+            const res = await axios.get(`/posts/?limit=10${cursorParam}`);
+            const fetchedPosts = res.data.items;
 
             // Filter out posts that have media but no view_link/url (still processing)
             const validPosts = fetchedPosts.filter(post => {
@@ -44,8 +45,8 @@ const Home = () => {
                 });
             }
 
-            setHasMore(fetchedPosts.length === 10);
-            setOffset(currentOffset + fetchedPosts.length);
+            setHasMore(Boolean(res.data.next_cursor));
+            setCursor(res.data.next_cursor);
         } catch (err) {
             console.error('Failed to fetch posts', err);
         } finally {
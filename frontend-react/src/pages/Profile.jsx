@@ -61,8 +61,8 @@ const Profile = () => {
                 // Deduplicate posts
                 const uniquePosts = [];
                 const seenIds = new Set();
-                if (Array.isArray(postsRes.data)) {
-                    postsRes.data.forEach(p => {
+                if (Array.isArray(postsRes.data.items)) {
+                    postsRes.data.items.forEach(p => {
                         const pid = p.id || p._id;
                         if (!seenIds.has(pid)) {
                             seenIds.add(pid);
@@ -140,7 +140,7 @@ const Profile = () => {
             const fetchLikedPosts = async () => {
                 try {
                     const res = await axios.get(`/posts/user/${profileUser.id || profileUser._id}/likes`);
-                    setLikedPosts(res.data);
+                    setLikedPosts(res.data.items);
                 } catch (err) {
                     console.error('Failed to fetch liked posts', err);
                 }
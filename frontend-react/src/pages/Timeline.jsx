@@ -19,8 +19,9 @@ const Timeline = () => {
     const [selectedPost, setSelectedPost] = useState(null);
     const { user } = useAuth();
 
-    const fetchTimelinePosts = useCallback(async (offset, limit) => {
-        const res = await axios.get(`/feed/timeline?limit=${limit}&offset=${offset}`);
+    const fetchTimelinePosts = useCallback(async (offset, limit, cursor) => {
+        const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+        const res = await axios.get(`/feed/timeline?limit=${limit}${cursorParam}`);
         return res.data;
     }, []);
 
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from beanie import init_beanie
+from pymongo import AsyncMongoClient, monitoring
+from app.core.config import settings
+from app.core.db.models import User, UserFollows, UserBlocks
+from app.posts.models import Post, Media
+from app.engagement.models import PostLike, Bookmark
+from app.discovery.models import Hashtag, PostTag, Location
+from app.posts.hydrator import PostHydrator
+from app.posts.pipelines import find_post_page
+from app.core.utils.pagination import CHRONOLOGICAL_SORT
+
+# Compares building one page of posts through Beanie's fetch_links=True against
+# the single $lookup aggregation in app/posts/pipelines.py.
+# Both paths are followed by PostHydrator so the numbers cover a full PostResponse page.
+# Run against a database that has some posts, ideally including shares:
+#   python -m tests.bench_post_page
+
+PAGE_SIZES = [10, 20, 50]
+ROUNDS = 20
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts every command the driver sends (find, aggregate, getMore, ...)."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def reset(self):
+        self.counts = {}
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def started(self, event):
+        self.counts[event.command_name] = self.counts.get(event.command_name, 0) + 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+async def beanie_page(limit):
+    posts = await Post.find(fetch_links=True).sort("-created_at", "-_id").limit(limit).to_list()
+    return await PostHydrator().hydrate(posts)
+
+
+async def pipeline_page(limit):
+    posts = await find_post_page(sort=CHRONOLOGICAL_SORT, limit=limit)
+    return await PostHydrator().hydrate(posts)
+
+
+async def measure(counter, build, limit):
+    # Warm up connection pool and server caches
+    await build(limit)
+
+    counter.reset()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        page = await build(limit)
+    elapsed = (time.perf_counter() - start) / ROUNDS * 1000
+    return len(page), counter.total / ROUNDS, dict(counter.counts), elapsed
+
+
+async def run_benchmark():
+    print("Connecting to DB...")
+    counter = CommandCounter()
+    client = AsyncMongoClient(settings.MONGODB_URL, event_listeners=[counter])
+    await init_beanie(database=client[settings.DB_NAME], document_models=[
+        User, UserFollows, UserBlocks, Post, Media, PostLike, Bookmark, Location, Hashtag, PostTag
+    ])
+
+    for limit in PAGE_SIZES:
+        print(f"\n--- Page size {limit} ({ROUNDS} rounds) ---")
+        for name, build in (("fetch_links", beanie_page), ("$lookup pipeline", pipeline_page)):
+            size, per_page, counts, ms = await measure(counter, build, limit)
+            print(f"{name:>18}: {size} posts, {per_page:.1f} round trips/page, {ms:.1f} ms/page")
+            print(f"{'':>18}  commands: {counts}")
+
+    await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from beanie import PydanticObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.db.models import User
+from app.core.responses import page_response
+from app.discovery.models import GeoLocation, Location
+from app.posts.fields import PostFieldSet
+from app.posts.hydrator import PostHydrator
+from app.posts.models import Media, MediaSnapshot, MediaStatus, MediaType, Post
+from app.posts.schemas import PostPageResponse
+
+# Compares the two ways of turning one page of hydrated posts into a response body:
+#   before: PostResponse models -> response_model validation + serialization -> json.dumps
+#           (what FastAPI does for a route returning {"items": [PostResponse, ...]})
+#   after:  PostHydrator.hydrate_dicts -> FastJSONResponse (orjson), no validation
+# Only serialization is measured: the posts are built in memory, so no database is needed.
+# Both bodies are checked to decode to the same JSON first.
+#   python -m tests.bench_serialization
+
+PAGE_SIZE = 50
+ROUNDS = 200
+
+_page_field = create_model_field(name="Response_page", type_=PostPageResponse, mode="serialization")
+
+
+def build_page(size):
+    now = datetime.now(timezone.utc)
+    authors = [
+        User.model_construct(
+            id=PydanticObjectId(), username=f"user{i}", email=f"user{i}@example.com", password_hash="x",
+            first_name="First", last_name="Last", bio="Bio", avatar_url=f"https://cdn.example.com/a/{i}.jpg",
+            created_at=now, is_private=False, followers_count=120 * i, following_count=80
+        )
+        for i in range(10)
+    ]
+    location = Location.model_construct(
+        id=PydanticObjectId(), name="Lagos", location=GeoLocation(coordinates=[3.3792, 6.5244]), address="Lagos, NG"
+    )
+
+    posts = []
+    for i in range(size):
+        media = [
+            Media.model_construct(
+                id=PydanticObjectId(), owner_id=str(authors[i % 10].id), status=MediaStatus.ACTIVE,
+                file_type=MediaType.IMAGE, filename=f"{i}-{j}.jpg", media_type="image/jpeg",
+                public_id=f"wetalk/{i}-{j}", view_link=f"https://cdn.example.com/m/{i}-{j}.jpg", created_at=now
+            )
+            for j in range(1 + i % 3)
+        ]
+        post = Post.model_construct(
+            id=PydanticObjectId(), owner_id=str(authors[i % 10].id), caption=f"Post number {i} #wetalk",
+            tags=["wetalk"], media=media, location=location if i % 4 == 0 else None,
+            likes_count=i * 7, comments_count=i, share_count=i % 5, original_post=None,
+            media_snapshots=None, location_snapshot=None,
+            created_at=now - timedelta(minutes=i), updated_at=now
+        )
+        if i % 5 == 0:
+            # Half of these render from embedded snapshots instead of the media documents
+            post.media_snapshots = [MediaSnapshot.from_media(m) for m in media]
+        if i % 10 == 9:
+            post.original_post = posts[i - 1]
+        posts.append(post)
+    return posts, authors
+
+
+def hydrator(authors, fields=None):
+    h = PostHydrator(fields=fields)
+    h.prime_users(*authors)
+    return h
+
+
+async def models_body(posts, authors):
+    items = await hydrator(authors).hydrate(posts)
+    content = await serialize_response(field=_page_field, response_content={"items": items, "next_cursor": "abc"})
+    return JSONResponse(content).body
+
+
+async def dicts_body(posts, authors, fields=None):
+    items = await hydrator(authors, fields).hydrate_dicts(posts)
+    return page_response(items, "abc").body
+
+
+async def measure(build):
+    await build()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        body = await build()
+    return (time.perf_counter() - start) / ROUNDS * 1000, len(body)
+
+
+async def run_benchmark():
+    posts, authors = build_page(PAGE_SIZE)
+
+    before, after = await models_body(posts, authors), await dicts_body(posts, authors)
+    assert json.loads(before) == json.loads(after), "dict path output differs from PostResponse"
+
+    grid = PostFieldSet.parse("id,thumbnail_url,likes_count,comments_count", None)
+    print(f"--- {PAGE_SIZE}-post page ({ROUNDS} rounds) ---")
+    for name, build in (
+        ("PostResponse + response_model", lambda: models_body(posts, authors)),
+        ("dicts + orjson", lambda: dicts_body(posts, authors)),
+        ("dicts + orjson, grid fields", lambda: dicts_body(posts, authors, grid))
+    ):
+        ms, size = await measure(build)
+        print(f"{name:>30}: {ms:.2f} ms/page, {size} bytes")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
@@ -0,0 +1,112 @@
+import mongomock
+import pytest
+from beanie import init_beanie
+from pymongo import UpdateMany, UpdateOne
+
+# Beanie needs an async pymongo database; mongomock is synchronous, so these thin wrappers
+# await its calls. Enough for the services under test (find/aggregate/update/insert/delete),
+# without a running mongod.
+
+
+class _AsyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def chain(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return _AsyncCursor(result) if isinstance(result, mongomock.collection.Cursor) else result
+        return chain
+
+    async def to_list(self, length=None):
+        items = list(self._cursor)
+        return items if length is None else items[:length]
+
+    def __aiter__(self):
+        self._iter = iter(self._cursor)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def close(self):
+        pass
+
+
+class _AsyncCollection:
+    def __init__(self, collection, database):
+        self._collection = collection
+        self.database = database
+
+    @property
+    def name(self):
+        return self._collection.name
+
+    def find(self, *args, **kwargs):
+        kwargs.pop("session", None)
+        return _AsyncCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, pipeline, *args, **kwargs):
+        kwargs.pop("session", None)
+        return _AsyncCursor(self._collection.aggregate(pipeline, *args, **kwargs))
+
+    async def bulk_write(self, requests, ordered=True, **kwargs):
+        # mongomock's bulk builder predates the `sort` option pymongo now passes: apply one by one
+        for op in requests:
+            if isinstance(op, UpdateOne):
+                self._collection.update_one(op._filter, op._doc, upsert=bool(op._upsert))
+            elif isinstance(op, UpdateMany):
+                self._collection.update_many(op._filter, op._doc, upsert=bool(op._upsert))
+            else:
+                self._collection.bulk_write([op], ordered=ordered)
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            kwargs.pop("session", None)
+            kwargs.pop("comment", None)
+            return attr(*args, **kwargs)
+        return call
+
+
+class _AsyncDatabase:
+    def __init__(self, name: str = "wetalk_test"):
+        self._db = mongomock.MongoClient()[name]
+        self.name = name
+
+    def __getitem__(self, name):
+        return _AsyncCollection(self._db[name], self)
+
+    def get_collection(self, name, **kwargs):
+        return self[name]
+
+    async def command(self, command, *args, **kwargs):
+        if "buildInfo" in command:
+            return {"version": "7.0.0", "versionArray": [7, 0, 0, 0]}
+        return self._db.command(command)
+
+    async def list_collection_names(self, *args, **kwargs):
+        return self._db.list_collection_names()
+
+
+@pytest.fixture
+def mongo():
+    """
+    Returns `init(*document_models)`, which binds the models to a fresh in-memory
+    database. Stored datetimes come back naive, as they do from Mongo.
+    """
+    async def init(*document_models):
+        database = _AsyncDatabase()
+        await init_beanie(database=database, document_models=list(document_models))
+        return database
+    return init
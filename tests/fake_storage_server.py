@@ -0,0 +1,138 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse, JSONResponse
+
+# A stand-in for the Cloudinary endpoints WeTalk uses, for exercising client-direct
+# uploads without network access:
+#   POST /v1_1/{cloud}/{resource_type}/upload                     signed upload (+ notification)
+#   GET  /v1_1/{cloud}/resources/{resource_type}/upload/{id}      Admin API resource
+#   POST /v1_1/{cloud}/resources/{resource_type}/upload (DELETE)  Admin API delete_resources
+#   GET  /files/{resource_type}/{id}.{ext}                        the stored file
+# Point the API and worker at it with CLOUDINARY_UPLOAD_PREFIX=http://127.0.0.1:9000 and run
+#   python -m tests.fake_storage_server --port 9000 --api-secret <CLOUDINARY_API_SECRET>
+# Signatures are checked and notifications signed the way Cloudinary does it (SHA-1).
+
+STORAGE_DIR = ".fake_storage"
+
+app = FastAPI()
+app.state.api_secret = ""
+app.state.base_url = "http://127.0.0.1:9000"
+
+
+def _sign(value: str) -> str:
+    return hashlib.sha1((value + app.state.api_secret).encode()).hexdigest()
+
+
+def _upload_signature(params: dict) -> str:
+    # Cloudinary signs every parameter except these, sorted, as k=v joined by &
+    signed = {k: v for k, v in params.items() if k not in ("file", "api_key", "signature", "resource_type", "cloud_name") and v}
+    return _sign("&".join(f"{k}={signed[k]}" for k in sorted(signed)))
+
+
+def _meta_path(resource_type: str, public_id: str) -> str:
+    return os.path.join(STORAGE_DIR, resource_type, public_id + ".json")
+
+
+def _asset(resource_type: str, public_id: str):
+    path = _meta_path(resource_type, public_id)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+@app.post("/v1_1/{cloud}/{resource_type}/upload")
+async def upload(cloud: str, resource_type: str, request: Request):
+    form = await request.form()
+    params = {k: v for k, v in form.items() if k != "file"}
+    if form.get("signature") != _upload_signature(params):
+        return JSONResponse({"error": {"message": "Invalid Signature"}}, status_code=401)
+
+    upload = form["file"]
+    allowed = params.get("allowed_formats")
+    source_ext = getattr(upload, "filename", "").rsplit(".", 1)[-1].lower()
+    if allowed and source_ext not in allowed.split(","):
+        return JSONResponse({"error": {"message": f"{source_ext} format not allowed"}}, status_code=400)
+
+    data = await upload.read()
+    public_id = params["public_id"]
+    ext = "mp4" if resource_type == "video" else "jpg"
+    file_path = os.path.join(STORAGE_DIR, resource_type, f"{public_id}.{ext}")
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "wb") as f:
+        f.write(data)
+
+    asset = {
+        "public_id": public_id,
+        "resource_type": resource_type,
+        "format": ext,
+        "bytes": len(data),
+        "secure_url": f"{app.state.base_url}/files/{resource_type}/{public_id}.{ext}",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    }
+    with open(_meta_path(resource_type, public_id), "w") as f:
+        json.dump(asset, f)
+
+    if params.get("notification_url"):
+        body = json.dumps({"notification_type": "upload", **asset})
+        timestamp = str(int(time.time()))
+        try:
+            async with httpx.AsyncClient() as client:
+                await client.post(params["notification_url"], content=body, headers={
+                    "Content-Type": "application/json",
+                    "X-Cld-Timestamp": timestamp,
+                    "X-Cld-Signature": _sign(body + timestamp)
+                })
+        except httpx.HTTPError as e:
+            print(f"Notification to {params['notification_url']} failed: {e}")
+
+    return asset
+
+
+@app.get("/v1_1/{cloud}/resources/{resource_type}/upload/{public_id:path}")
+async def resource(cloud: str, resource_type: str, public_id: str):
+    asset = _asset(resource_type, public_id)
+    if asset is None:
+        return JSONResponse({"error": {"message": f"Resource not found - {public_id}"}}, status_code=404)
+    return asset
+
+
+@app.api_route("/v1_1/{cloud}/resources/{resource_type}/upload", methods=["DELETE"])
+async def delete_resources(cloud: str, resource_type: str, request: Request):
+    params = await request.json() if await request.body() else dict(request.query_params.multi_items())
+    ids = params.get("public_ids") or request.query_params.getlist("public_ids[]")
+    deleted = {}
+    for public_id in ids if isinstance(ids, list) else [ids]:
+        asset = _asset(resource_type, public_id)
+        if asset is None:
+            deleted[public_id] = "not_found"
+            continue
+        os.remove(os.path.join(STORAGE_DIR, resource_type, f"{public_id}.{asset['format']}"))
+        os.remove(_meta_path(resource_type, public_id))
+        deleted[public_id] = "deleted"
+    return {"deleted": deleted}
+
+
+@app.get("/files/{resource_type}/{path:path}")
+async def files(resource_type: str, path: str):
+    file_path = os.path.join(STORAGE_DIR, resource_type, path)
+    if not os.path.isfile(file_path):
+        return JSONResponse({"error": {"message": "Not found"}}, status_code=404)
+    return FileResponse(file_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local fake of the storage API used by direct uploads.")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--api-secret", required=True)
+    args = parser.parse_args()
+    app.state.api_secret = args.api_secret
+    app.state.base_url = f"http://127.0.0.1:{args.port}"
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
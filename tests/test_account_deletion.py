@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from beanie import PydanticObjectId
+
+from app.core.auth import deletion
+from app.core.auth.deletion import AccountDeletionProcessor
+from app.core.config import settings
+from app.core.db.models import AccountDeletionJob, AccountDeletionStep, User, UserBlocks, UserFollows
+from app.core.utils.jobs import JobStatus
+from app.discovery.models import Location
+from app.engagement.models import Bookmark, Comment, CommentLike, PostLike
+from app.feed.models import TimelineEntry
+from app.messenger.models import Conversation, Message
+from app.notification.models import Notification
+from app.posts.models import Media, MediaAsset, Post, PostPurgeJob
+from app.stories.models import Story, StoryView
+
+# Leasing, step tracking and retries of the account deletion worker, against an
+# in-memory database (see conftest.py).
+
+USER = str(PydanticObjectId())
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def database(mongo, monkeypatch):
+    monkeypatch.setattr(settings, "ACCOUNT_DELETION_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "ACCOUNT_DELETION_BATCH_PAUSE", 0)
+    await mongo(
+        User, UserFollows, UserBlocks, AccountDeletionJob, Post, Media, MediaAsset, Location, PostPurgeJob,
+        PostLike, Comment, CommentLike, Bookmark, TimelineEntry, Story, StoryView,
+        Notification, Conversation, Message
+    )
+
+
+def _ago(seconds: int) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=seconds)
+
+
+async def _job(user_id: str = USER, age: int = 3600, **fields) -> AccountDeletionJob:
+    return await AccountDeletionJob(user_id=user_id, created_at=_ago(age), **fields).insert()
+
+
+async def _raw(job: AccountDeletionJob) -> dict:
+    return await AccountDeletionJob.get_pymongo_collection().find_one({"_id": job.id})
+
+
+async def _leftovers(n_bookmarks: int = 5):
+    for i in range(n_bookmarks):
+        await Bookmark(user_id=USER, post_id=f"post-{i}").insert()
+    await Bookmark(user_id="someone-else", post_id="post-0").insert()
+    await TimelineEntry(owner_id=USER, post_id="post-0", author_id="friend", created_at=_ago(60)).insert()
+
+
+@pytest.mark.asyncio
+async def test_claim_takes_one_due_account_at_a_time():
+    await _job(str(PydanticObjectId()), age=1)  # Left to the task queued for it
+    await _job(str(PydanticObjectId()), age=600, locked_until=_ago(-300), lock_token="busy")
+    second = await _job(str(PydanticObjectId()), age=1200)
+    first = await _job(str(PydanticObjectId()), age=1800, locked_until=_ago(1), lock_token="crashed")
+
+    processor = AccountDeletionProcessor()
+    assert [j.id for j in await processor.claim()] == [first.id]
+    assert [j.id for j in await processor.claim()] == [second.id]
+    assert await processor.claim() == []
+
+
+@pytest.mark.asyncio
+async def test_lease_is_extended_after_every_batch(monkeypatch):
+    await _leftovers(n_bookmarks=5)
+    job = await _job()
+    leases = []
+    original = deletion.extend_lease
+
+    async def recording_extend_lease(model, job, lease_seconds):
+        await original(model, job, lease_seconds)
+        raw = await model.get_pymongo_collection().find_one({"_id": job.id})
+        leases.append(raw["locked_until"].replace(tzinfo=timezone.utc) - datetime.now(timezone.utc))
+
+    monkeypatch.setattr(deletion, "extend_lease", recording_extend_lease)
+    processor = AccountDeletionProcessor()
+    await processor.process(await processor.claim())
+
+    # Bookmarks in batches of 2 (3 batches) and the timeline (1 batch)
+    assert len(leases) == 4
+    lease = timedelta(seconds=settings.ACCOUNT_DELETION_LEASE_SECONDS)
+    assert all(lease - timedelta(seconds=5) < remaining <= lease for remaining in leases)
+
+    assert await Bookmark.find(Bookmark.user_id == USER).count() == 0
+    assert await Bookmark.find(Bookmark.user_id == "someone-else").count() == 1
+    assert await TimelineEntry.get_pymongo_collection().count_documents({}) == 0
+    raw = await _raw(job)
+    assert raw["status"] == JobStatus.DONE.value
+    assert set(raw["completed_steps"]) == {s.value for s in AccountDeletionStep}
+
+
+@pytest.mark.asyncio
+async def test_posts_are_handed_to_the_post_purge():
+    kept = await Post(owner_id="friend", caption="Mine").insert()
+    posts = [await Post(owner_id=USER, caption=f"#{i}").insert() for i in range(3)]
+    await _job()
+
+    processor = AccountDeletionProcessor()
+    await processor.process(await processor.claim())
+
+    for post in posts:
+        assert (await Post.get(post.id)).is_deleted
+    assert not (await Post.get(kept.id)).is_deleted
+    purge_jobs = await PostPurgeJob.find().to_list()
+    assert sorted(j.post_id for j in purge_jobs) == sorted(str(p.id) for p in posts)
+
+
+@pytest.mark.asyncio
+async def test_job_of_a_user_who_still_exists_touches_nothing():
+    user = await User(username="back", email="back@example.com", password_hash="x",
+                      first_name="Back", last_name="Again").insert()
+    await Bookmark(user_id=str(user.id), post_id="post-0").insert()
+    job = await _job(str(user.id))
+
+    processor = AccountDeletionProcessor()
+    await processor.process(await processor.claim())
+
+    assert await Bookmark.get_pymongo_collection().count_documents({}) == 1
+    raw = await _raw(job)
+    assert (raw["status"], raw["completed_steps"]) == (JobStatus.DONE.value, [])
+
+
+@pytest.mark.asyncio
+async def test_failed_step_releases_the_lease_and_the_retry_resumes(monkeypatch):
+    await _leftovers()
+    job = await _job()
+    bookmark_runs = []
+
+    async def failing_stories(self, job):
+        raise RuntimeError("connection reset")
+
+    async def counting_bookmarks(self, job):
+        bookmark_runs.append(job.id)
+        return await original_bookmarks(self, job)
+
+    original_bookmarks = AccountDeletionProcessor._delete_bookmarks
+    monkeypatch.setattr(AccountDeletionProcessor, "_delete_bookmarks", counting_bookmarks)
+
+    processor = AccountDeletionProcessor()
+    with monkeypatch.context() as m:
+        m.setattr(AccountDeletionProcessor, "_delete_stories", failing_stories)
+        await processor.process(await processor.claim())
+
+    raw = await _raw(job)
+    assert raw["status"] == JobStatus.PENDING.value
+    assert raw["last_error"] == "stories: connection reset"
+    assert AccountDeletionStep.STORIES.value not in raw["completed_steps"]
+    assert AccountDeletionStep.BOOKMARKS.value in raw["completed_steps"]
+    assert "lock_token" not in raw and "locked_until" not in raw
+
+    # Due again right away; finished steps are not repeated
+    await processor.process(await processor.claim())
+
+    raw = await _raw(job)
+    assert (raw["status"], raw["attempts"], raw["last_error"]) == (JobStatus.DONE.value, 2, None)
+    assert bookmark_runs == [job.id]
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(settings, "ACCOUNT_DELETION_MAX_ATTEMPTS", 2)
+    job = await _job()
+
+    async def failing_stories(self, job):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(AccountDeletionProcessor, "_delete_stories", failing_stories)
+    processor = AccountDeletionProcessor()
+    for _ in range(3):
+        await processor.process(await processor.claim())
+
+    raw = await _raw(job)
+    assert (raw["status"], raw["attempts"]) == (JobStatus.FAILED.value, 2)
+    assert await processor.claim() == []
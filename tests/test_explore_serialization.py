@@ -21,7 +21,7 @@ async def test_serialization():
     user_id = "000000000000000000000000" 
     
     # 1. Test "All"
-    posts = await service.get_explore_feed(user_id, limit=5)
+    posts, _ = await service.get_explore_feed(user_id, limit=5)
     print(f"Found {len(posts)} posts for 'All'")
     
     for p in posts:
@@ -53,7 +53,7 @@ async def test_serialization():
 
     # 2. Test "Video" Filter
     print("\n--- Testing Video Filter ---")
-    video_posts = await service.get_explore_feed(user_id, limit=5, media_type="video")
+    video_posts, _ = await service.get_explore_feed(user_id, limit=5, media_type="video")
     print(f"Found {len(video_posts)} video posts")
     for p in video_posts:
         print(f"Post {p.id} - Media Types: {[m.file_type for m in p.media]}")
@@ -0,0 +1,146 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from beanie import PydanticObjectId
+
+from app.core.db.models import User
+from app.core.responses import FastJSONResponse
+from app.discovery.models import GeoLocation, Location
+from app.posts.fields import PostFieldSet
+from app.posts.hydrator import PostHydrator
+from app.posts.models import LocationSnapshot, Media, MediaSnapshot, MediaStatus, MediaType, Post
+from app.posts.schemas import PostResponse
+
+# hydrate_dicts is served through FastJSONResponse without response_model validation,
+# so its output is checked here against the PostResponse path it replaces. Everything
+# is built in memory; no database is needed.
+
+NOW = datetime.now(timezone.utc)
+
+
+def _user(i: int) -> User:
+    return User.model_construct(
+        id=PydanticObjectId(), username=f"user{i}", email=f"user{i}@example.com", password_hash="x",
+        first_name="First", last_name="Last", middle_name=None, bio=None if i % 2 else "Bio",
+        avatar_url=f"https://cdn.example.com/a/{i}.jpg", created_at=NOW, is_verified=bool(i % 2),
+        is_private=False, followers_count=10 * i, following_count=i
+    )
+
+
+def _media(owner: User, file_type: MediaType, stored_urls: bool = False, **extra) -> Media:
+    values = dict(
+        id=PydanticObjectId(), owner_id=str(owner.id), status=MediaStatus.ACTIVE, file_type=file_type,
+        filename="f", media_type="video/mp4" if file_type == MediaType.VIDEO else "image/jpeg",
+        public_id=f"wetalk/{PydanticObjectId()}", view_link="https://cdn.example.com/m.jpg", created_at=NOW,
+        storage=None, variant_urls=None
+    )
+    values.update(extra)
+    media = Media.model_construct(**values)
+    if stored_urls:
+        media.fill_variant_urls()
+    return media
+
+
+def _post(owner: User, **fields) -> Post:
+    values = dict(
+        id=PydanticObjectId(), owner_id=str(owner.id), caption="Caption #wetalk", tags=["wetalk"], media=[],
+        location=None, likes_count=3, comments_count=2, share_count=1, original_post=None,
+        media_snapshots=None, location_snapshot=None, created_at=NOW - timedelta(minutes=5), updated_at=NOW
+    )
+    values.update(fields)
+    return Post.model_construct(**values)
+
+
+@pytest.fixture
+def page():
+    alice, bob, ghost = _user(1), _user(2), _user(3)
+    location = Location.model_construct(
+        id=PydanticObjectId(), name="Lagos", location=GeoLocation(coordinates=[3.3792, 6.5244]), address="Lagos, NG"
+    )
+    image, legacy_video, video = (
+        _media(alice, MediaType.IMAGE),
+        _media(alice, MediaType.VIDEO, media_type=None),  # No variant_urls: computed on read
+        _media(bob, MediaType.VIDEO, stored_urls=True)
+    )
+
+    plain = _post(alice, caption=None, likes_count=0, comments_count=0, share_count=0)
+    live = _post(alice, media=[image, legacy_video], location=location)
+    snapshots = _post(
+        bob, media=[video], media_snapshots=[MediaSnapshot.from_media(video)],
+        location_snapshot=LocationSnapshot.from_location(location),
+        created_at=datetime(2026, 1, 2, 3, 4, 5, 678000)  # Naive, as Mongo returns it
+    )
+    share = _post(bob, original_post=live, caption="Look")
+    orphan = _post(ghost, media=[image])  # Author deleted since
+
+    return [plain, live, snapshots, share, orphan], [alice, bob]
+
+
+def _hydrator(authors, fields=None) -> PostHydrator:
+    h = PostHydrator(fields=fields)
+    h.prime_users(*authors)
+    return h
+
+
+def _json(content):
+    # What the client receives from FastJSONResponse
+    return json.loads(FastJSONResponse(content).body)
+
+
+@pytest.mark.asyncio
+async def test_dicts_match_post_response(page):
+    posts, authors = page
+    deleted = posts[-1].owner_id
+
+    models_hydrator = _hydrator(authors)
+    models_hydrator._users[deleted] = None
+    models = await models_hydrator.hydrate(posts)
+
+    dicts_hydrator = _hydrator(authors)
+    dicts_hydrator._users[deleted] = None
+    dicts = await dicts_hydrator.hydrate_dicts(posts)
+
+    for model, d in zip(models, dicts):
+        expected = PostResponse.model_validate(model).model_dump(mode="json", by_alias=True)
+        assert _json(d) == expected
+
+
+def _complete(body: dict, full: dict) -> dict:
+    # A sparse body lacks required fields; take them from the full response
+    merged = {**full, **body}
+    if body.get("original_post") and full.get("original_post"):
+        merged["original_post"] = _complete(body["original_post"], full["original_post"])
+    return merged
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fields, expand", [
+    ("id,thumbnail_url,likes_count,comments_count", None),
+    ("caption,created_at", "author,media"),
+    ("id", "original_post,location"),
+])
+async def test_sparse_dicts_validate(page, fields, expand):
+    posts, authors = page
+    selection = PostFieldSet.parse(fields, expand)
+    full = {m.id: m for m in await _hydrator(authors).hydrate(posts[:-1])}
+
+    for d in await _hydrator(authors, selection).hydrate_dicts(posts[:-1]):
+        body = _json(d)
+        assert set(body) == {"_id" if name == "id" else name for name in selection.selected}
+
+        model = full[body["_id"]]
+        expected = model.model_dump(mode="json", by_alias=True)
+
+        # Whatever is emitted is valid PostResponse JSON, unchanged by a round trip
+        validated = PostResponse.model_validate(_complete(body, expected)).model_dump(mode="json", by_alias=True)
+        assert {name: validated[name] for name in body if name != "original_post"} == \
+            {name: value for name, value in body.items() if name != "original_post"}
+
+        for name, value in body.items():
+            if name == "thumbnail_url":
+                assert value == (model.media[0].thumbnail_url if model.media else None)
+            elif name == "original_post":
+                assert (value and value["_id"]) == (expected["original_post"] and expected["original_post"]["_id"])
+            else:
+                assert value == expected[name]
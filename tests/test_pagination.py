@@ -0,0 +1,65 @@
+import base64
+from datetime import datetime
+
+import pytest
+from bson import ObjectId, json_util
+
+from app.core.errors import InvalidCursorException
+from app.core.utils.pagination import after_cursor, decode_cursor, encode_cursor
+from app.discovery.service import EXPLORE_SORT, EXPLORE_TYPES
+
+
+def _raw_cursor(values) -> str:
+    # A client-made cursor: same encoding as encode_cursor, arbitrary content
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode().rstrip("=")
+
+
+def test_round_trip():
+    created_at, post_id = datetime(2026, 1, 2, 3, 4, 5), ObjectId()
+    query = after_cursor(encode_cursor(created_at, post_id))
+    assert query == {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": post_id}}
+    ]}
+
+
+def test_first_page():
+    assert after_cursor(None) == {}
+
+
+@pytest.mark.parametrize("values", [
+    [{"$foo": 1}, 1],
+    [{"$gte": {"$date": 0}}, {"$exists": True}],
+    [[1, 2], str(ObjectId())],
+])
+def test_operators_rejected(values):
+    with pytest.raises(InvalidCursorException):
+        decode_cursor(_raw_cursor(values), 2)
+    with pytest.raises(InvalidCursorException):
+        after_cursor(_raw_cursor(values))
+
+
+@pytest.mark.parametrize("values", [
+    ["2026-01-01", {"$oid": str(ObjectId())}],   # created_at as a string
+    [{"$date": 0}, str(ObjectId())],             # _id as a string
+    [{"$date": 0}, 5],
+])
+def test_wrong_types_rejected(values):
+    with pytest.raises(InvalidCursorException):
+        after_cursor(_raw_cursor(values))
+
+
+def test_explore_types():
+    cursor = encode_cursor(3, 1, datetime(2026, 1, 1), ObjectId())
+    assert after_cursor(cursor, EXPLORE_SORT, EXPLORE_TYPES)
+
+    with pytest.raises(InvalidCursorException):
+        after_cursor(_raw_cursor([True, 1, {"$date": 0}, {"$oid": str(ObjectId())}]), EXPLORE_SORT, EXPLORE_TYPES)
+    with pytest.raises(InvalidCursorException):
+        after_cursor(_raw_cursor(["3", 1, {"$date": 0}, {"$oid": str(ObjectId())}]), EXPLORE_SORT, EXPLORE_TYPES)
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", _raw_cursor({"a": 1}), _raw_cursor([1])])
+def test_malformed(cursor):
+    with pytest.raises(InvalidCursorException):
+        after_cursor(cursor)
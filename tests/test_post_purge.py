@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from beanie import PydanticObjectId
+
+from app.core.config import settings
+from app.core.utils.jobs import JobStatus
+from app.discovery.models import Hashtag, Location, PostTag
+from app.engagement.models import Bookmark, Comment, CommentLike, PostLike
+from app.feed.models import TimelineEntry
+from app.posts.models import Media, MediaAsset, Post, PostPurgeJob, PurgeStep
+from app.posts.purge import PostPurgeProcessor
+
+# Leasing, step tracking and retries of the post purge worker, against an in-memory
+# database (see conftest.py). The posts have no media or tags, so no storage is needed.
+
+OWNER = "owner-1"
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def database(mongo):
+    await mongo(
+        Post, Media, MediaAsset, Location, Hashtag, PostTag, PostLike, Bookmark, Comment, CommentLike,
+        TimelineEntry, PostPurgeJob
+    )
+
+
+def _ago(seconds: int) -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=seconds)
+
+
+async def _job(post_id: str = None, age: int = 3600, **fields) -> PostPurgeJob:
+    job = PostPurgeJob(post_id=post_id or str(PydanticObjectId()), owner_id=OWNER, created_at=_ago(age), **fields)
+    return await job.insert()
+
+
+async def _deleted_post() -> Post:
+    post = await Post(owner_id=OWNER, caption="Bye", is_deleted=True, deleted_at=_ago(60)).insert()
+    post_id = str(post.id)
+    await PostLike(post_id=post_id, user_id="fan").insert()
+    await Bookmark(post_id=post_id, user_id="fan").insert()
+    comment = await Comment(post_id=post_id, user_id="fan", content="Nice").insert()
+    await CommentLike(comment_id=str(comment.id), user_id=OWNER).insert()
+    await TimelineEntry(owner_id="fan", post_id=post_id, author_id=OWNER, created_at=post.created_at).insert()
+    return post
+
+
+async def _raw(job: PostPurgeJob) -> dict:
+    return await PostPurgeJob.get_pymongo_collection().find_one({"_id": job.id})
+
+
+@pytest.mark.asyncio
+async def test_claim_leases_due_jobs_once():
+    old = await _job(age=3600)
+    expired = await _job(age=1800, locked_until=_ago(1), lock_token="crashed")
+    await _job(age=1200, locked_until=_ago(-300), lock_token="busy")
+    await _job(age=1)  # Left to the task queued for it
+    await _job(age=600, status=JobStatus.DONE)
+
+    processor = PostPurgeProcessor()
+    claimed = await processor.claim()
+
+    assert [j.id for j in claimed] == [old.id, expired.id]
+    tokens = {j.lock_token for j in claimed}
+    assert len(tokens) == 1 and "crashed" not in tokens
+    assert all(j.attempts == 1 for j in claimed)
+    assert await processor.claim() == []
+
+
+@pytest.mark.asyncio
+async def test_claim_by_id_skips_the_grace_period_but_not_a_lease():
+    fresh = await _job(age=1)
+    busy = await _job(age=1, locked_until=_ago(-300), lock_token="busy")
+
+    claimed = await PostPurgeProcessor().claim([str(fresh.id), str(busy.id), "not-an-id"])
+
+    assert [j.id for j in claimed] == [fresh.id]
+
+
+@pytest.mark.asyncio
+async def test_process_purges_the_post_and_closes_the_job():
+    post = await _deleted_post()
+    await _job(str(post.id))
+
+    processor = PostPurgeProcessor()
+    await processor.process(await processor.claim())
+
+    for model in (PostLike, Bookmark, Comment, CommentLike, TimelineEntry, Post):
+        assert await model.get_pymongo_collection().count_documents({}) == 0, model.__name__
+    raw = (await PostPurgeJob.get_pymongo_collection().find().to_list())[0]
+    assert raw["status"] == JobStatus.DONE.value
+    assert set(raw["completed_steps"]) == {s.value for s in PurgeStep}
+    assert "lock_token" not in raw and "locked_until" not in raw
+
+
+@pytest.mark.asyncio
+async def test_job_of_a_post_that_was_never_hidden_touches_nothing():
+    post = await Post(owner_id=OWNER, caption="Still here").insert()
+    await PostLike(post_id=str(post.id), user_id="fan").insert()
+    job = await _job(str(post.id))
+
+    processor = PostPurgeProcessor()
+    await processor.process(await processor.claim())
+
+    assert await Post.get(post.id) is not None
+    assert await PostLike.get_pymongo_collection().count_documents({}) == 1
+    raw = await _raw(job)
+    assert (raw["status"], raw["completed_steps"]) == (JobStatus.DONE.value, [])
+
+
+@pytest.mark.asyncio
+async def test_failed_step_releases_the_lease_and_the_retry_resumes(monkeypatch):
+    post = await _deleted_post()
+    job = await _job(str(post.id))
+    calls = []
+
+    async def failing_comments(self, jobs, posts_map):
+        raise RuntimeError("connection reset")
+
+    async def counting_engagement(self, jobs, posts_map):
+        calls.append(PurgeStep.ENGAGEMENT)
+        return await original_engagement(self, jobs, posts_map)
+
+    original_engagement = PostPurgeProcessor._purge_engagement
+    monkeypatch.setattr(PostPurgeProcessor, "_purge_engagement", counting_engagement)
+
+    processor = PostPurgeProcessor()
+    with monkeypatch.context() as m:
+        m.setattr(PostPurgeProcessor, "_purge_comments", failing_comments)
+        await processor.process(await processor.claim())
+
+    raw = await _raw(job)
+    assert raw["status"] == JobStatus.PENDING.value
+    assert raw["last_error"] == "comments: connection reset"
+    assert raw["completed_steps"] == [PurgeStep.SHARES.value, PurgeStep.ENGAGEMENT.value]
+    assert "lock_token" not in raw and "locked_until" not in raw
+    assert await PostLike.get_pymongo_collection().count_documents({}) == 0
+    assert await Comment.get_pymongo_collection().count_documents({}) == 1
+
+    # Due again right away; finished steps are not repeated
+    await processor.process(await processor.claim())
+
+    raw = await _raw(job)
+    assert (raw["status"], raw["attempts"], raw["last_error"]) == (JobStatus.DONE.value, 2, None)
+    assert calls == [PurgeStep.ENGAGEMENT]
+    assert await Post.get(post.id) is None
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(settings, "PURGE_MAX_ATTEMPTS", 2)
+    post = await _deleted_post()
+    job = await _job(str(post.id))
+
+    async def failing_comments(self, jobs, posts_map):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(PostPurgeProcessor, "_purge_comments", failing_comments)
+    processor = PostPurgeProcessor()
+    for _ in range(3):
+        await processor.process(await processor.claim())
+
+    raw = await _raw(job)
+    assert (raw["status"], raw["attempts"]) == (JobStatus.FAILED.value, 2)
+    assert await processor.claim() == []
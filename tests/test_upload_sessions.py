@@ -0,0 +1,231 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from starlette.requests import ClientDisconnect
+
+from app.core.config import settings
+from app.core.errors import FileSizeLimitException, UploadSessionConflictException
+from app.core.media import sessions
+from app.core.media.service import MediaService
+from app.posts.models import UploadSession, UploadSessionStatus
+
+# The write lease and finalize state machine of UploadSessionService, against an
+# in-memory database (see conftest.py) and session files under tmp_path.
+
+OWNER = "owner-1"
+
+
+@pytest_asyncio.fixture
+async def service(mongo, monkeypatch, tmp_path):
+    monkeypatch.setattr(sessions, "UPLOAD_SESSION_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 4)
+    await mongo(UploadSession)
+    return sessions.UploadSessionService()
+
+
+async def _body(*chunks: bytes, disconnect: bool = False):
+    for chunk in chunks:
+        yield chunk
+    if disconnect:
+        raise ClientDisconnect()
+
+
+async def _raw(session: UploadSession) -> dict:
+    return await UploadSession.get_pymongo_collection().find_one({"_id": session.id})
+
+
+async def _set(session: UploadSession, **fields):
+    await UploadSession.get_pymongo_collection().update_one({"_id": session.id}, {"$set": fields})
+
+
+def _read(session: UploadSession) -> bytes:
+    with open(session.path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.asyncio
+async def test_append_continues_at_the_stored_offset(service):
+    session = await service.create_session(OWNER, "clip.mp4", "video/mp4", 10)
+
+    session = await service.append(OWNER, str(session.id), 0, _body(b"hel", b"lo"))
+    assert session.offset == 5
+    session = await service.append(OWNER, str(session.id), 5, _body(b"world"))
+    assert session.offset == 10
+
+    assert _read(session) == b"helloworld"
+    raw = await _raw(session)
+    assert (raw["offset"], raw["writer"], raw["writing_until"]) == (10, None, None)
+
+
+@pytest.mark.asyncio
+async def test_append_at_the_wrong_offset_is_rejected(service):
+    session = await service.create_session(OWNER, "clip.mp4", "video/mp4", 10)
+    await service.append(OWNER, str(session.id), 0, _body(b"hello"))
+
+    for offset in (0, 3, 7):
+        with pytest.raises(UploadSessionConflictException, match="Expected offset 5"):
+            await service.append(OWNER, str(session.id), offset, _body(b"xx"))
+
+    assert (await _raw(session))["offset"] == 5
+    assert _read(session) == b"hello"
+
+
+@pytest.mark.asyncio
+async def test_append_waits_for_a_live_lease_and_takes_over_an_expired_one(service):
+    session = await service.create_session(OWNER, "clip.mp4", "video/mp4", 10)
+    now = datetime.now(timezone.utc)
+
+    await _set(session, writer="other", writing_until=now + timedelta(seconds=30))
+    with pytest.raises(UploadSessionConflictException, match="Another chunk"):
+        await service.append(OWNER, str(session.id), 0, _body(b"hello"))
+    assert (await _raw(session))["writer"] == "other"
+
+    await _set(session, writing_until=now - timedelta(seconds=1))
+    session = await service.append(OWNER, str(session.id), 0, _body(b"hello"))
+    assert session.offset == 5
+    assert (await _raw(session))["writer"] is None
+
+
+@pytest.mark.asyncio
+async def test_lease_is_renewed_before_every_write(service):
+    session = await service.create_session(OWNER, "clip.mp4", "video/mp4", 12)
+    renewed = []
+
+    async def body():
+        for chunk in (b"aaaa", b"bbbb", b"cccc"):
+            # Let the lease nearly run out; the next write must push it back
+            await _set(session, writing_until=datetime.now(timezone.utc) + timedelta(seconds=1))
+            yield chunk
+            raw = await _raw(session)
+            renewed.append(raw["writing_until"].replace(tzinfo=timezone.utc) - datetime.now(timezone.utc))
+
+    await service.append(OWNER, str(session.id), 0, body())
+
+    lease = timedelta(seconds=settings.UPLOAD_SESSION_WRITE_LEASE_SECONDS)
+    assert len(renewed) == 3
+    assert all(lease - timedelta(seconds=5) < remaining <= lease for remaining in renewed)
+
+
+@pytest.mark.asyncio
+async def test_losing_the_lease_aborts_the_write_and_the_next_append_truncates(service):
+    session = await service.create_session(OWNER, "clip.mp4", "video/mp4", 12)
+
+    async def body():
+        yield b"aaaa"
+        # The request stalled past its lease and another writer took the session
+        await _set(session, writer="other")
+        yield b"bbbb"
+
+    with pytest.raises(UploadSessionConflictException, match="changed during the upload"):
+        await service.append(OWNER, str(session.id), 0, body())
+
+    raw = await _raw(session)
+    assert (raw["offset"], raw["writer"]) == (0, "other")  # Our release doesn't touch their lease
+    assert _read(session) == b"aaaa"  # Written, but never counted
+
+    await _set(session, writer=None, writing_until=None)
+    session = await service.append(OWNER, str(session.id), 0, _body(b"xy"))
+    assert session.offset == 2
+    assert _read(session) == b"xy"
+
+
+@pytest.mark.asyncio
+async def test_disconnect_keeps_the_bytes_that_arrived(service):
+    session = await service.create_session(OWNER, "clip.mp4", "video/mp4", 10)
+
+    session = await service.append(OWNER, str(session.id), 0, _body(b"abcd", b"ef", disconnect=True))
+
+    assert session.offset == 6
+    assert _read(session) == b"abcdef"
+    raw = await _raw(session)
+    assert (raw["offset"], raw["writer"]) == (6, None)
+
+
+@pytest.mark.asyncio
+async def test_chunk_past_the_declared_length_releases_the_lease(service):
+    session = await service.create_session(OWNER, "clip.mp4", "video/mp4", 6)
+
+    with pytest.raises(FileSizeLimitException):
+        await service.append(OWNER, str(session.id), 0, _body(b"abcd", b"efgh"))
+
+    raw = await _raw(session)
+    assert (raw["offset"], raw["writer"], raw["writing_until"]) == (0, None, None)
+
+
+@pytest.fixture
+def handoff(monkeypatch):
+    calls = []
+
+    async def process_video_background(self, **kwargs):
+        calls.append(kwargs)
+        return {"message": "Video processing has been queued.", "media_id": f"media-{len(calls)}"}
+
+    monkeypatch.setattr(MediaService, "process_video_background", process_video_background)
+    return calls
+
+
+async def _complete_session(service) -> UploadSession:
+    session = await service.create_session(OWNER, "clip.mp4", "video/mp4", 5)
+    return await service.append(OWNER, str(session.id), 0, _body(b"hello"))
+
+
+@pytest.mark.asyncio
+async def test_finalize_queues_once(service, handoff):
+    session = await _complete_session(service)
+
+    first = await service.finalize(OWNER, str(session.id))
+    again = await service.finalize(OWNER, str(session.id))
+
+    assert first["media_id"] == again["media_id"] == "media-1"
+    assert len(handoff) == 1
+    assert handoff[0]["file_path"] == session.path and handoff[0]["content_hash"]
+    raw = await _raw(session)
+    assert (raw["status"], raw["media_id"]) == (UploadSessionStatus.FINALIZED.value, "media-1")
+
+    with pytest.raises(UploadSessionConflictException, match="already finalized"):
+        await service.append(OWNER, str(session.id), 5, _body(b""))
+
+
+@pytest.mark.asyncio
+async def test_finalize_waits_for_a_live_writer(service, handoff):
+    session = await _complete_session(service)
+    now = datetime.now(timezone.utc)
+
+    await _set(session, writer="other", writing_until=now + timedelta(seconds=30))
+    with pytest.raises(UploadSessionConflictException, match="being finalized"):
+        await service.finalize(OWNER, str(session.id))
+    assert (await _raw(session))["status"] == UploadSessionStatus.UPLOADING.value
+    assert handoff == []
+
+    # A writer that stalled past its lease no longer blocks it
+    await _set(session, writing_until=now - timedelta(seconds=1))
+    assert (await service.finalize(OWNER, str(session.id)))["media_id"] == "media-1"
+
+
+@pytest.mark.asyncio
+async def test_finalize_of_an_incomplete_upload_is_rejected(service, handoff):
+    session = await service.create_session(OWNER, "clip.mp4", "video/mp4", 10)
+    await service.append(OWNER, str(session.id), 0, _body(b"hello"))
+
+    with pytest.raises(UploadSessionConflictException, match="5 of 10"):
+        await service.finalize(OWNER, str(session.id))
+    assert handoff == []
+
+
+@pytest.mark.asyncio
+async def test_failed_handoff_lets_the_client_retry(service, handoff, monkeypatch):
+    session = await _complete_session(service)
+
+    async def broken(self, **kwargs):
+        raise RuntimeError("broker down")
+
+    with monkeypatch.context() as m:
+        m.setattr(MediaService, "process_video_background", broken)
+        with pytest.raises(RuntimeError):
+            await service.finalize(OWNER, str(session.id))
+
+    raw = await _raw(session)
+    assert (raw["status"], raw["media_id"]) == (UploadSessionStatus.UPLOADING.value, None)
+
+    assert (await service.finalize(OWNER, str(session.id)))["media_id"] == "media-1"